@@ -8,15 +8,15 @@ import json
 import logging
 import re
 import joblib
+import numpy as np
 import pandas as pd
-from sklearn.model_selection import train_test_split
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.metrics import classification_report, accuracy_score
-from sklearn.pipeline import Pipeline
 
 from dotenv import load_dotenv
 
+from ai.policy import ScoringPolicy
+from ai.feature_store import FeatureStore, vectorizer_version, text_key
+from ingestion.authors import author_key
+
 load_dotenv()
 
 logging.basicConfig(level=logging.INFO)
@@ -25,11 +25,14 @@ logger = logging.getLogger(__name__)
 class VIPThreatScorer:
     def __init__(self):
         self.model_path = os.getenv('MODEL_PATH', './models/vip_threat_model.pkl')
-        self.threat_threshold = float(os.getenv('THREAT_THRESHOLD', 0.7))
         self.vip_keywords = [k.strip() for k in os.getenv('VIP_KEYWORDS', '').split(',') if k.strip()]
         self.threat_keywords = [k.strip() for k in os.getenv('THREAT_KEYWORDS', '').split(',') if k.strip()]
+        # Maps model outputs to threat score / severity / action; replaced at runtime by the worker
+        self.policy = ScoringPolicy()
 
         self.pipeline = None  # Will hold the trained pipeline
+        self._feature_store = None
+        self._feature_store_vectorizer = None
         self.categories = {
             0: 'safe',
             1: 'harassment',
@@ -42,6 +45,10 @@ class VIPThreatScorer:
         # Load existing model if available
         self._load_model()
 
+    @property
+    def threat_threshold(self):
+        return self.policy.threat_threshold
+
     def create_training_data(self):
         # Synthetic training data samples to simulate real threat categories
         data = []
@@ -113,76 +120,147 @@ class VIPThreatScorer:
         logger.info(f"Training data created with {len(df)} samples")
         return df
 
-    def train_model(self, df=None):
+    def train_model(self, df=None, refit_vectorizer=True):
+        """
+        Train on df (text, label and optionally post id). With refit_vectorizer=False the
+        fitted TF-IDF vocabulary is kept and only the classifier head is retrained, on
+        features from the feature store.
+        """
+        # scikit-learn is only needed here; loading a saved pipeline imports what it uses
+        from sklearn.model_selection import train_test_split
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        from sklearn.ensemble import RandomForestClassifier
+        from sklearn.metrics import classification_report, accuracy_score
+        from sklearn.pipeline import Pipeline
+
         if df is None:
             df = self.create_training_data()
 
-        X = df['text']
-        y = df['label']
+        texts = df['text'].tolist()
+        # Rows without a post id (e.g. synthetic samples) are keyed by their text
+        keys = df['id'].tolist() if 'id' in df else [text_key(t) for t in texts]
+        y = df['label'].to_numpy()
+        train_idx, test_idx = train_test_split(np.arange(len(df)), test_size=0.2, random_state=42, stratify=y)
 
-        self.pipeline = Pipeline([
-            ('tfidf', TfidfVectorizer(max_features=10000, stop_words='english')),
-            ('clf', RandomForestClassifier(n_estimators=100, class_weight='balanced', random_state=42))
-        ])
+        clf = RandomForestClassifier(n_estimators=100, class_weight='balanced', random_state=42)
+        if refit_vectorizer or self.pipeline is None:
+            vectorizer = TfidfVectorizer(max_features=10000, stop_words='english')
+            train_features = vectorizer.fit_transform([texts[i] for i in train_idx])
+            self.pipeline = Pipeline([('tfidf', vectorizer), ('clf', clf)])
+            # New vocabulary, new feature store version; keep the rows fit_transform produced
+            self.feature_store().put([keys[i] for i in train_idx], train_features)
+        else:
+            self.pipeline = Pipeline([('tfidf', self.pipeline.named_steps['tfidf']), ('clf', clf)])
 
-        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
+        X = self.vectorize(keys, texts)
 
         logger.info("Starting model training...")
-        self.pipeline.fit(X_train, y_train)
+        clf.fit(X[train_idx], y[train_idx])
 
-        y_pred = self.pipeline.predict(X_test)
-        accuracy = accuracy_score(y_test, y_pred)
+        y_pred = clf.predict(X[test_idx])
+        accuracy = accuracy_score(y[test_idx], y_pred)
         logger.info(f"Training completed with accuracy: {accuracy:.3f}")
 
-        report = classification_report(y_test, y_pred)
+        report = classification_report(y[test_idx], y_pred)
         logger.info(f"Classification report:\n{report}")
 
         self._save_model()
         return accuracy
 
-    def predict_threat(self, text):
+    def feature_store(self):
+        """Feature store for the current model's vectorizer."""
+        vectorizer = self.pipeline.named_steps['tfidf']
+        if self._feature_store_vectorizer is not vectorizer:
+            self._feature_store = FeatureStore(vectorizer_version(vectorizer))
+            self._feature_store_vectorizer = vectorizer
+        return self._feature_store
+
+    def vectorize(self, keys, texts):
+        """TF-IDF rows for keys (post ids), transforming only texts the feature store has not seen."""
+        store = self.feature_store()
+        missing = list(dict.fromkeys(store.missing(keys)))
+        if missing:
+            text_by_key = dict(zip(keys, texts))
+            store.put(missing, self.pipeline.named_steps['tfidf'].transform([text_by_key[k] or '' for k in missing]))
+        return store.get(keys)
+
+    def predict_threat(self, text, author_profile=None):
         if self.pipeline is None:
             logger.warning("Model not loaded. Training a new model...")
             self.train_model()
 
         proba = self.pipeline.predict_proba([text])[0]
-        pred_class = self.pipeline.predict([text])[0]
-        confidence = max(proba)
+        return self._threat_result(text, proba, author_profile)
+
+    def score_posts(self, posts_df, author_store=None):
+        """
+        Score a DataFrame of posts (from DataIngestion.get_posts_for_analysis).
+        Features come from the feature store and the classifier runs once per batch.
+        When an author store is given, each author's profile feeds into the score and
+        is then updated with the post's text score, both as of the post's timestamp.
+        """
+        if posts_df.empty:
+            return []
+        if self.pipeline is None:
+            logger.warning("Model not loaded. Training a new model...")
+            self.train_model()
+        if author_store is not None:
+            author_store.load({(row.platform, author_key(row.author_id, row.author_username))
+                               for row in posts_df.itertuples()})
+
+        features = self.vectorize(posts_df['id'].tolist(), posts_df['content'].tolist())
+        probas = self.pipeline.named_steps['clf'].predict_proba(features)
+
+        scores = []
+        for row, proba in zip(posts_df.itertuples(), probas):
+            # Authorless posts (e.g. channel posts) have no profile to read or update
+            author_id = author_key(row.author_id, row.author_username) if author_store is not None else None
+            # Risk decays and first/last seen move with post time, not scoring time
+            posted_at = row.timestamp.to_pydatetime() if pd.notna(row.timestamp) else None
+            profile = author_store.get(row.platform, author_id, now=posted_at) if author_id is not None else None
+            result = self._threat_result(row.content or '', proba, author_profile=profile)
+            result['id'] = row.id
+            scores.append(result)
+            if author_id is not None:
+                author_store.record(row.platform, author_id, row.author_username,
+                                    result['category'], result['text_score'], row.vip_target, now=posted_at)
+
+        if author_store is not None:
+            author_store.flush()
+        return scores
+
+    def _threat_result(self, text, proba, author_profile=None):
+        classes = self.pipeline.classes_
+        pred_class = classes[int(np.argmax(proba))]
+        confidence = float(max(proba))
         category = self.categories.get(pred_class, 'unknown')
 
-        # Calculate threat score as sum of probabilities for malicious classes (1 to 4)
-        threat_score = sum(proba[i] for i in [1, 2, 3, 4] if i < len(proba))
+        probabilities = {self.categories.get(c, 'unknown'): float(p) for c, p in zip(classes, proba)}
 
-        # Rule-based adjustment: increase score if VIP keywords and threat keywords co-occur
-        adjustment = 0.0
+        # Rule inputs: VIP keywords and threat keywords co-occurring boost the score
         text_lower = text.lower()
         vip_mentioned = any(vip in text_lower for vip in self.vip_keywords)
         threat_mentioned = any(thr in text_lower for thr in self.threat_keywords)
-        if vip_mentioned and threat_mentioned:
-            adjustment += 0.3
-
-        threat_score = min(1.0, threat_score + adjustment)
-
-        # Determine severity and recommended action based on threat score
-        if threat_score >= 0.9:
-            severity = 'critical'
-            action = 'auto_report'
-        elif threat_score >= 0.7:
-            severity = 'high'
-            action = 'human_review'
-        elif threat_score >= 0.4:
-            severity = 'medium'
-            action = 'flag'
-        else:
-            severity = 'low'
-            action = 'dismiss'
+
+        # Author history amplifies the text score: a saturating boost of up to
+        # author_risk_weight * score for authors with a high decayed risk
+        author_risk = author_profile['risk_score'] if author_profile else 0.0
+
+        threat_score, text_score, severity, action = self.policy.evaluate(
+            probabilities, vip_mentioned, threat_mentioned, author_risk
+        )
 
         return {
             'threat_score': threat_score,
+            'text_score': text_score,
+            'author_risk': author_risk,
             'confidence': confidence,
             'category': category,
             'severity': severity,
-            'recommended_action': action
+            'recommended_action': action,
+            'class_probabilities': probabilities,
+            'vip_keyword_hit': vip_mentioned,
+            'threat_keyword_hit': threat_mentioned
         }
 
     def _save_model(self):
@@ -0,0 +1,277 @@
+"""
+VIP Threat Monitoring - TF-IDF Feature Store
+Persistent sparse feature rows per post, one directory per fitted vectorizer. Rows are
+written once, as CSR segments of .npy arrays, and read back memory-mapped, so retraining
+the classifier head or re-scoring stored posts does not re-tokenize any text.
+
+Usage (from backend/):
+    python -m ai.feature_store backfill      # vectorize every stored post for the current model
+    python -m ai.feature_store compact       # merge segments so full loads are zero-copy
+    python -m ai.feature_store stats
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import shutil
+import hashlib
+import logging
+import argparse
+import threading
+from collections import defaultdict
+
+import numpy as np
+import scipy.sparse as sp
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_ARRAYS = ('data', 'indices', 'indptr', 'keys')
+# Scoring writes one small segment per batch; once this many segments are below
+# SMALL_SEGMENT_ROWS they are merged into one
+MAX_SMALL_SEGMENTS = int(os.getenv('FEATURE_STORE_MAX_SMALL_SEGMENTS', 32))
+SMALL_SEGMENT_ROWS = 50000
+
+_stamp_lock = threading.Lock()
+_last_stamp = 0
+
+
+def vectorizer_version(vectorizer):
+    """Stable id of a fitted TfidfVectorizer: its parameters, vocabulary and idf weights."""
+    digest = hashlib.sha1()
+    params = {k: v for k, v in vectorizer.get_params().items() if k != 'dtype'}
+    digest.update(repr(sorted(params.items(), key=lambda kv: kv[0])).encode('utf-8'))
+    digest.update(json.dumps(sorted(vectorizer.vocabulary_.items()), default=int).encode('utf-8'))
+    digest.update(np.ascontiguousarray(vectorizer.idf_).tobytes())
+    return digest.hexdigest()[:16]
+
+
+def _segment_stamp():
+    """Nanoseconds since the epoch, strictly increasing within this process."""
+    global _last_stamp
+    with _stamp_lock:
+        _last_stamp = max(time.time_ns(), _last_stamp + 1)
+        return _last_stamp
+
+
+def _segment_order(name):
+    # seg-<stamp>-<suffix>; older stores used microsecond stamps, which still sort first
+    _, stamp, suffix = name.split('-', 2)
+    return int(stamp), suffix
+
+
+def text_key(text):
+    """Key for rows that are not stored posts, e.g. synthetic training samples."""
+    return 'text:' + hashlib.sha1((text or '').encode('utf-8')).hexdigest()
+
+
+class FeatureStore:
+    """
+    Append-only CSR segments for one vectorizer version.
+
+    Each put() writes a new segment directory (data/indices/indptr/keys .npy files,
+    renamed into place once complete). Segments are opened with mmap_mode='r', so a
+    fully compacted store loads with no copy; picking a subset of rows copies only
+    those rows.
+    """
+
+    def __init__(self, version, directory=None):
+        self.version = version
+        base = directory or os.getenv('FEATURE_STORE_DIR', './data/features')
+        self.directory = os.path.join(base, version)
+        os.makedirs(self.directory, exist_ok=True)
+        self._segments = {}
+        # Keys (memory-mapped) and sort order of each loaded segment
+        self._segment_keys = {}
+        self._order = {}
+        self._index = {}
+        # Segments put() by this instance; only these are auto-compacted, so several
+        # processes (e.g. sharded ingestion workers) can write the same store
+        self._written = set()
+        self.refresh()
+
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, key):
+        return key in self._index
+
+    def refresh(self):
+        """
+        Pick up segments written since the last call (e.g. by a backfill in another process).
+        Incremental: costs the rows of segments added or removed since then, not the whole index.
+        """
+        names = [name for name in os.listdir(self.directory) if name.startswith('seg-')]
+        removed = set(self._segments) - set(names)
+        for name in sorted(names, key=_segment_order):
+            if name in self._segments:
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                arrays = {a: np.load(os.path.join(path, f'{a}.npy'), mmap_mode='r') for a in SEGMENT_ARRAYS}
+                with open(os.path.join(path, 'meta.json'), 'r') as f:
+                    meta = json.load(f)
+            except FileNotFoundError:
+                continue  # removed by a concurrent compaction
+            matrix = sp.csr_matrix((arrays['data'], arrays['indices'], arrays['indptr']),
+                                   shape=tuple(meta['shape']), copy=False)
+            order = _segment_order(name)
+            self._segments[name] = matrix
+            self._segment_keys[name] = arrays['keys']
+            self._order[name] = order
+            # Later segments win for keys written twice, even when an older one shows up late
+            for row, key in enumerate(np.asarray(arrays['keys']).tolist()):
+                current = self._index.get(key)
+                if current is None or self._order[current[0]] <= order:
+                    self._index[key] = (name, row)
+        if removed:
+            self._unload(removed)
+
+    def _unload(self, names):
+        """Forget segments deleted from disk; their keys fall back to the newest other segment holding them."""
+        orphans = set()
+        for name in names:
+            del self._segments[name]
+            del self._order[name]
+            self._written.discard(name)
+            for key in np.asarray(self._segment_keys.pop(name)).tolist():
+                if self._index.get(key, (None,))[0] == name:
+                    del self._index[key]
+                    orphans.add(key)
+        # After a compaction the merged segment already holds them and nothing is left to do
+        for name in sorted(self._segments, key=self._order.get, reverse=True):
+            if not orphans:
+                break
+            keys = np.asarray(self._segment_keys[name])
+            for row in np.flatnonzero(np.isin(keys, list(orphans)))[::-1].tolist():
+                key = str(keys[row])
+                if key in orphans:
+                    self._index[key] = (name, row)
+                    orphans.discard(key)
+
+    def missing(self, keys):
+        self.refresh()
+        return [k for k in keys if k not in self._index]
+
+    def put(self, keys, matrix):
+        """Store one CSR row per key."""
+        if not len(keys):
+            return
+        self._written.add(self._write_segment(keys, matrix))
+        self.refresh()
+        small = [n for n in self._written if self._segments[n].shape[0] < SMALL_SEGMENT_ROWS]
+        if len(small) > MAX_SMALL_SEGMENTS:
+            self.compact(small)
+
+    def _write_segment(self, keys, matrix):
+        matrix = sp.csr_matrix(matrix)
+        matrix.sort_indices()
+        # Zero-padded so names sort in write order; the suffix separates concurrent writers
+        name = f"seg-{_segment_stamp():020d}-{uuid.uuid4().hex[:8]}"
+        tmp_path = os.path.join(self.directory, f".tmp-{name}")
+        os.makedirs(tmp_path)
+        np.save(os.path.join(tmp_path, 'data.npy'), matrix.data)
+        np.save(os.path.join(tmp_path, 'indices.npy'), matrix.indices)
+        np.save(os.path.join(tmp_path, 'indptr.npy'), matrix.indptr)
+        np.save(os.path.join(tmp_path, 'keys.npy'), np.asarray(list(keys), dtype=str))
+        with open(os.path.join(tmp_path, 'meta.json'), 'w') as f:
+            json.dump({'shape': list(matrix.shape), 'version': self.version}, f)
+        # Readers only ever see complete segments
+        os.rename(tmp_path, os.path.join(self.directory, name))
+        return name
+
+    def get(self, keys):
+        """CSR matrix with the stored rows for `keys`, in order. Raises KeyError for unknown keys."""
+        keys = list(keys)
+        if not keys:
+            width = next(iter(self._segments.values())).shape[1] if self._segments else 0
+            return sp.csr_matrix((0, width))
+        locations = [self._index[k] for k in keys]
+        segments = {name for name, _ in locations}
+        if len(segments) == 1:
+            name = locations[0][0]
+            matrix = self._segments[name]
+            rows = [row for _, row in locations]
+            if rows == list(range(matrix.shape[0])):
+                return matrix  # the whole segment, straight from the memory map
+            return matrix[rows]
+
+        by_segment = defaultdict(list)
+        for position, (name, row) in enumerate(locations):
+            by_segment[name].append((position, row))
+        parts, positions = [], []
+        for name, items in by_segment.items():
+            parts.append(self._segments[name][[row for _, row in items]])
+            positions.extend(position for position, _ in items)
+        stacked = sp.vstack(parts, format='csr')
+        return stacked[np.argsort(positions)]
+
+    def compact(self, segments=None):
+        """
+        Rewrite `segments` (default: all) as one. A fully compacted store loads as a single
+        zero-copy memory map.
+        """
+        self.refresh()
+        old = set(segments if segments is not None else self._segments)
+        if len(old) <= 1:
+            return
+        keys = [key for key, (name, _) in self._index.items() if name in old]
+        # The merged segment is newer, so its rows win before the old segments are gone
+        self._written.add(self._write_segment(keys, self.get(keys)))
+        for name in old:
+            shutil.rmtree(os.path.join(self.directory, name), ignore_errors=True)
+        self.refresh()
+
+    def stats(self):
+        self.refresh()
+        nnz = sum(m.nnz for m in self._segments.values())
+        return {'version': self.version, 'rows': len(self._index), 'segments': len(self._segments), 'nnz': nnz,
+                'directory': self.directory}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage the TF-IDF feature store")
+    parser.add_argument('command', choices=['backfill', 'compact', 'stats'])
+    parser.add_argument('--chunk-size', type=int, default=5000)
+    args = parser.parse_args(argv)
+
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+    from ingestion.ingestion import DataIngestion
+    from ai.ai_scoring import VIPThreatScorer
+
+    logging.basicConfig(level=logging.INFO)
+    scorer = VIPThreatScorer()
+    if scorer.pipeline is None:
+        raise SystemExit("No trained model; run python -m ai.ai_scoring first")
+    store = scorer.feature_store()
+
+    if args.command == 'backfill':
+        # Read-only: safe to run next to the ingestion worker
+        ingestion = DataIngestion(read_only=True)
+        added = 0
+        last_id = ''
+        while True:
+            # A fresh connection per chunk, so the worker is never locked out for long
+            conn = ingestion._get_db_connection()
+            try:
+                rows = conn.execute("SELECT id, content FROM posts WHERE id > ? ORDER BY id LIMIT ?",
+                                    [last_id, args.chunk_size]).fetchall()
+            finally:
+                conn.close()
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            wanted = dict(rows)
+            missing = store.missing(list(wanted))
+            if missing:
+                scorer.vectorize(missing, [wanted[k] for k in missing])
+                added += len(missing)
+        print(f"Vectorized {added} posts")
+    elif args.command == 'compact':
+        store.compact()
+    print(json.dumps(store.stats(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
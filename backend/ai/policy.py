@@ -0,0 +1,90 @@
+"""
+VIP Threat Monitoring - Scoring Policy
+Turns stored model outputs (per-class probabilities, keyword flags, author risk) into
+threat score, severity and recommended action. The same policy is evaluated in Python
+for newly scored posts and as SQL to re-derive every stored post without inference.
+"""
+
+import os
+import math
+from typing import Dict
+
+from pydantic import BaseModel, Field, model_validator
+
+CATEGORIES = ['safe', 'harassment', 'threat', 'doxxing', 'misinformation', 'spam']
+PROBABILITY_COLUMNS = {c: f'p_{c}' for c in CATEGORIES}
+
+# (severity, recommended action), most severe first
+SEVERITY_ACTIONS = [
+    ('critical', 'auto_report'),
+    ('high', 'human_review'),
+    ('medium', 'flag'),
+    ('low', 'dismiss'),
+]
+
+
+def _sql_double(value):
+    """Exact DOUBLE literal: a bare 0.7 would be a DECIMAL, cast to DOUBLE by DuckDB's own rounding."""
+    return f"'{float(value)!r}'::DOUBLE"
+
+
+def _default_class_weights():
+    return {'safe': 0.0, 'harassment': 1.0, 'threat': 1.0, 'doxxing': 1.0, 'misinformation': 1.0, 'spam': 0.0}
+
+
+class ScoringPolicy(BaseModel):
+    version: int = 0
+    # threat score = weighted sum of class probabilities, plus keyword_boost when both a VIP
+    # keyword and a threat keyword appear, amplified by author history
+    class_weights: Dict[str, float] = Field(default_factory=_default_class_weights)
+    keyword_boost: float = Field(0.3, ge=0.0, le=1.0)
+    author_risk_weight: float = Field(default_factory=lambda: float(os.getenv('AUTHOR_RISK_WEIGHT', 0.5)), ge=0.0)
+    critical_threshold: float = Field(0.9, ge=0.0, le=1.0)
+    high_threshold: float = Field(0.7, ge=0.0, le=1.0)
+    medium_threshold: float = Field(0.4, ge=0.0, le=1.0)
+    # Posts at or above this score count as threats in the dashboard
+    threat_threshold: float = Field(default_factory=lambda: float(os.getenv('THREAT_THRESHOLD', 0.7)), ge=0.0, le=1.0)
+
+    @model_validator(mode='after')
+    def _check(self):
+        unknown = set(self.class_weights) - set(CATEGORIES)
+        if unknown:
+            raise ValueError(f"Unknown categories in class_weights: {sorted(unknown)}")
+        if not self.critical_threshold >= self.high_threshold >= self.medium_threshold:
+            raise ValueError("Severity thresholds must satisfy critical >= high >= medium")
+        return self
+
+    def evaluate(self, probabilities, vip_keyword_hit, threat_keyword_hit, author_risk=0.0):
+        """Python twin of score_sql(): returns (threat_score, text_score, severity, action)."""
+        # Same terms in the same order as score_sql(), so both round identically
+        text_score = sum(self.class_weights.get(c, 0.0) * (probabilities.get(c) or 0.0) for c in CATEGORIES)
+        if vip_keyword_hit and threat_keyword_hit:
+            text_score += self.keyword_boost
+        text_score = min(1.0, text_score)
+        threat_score = min(1.0, text_score * (1 + self.author_risk_weight * (1 - math.exp(-(author_risk or 0.0)))))
+        severity, action = self.severity_for(threat_score)
+        return threat_score, text_score, severity, action
+
+    def severity_for(self, threat_score):
+        cuts = [self.critical_threshold, self.high_threshold, self.medium_threshold]
+        for (severity, action), cut in zip(SEVERITY_ACTIONS, cuts):
+            if threat_score >= cut:
+                return severity, action
+        return SEVERITY_ACTIONS[-1]
+
+    def score_sql(self):
+        """SQL expressions over the posts columns: (threat_score, severity, recommended_action)."""
+        weighted = " + ".join(f"{_sql_double(self.class_weights.get(c, 0.0))} * COALESCE({col}, 0.0::DOUBLE)"
+                              for c, col in PROBABILITY_COLUMNS.items())
+        text_score = (f"LEAST(1.0::DOUBLE, {weighted} + CASE WHEN vip_keyword_hit AND threat_keyword_hit "
+                      f"THEN {_sql_double(self.keyword_boost)} ELSE 0.0::DOUBLE END)")
+        score = (f"LEAST(1.0::DOUBLE, {text_score} * "
+                 f"(1 + {_sql_double(self.author_risk_weight)} * (1 - exp(-COALESCE(author_risk, 0.0::DOUBLE)))))")
+        cuts = [self.critical_threshold, self.high_threshold, self.medium_threshold]
+
+        def case(index):
+            whens = " ".join(f"WHEN ({score}) >= {_sql_double(cut)} THEN '{pair[index]}'"
+                             for pair, cut in zip(SEVERITY_ACTIONS, cuts))
+            return f"CASE {whens} ELSE '{SEVERITY_ACTIONS[-1][index]}' END"
+
+        return score, case(0), case(1)
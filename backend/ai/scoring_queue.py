@@ -0,0 +1,212 @@
+"""
+VIP Threat Monitoring - Priority Scoring Queue
+Bounded queue in front of VIPThreatScorer. Unscored posts are ranked by VIP importance,
+engagement, author risk and recency so that under overload the posts most likely to
+matter are scored first; the rest are deferred or shed.
+"""
+
+import os
+import math
+import time
+import heapq
+import logging
+import itertools
+from datetime import datetime
+
+import pandas as pd
+
+from ai.policy import _sql_double
+from ingestion.authors import author_key
+
+logger = logging.getLogger(__name__)
+
+
+def vip_priorities(vips):
+    """Map VIP name -> importance from vip_list.yaml entries (optional `priority`, default 1)."""
+    return {vip['name']: float(vip.get('priority', 1.0)) for vip in vips}
+
+
+class ScoringQueue:
+    """
+    At most `capacity` posts keyed by priority, in two heaps over the same entries: a
+    min-heap to find the post to evict and a max-heap (negated priority) to pop the best.
+    Entries removed through one heap stay in the other until they surface there.
+
+    When full, a new post either replaces the lowest-priority queued post or is turned
+    away. Either way the dropped post is only *deferred*: it stays unscored in the
+    database and is offered again on the next refill. Deferred posts that are too old
+    to matter and rank below everything queued are *shed* by the worker (see
+    DataIngestion.shed_unscored_posts).
+    """
+
+    def __init__(self, vip_priorities=None, capacity=None, batch_size=None):
+        self.vip_priorities = vip_priorities or {}
+        self.capacity = capacity or int(os.getenv('SCORING_QUEUE_CAPACITY', 5000))
+        self.batch_size = batch_size or int(os.getenv('SCORING_BATCH_SIZE', 64))
+        self.weights = {
+            'vip': float(os.getenv('SCORING_WEIGHT_VIP', 0.35)),
+            'engagement': float(os.getenv('SCORING_WEIGHT_ENGAGEMENT', 0.25)),
+            'author': float(os.getenv('SCORING_WEIGHT_AUTHOR', 0.25)),
+            'recency': float(os.getenv('SCORING_WEIGHT_RECENCY', 0.15)),
+        }
+        # Weighted interactions (likes + 2 * shares + comments) at which engagement saturates
+        self.engagement_saturation = float(os.getenv('SCORING_ENGAGEMENT_SATURATION', 10000))
+        self.recency_half_life_hours = float(os.getenv('SCORING_RECENCY_HALF_LIFE_HOURS', 6))
+        self._lowest = []   # (priority, -seq, id)
+        self._highest = []  # (-priority, seq, id)
+        self._rows = {}     # id -> (post, queued_at, seq, priority)
+        self._seq = itertools.count()
+        self.stats = {'queued': 0, 'deferred': 0, 'shed': 0, 'scored': 0, 'max_depth': 0,
+                      'last_batch_wait_seconds': None}
+
+    def __len__(self):
+        return len(self._rows)
+
+    @property
+    def saturated(self):
+        return len(self._rows) >= self.capacity
+
+    @property
+    def lowest_priority(self):
+        """Priority a post must beat to get into the full queue; None while there is room."""
+        if not self.saturated:
+            return None
+        # Entries already popped for scoring are dropped here
+        while not self._live(self._lowest[0][2], -self._lowest[0][1]):
+            heapq.heappop(self._lowest)
+        return self._lowest[0][0]
+
+    def priority(self, post, author_risk=0.0, now=None):
+        """Priority in [0, 1] from VIP importance, engagement, author risk and recency."""
+        now = now or time.time()
+        top_vip = max(self.vip_priorities.values(), default=1.0) or 1.0
+        vip = self.vip_priorities.get(post.get('vip_target'), 1.0) / top_vip
+
+        interactions = _count(post.get('likes')) + 2 * _count(post.get('shares')) + _count(post.get('comments'))
+        engagement = min(1.0, math.log1p(interactions) / math.log1p(self.engagement_saturation))
+
+        author = 1.0 - math.exp(-(author_risk or 0.0))
+
+        recency = 0.0
+        timestamp = post.get('timestamp')
+        if timestamp is not None and not pd.isna(timestamp):
+            age_hours = max(0.0, now - pd.Timestamp(timestamp).timestamp()) / 3600.0
+            recency = 0.5 ** (age_hours / self.recency_half_life_hours)
+
+        w = self.weights
+        total = w['vip'] + w['engagement'] + w['author'] + w['recency'] or 1.0
+        return (w['vip'] * vip + w['engagement'] * engagement + w['author'] * author
+                + w['recency'] * recency) / total
+
+    def push(self, post, author_risk=0.0, now=None):
+        """Queue one post (a dict with the get_posts_for_analysis columns). Returns False if deferred."""
+        if post['id'] in self._rows:
+            return True
+        priority = self.priority(post, author_risk, now)
+        if self.saturated:
+            if priority <= self.lowest_priority:
+                self.stats['deferred'] += 1
+                return False
+            _, _, evicted = heapq.heappop(self._lowest)
+            del self._rows[evicted]
+            self.stats['deferred'] += 1
+        seq = next(self._seq)
+        heapq.heappush(self._lowest, (priority, -seq, post['id']))
+        heapq.heappush(self._highest, (-priority, seq, post['id']))
+        self._rows[post['id']] = (post, time.monotonic(), seq, priority)
+        self.stats['queued'] += 1
+        self.stats['max_depth'] = max(self.stats['max_depth'], len(self._rows))
+        self._compact()
+        return True
+
+    def push_posts(self, posts_df, author_store=None):
+        """Queue a DataFrame from get_posts_for_analysis, using author risk when a store is given."""
+        if posts_df.empty:
+            return 0
+        if author_store is not None:
+            author_store.load({(row.platform, author_key(row.author_id, row.author_username))
+                               for row in posts_df.itertuples()})
+        now = time.time()
+        accepted = 0
+        for post in posts_df.to_dict('records'):
+            risk = 0.0
+            author_id = author_key(post['author_id'], post['author_username']) if author_store is not None else None
+            if author_id is not None:
+                profile = author_store.get(post['platform'], author_id)
+                risk = profile['risk_score'] if profile else 0.0
+            accepted += self.push(post, risk, now)
+        return accepted
+
+    def pop_batch(self, size=None):
+        """Remove and return the highest-priority posts as a DataFrame, best first."""
+        size = size or self.batch_size
+        now = time.monotonic()
+        posts = []
+        oldest = now
+        while self._highest and len(posts) < size:
+            _, seq, post_id = heapq.heappop(self._highest)
+            if not self._live(post_id, seq):
+                continue  # evicted, or evicted and queued again since
+            post, queued_at, _, _ = self._rows.pop(post_id)
+            posts.append(post)
+            oldest = min(oldest, queued_at)
+        if posts:
+            self.stats['last_batch_wait_seconds'] = round(now - oldest, 3)
+        return pd.DataFrame(posts)
+
+    def record_scored(self, count):
+        self.stats['scored'] += count
+
+    def record_shed(self, count):
+        if count:
+            logger.warning(f"Scoring queue saturated: shed {count} stale unscored posts")
+        self.stats['shed'] += count
+
+    def snapshot(self):
+        return dict(self.stats, depth=len(self._rows), capacity=self.capacity,
+                    updated_at=datetime.now().isoformat())
+
+    def priority_sql(self, now, author_risk='0.0::DOUBLE'):
+        """
+        priority() as a SQL expression over posts aliased `p`, for ranking and shedding in
+        the database. `author_risk` is a SQL expression for the author's decayed risk.
+        """
+        top_vip = max(self.vip_priorities.values(), default=1.0) or 1.0
+        whens = " ".join(f"WHEN {_sql_string(name)} THEN {_sql_double(value / top_vip)}"
+                         for name, value in self.vip_priorities.items())
+        vip = f"CASE p.vip_target {whens} ELSE {_sql_double(1.0 / top_vip)} END" if whens else _sql_double(1.0 / top_vip)
+
+        interactions = " + ".join(f"{factor}GREATEST(COALESCE(p.{column}, 0), 0)"
+                                  for factor, column in (('', 'likes'), ('2 * ', 'shares'), ('', 'comments')))
+        engagement = f"LEAST(1.0::DOUBLE, ln(1 + {interactions}) / ln(1 + {_sql_double(self.engagement_saturation)}))"
+        author = f"(1 - exp(-COALESCE({author_risk}, 0.0::DOUBLE)))"
+        age_hours = f"GREATEST(0.0::DOUBLE, {_sql_double(now)} - epoch_us(p.timestamp) / 1000000.0) / 3600.0"
+        recency = f"COALESCE(pow(0.5::DOUBLE, {age_hours} / {_sql_double(self.recency_half_life_hours)}), 0.0::DOUBLE)"
+
+        w = self.weights
+        total = w['vip'] + w['engagement'] + w['author'] + w['recency'] or 1.0
+        return (f"(({_sql_double(w['vip'])} * {vip} + {_sql_double(w['engagement'])} * {engagement} + "
+                f"{_sql_double(w['author'])} * {author} + {_sql_double(w['recency'])} * {recency}) / {_sql_double(total)})")
+
+    def _compact(self):
+        # Each heap keeps the entries removed through the other; rebuild once they dominate
+        if len(self._lowest) + len(self._highest) > 4 * len(self._rows) + 64:
+            self._lowest = [(priority, -seq, post_id) for post_id, (_, _, seq, priority) in self._rows.items()]
+            self._highest = [(-priority, seq, post_id) for post_id, (_, _, seq, priority) in self._rows.items()]
+            heapq.heapify(self._lowest)
+            heapq.heapify(self._highest)
+
+    def _live(self, post_id, seq):
+        row = self._rows.get(post_id)
+        return row is not None and row[2] == seq
+
+
+def _sql_string(value):
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def _count(value):
+    try:
+        return max(0, int(value)) if value is not None and not pd.isna(value) else 0
+    except (TypeError, ValueError):
+        return 0
@@ -0,0 +1,158 @@
+"""
+VIP Threat Monitoring - Campaign Spike Detection
+Streaming per-VIP/per-platform aggregator over scored posts. Flags coordinated campaigns
+when post volume or mean threat score in a sliding window jumps far above its baseline.
+"""
+
+import os
+import math
+import logging
+from datetime import datetime
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+class _KeyState:
+    """Fixed ring of time buckets plus EWMA baselines: constant memory per (vip, platform)."""
+
+    __slots__ = ('counts', 'score_sums', 'head', 'window_count', 'window_score_sum',
+                 'volume_mean', 'volume_var', 'score_mean', 'score_var', 'closed_buckets', 'last_alert_bucket')
+
+    def __init__(self, n_buckets, head):
+        self.counts = [0] * n_buckets
+        self.score_sums = [0.0] * n_buckets
+        self.head = head
+        self.window_count = 0
+        self.window_score_sum = 0.0
+        self.volume_mean = 0.0
+        self.volume_var = 0.0
+        self.score_mean = 0.0
+        self.score_var = 0.0
+        self.closed_buckets = 0
+        self.last_alert_bucket = None
+
+
+class CampaignSpikeDetector:
+    def __init__(self):
+        self.bucket_seconds = int(os.getenv('CAMPAIGN_BUCKET_SECONDS', 60))
+        self.window_buckets = max(1, int(float(os.getenv('CAMPAIGN_WINDOW_MINUTES', 10)) * 60 // self.bucket_seconds))
+        self.alpha = float(os.getenv('CAMPAIGN_EWMA_ALPHA', 0.05))
+        self.z_threshold = float(os.getenv('CAMPAIGN_Z_THRESHOLD', 4.0))
+        self.min_volume = int(os.getenv('CAMPAIGN_MIN_VOLUME', 20))
+        self.score_jump = float(os.getenv('CAMPAIGN_SCORE_JUMP', 0.25))
+        self._keys = {}
+
+    def observe(self, vip_target, platform, timestamp, threat_score):
+        """Fold one scored post in. Returns an alert dict if this post tips its key into a spike."""
+        bucket = int(timestamp // self.bucket_seconds)
+        key = (vip_target, platform)
+        state = self._keys.get(key)
+        if state is None:
+            state = self._keys[key] = _KeyState(self.window_buckets, bucket)
+        self._advance(state, bucket)
+
+        if bucket <= state.head - self.window_buckets:
+            return None  # older than the window
+        slot = bucket % self.window_buckets
+        state.counts[slot] += 1
+        state.score_sums[slot] += threat_score
+        state.window_count += 1
+        state.window_score_sum += threat_score
+        return self._check(key, state)
+
+    def observe_scores(self, posts_df, scores):
+        """Feed one scoring batch (posts from get_posts_for_analysis plus score_posts output)."""
+        score_by_id = {s['id']: s['threat_score'] for s in scores}
+        alerts = []
+        for row in posts_df.sort_values('timestamp').itertuples():
+            if not row.vip_target or row.id not in score_by_id:
+                continue
+            alert = self.observe(row.vip_target, row.platform, pd.Timestamp(row.timestamp).timestamp(),
+                                 float(score_by_id[row.id]))
+            if alert:
+                alerts.append(alert)
+        return alerts
+
+    def _advance(self, state, bucket):
+        """Close buckets up to `bucket`, folding each closed window into the baselines."""
+        steps = bucket - state.head
+        if steps <= 0:
+            return
+        # Long gaps: beyond one full window every closed window is empty, so decay in closed form
+        idle = max(0, steps - self.window_buckets)
+        for _ in range(steps - idle):
+            self._close_bucket(state)
+            state.head += 1
+            slot = state.head % self.window_buckets
+            state.window_count -= state.counts[slot]
+            state.window_score_sum -= state.score_sums[slot]
+            state.counts[slot] = 0
+            state.score_sums[slot] = 0.0
+        if idle:
+            decay = (1 - self.alpha) ** idle
+            state.volume_var = decay * (state.volume_var + (1 - decay) * state.volume_mean ** 2)
+            state.volume_mean *= decay
+            state.closed_buckets += idle
+            state.head += idle
+
+    def _close_bucket(self, state):
+        volume = state.window_count
+        diff = volume - state.volume_mean
+        incr = self.alpha * diff
+        state.volume_mean += incr
+        state.volume_var = (1 - self.alpha) * (state.volume_var + diff * incr)
+        if volume:
+            mean_score = state.window_score_sum / volume
+            if state.closed_buckets == 0 or state.score_mean == 0.0:
+                state.score_mean = mean_score
+            else:
+                diff = mean_score - state.score_mean
+                incr = self.alpha * diff
+                state.score_mean += incr
+                state.score_var = (1 - self.alpha) * (state.score_var + diff * incr)
+        state.closed_buckets += 1
+
+    def _check(self, key, state):
+        if state.closed_buckets < self.window_buckets or state.window_count < self.min_volume:
+            return None
+        if state.last_alert_bucket is not None and state.head - state.last_alert_bucket < self.window_buckets:
+            return None  # one alert per key per window
+
+        volume = state.window_count
+        # Poisson-style floor keeps quiet keys from alerting on tiny absolute changes
+        volume_std = max(math.sqrt(state.volume_var), math.sqrt(max(state.volume_mean, 1.0)))
+        volume_z = (volume - state.volume_mean) / volume_std
+        mean_score = state.window_score_sum / volume
+        score_std = max(math.sqrt(state.score_var), 0.05)
+        score_z = (mean_score - state.score_mean) / score_std
+
+        reasons = []
+        if volume_z >= self.z_threshold:
+            reasons.append('volume_spike')
+        if score_z >= self.z_threshold and mean_score - state.score_mean >= self.score_jump:
+            reasons.append('score_spike')
+        if not reasons:
+            return None
+
+        state.last_alert_bucket = state.head
+        window_end = (state.head + 1) * self.bucket_seconds
+        vip_target, platform = key
+        alert = {
+            'vip_target': vip_target,
+            'platform': platform,
+            'reason': '+'.join(reasons),
+            'window_start': datetime.utcfromtimestamp(window_end - self.window_buckets * self.bucket_seconds),
+            'window_end': datetime.utcfromtimestamp(window_end),
+            'volume': volume,
+            'baseline_volume': round(state.volume_mean, 3),
+            'volume_z': round(volume_z, 2),
+            'mean_score': round(mean_score, 4),
+            'baseline_score': round(state.score_mean, 4),
+            'score_z': round(score_z, 2),
+            'detected_at': datetime.utcnow(),
+        }
+        logger.warning(f"Campaign alert for {vip_target} on {platform}: {alert['reason']} "
+                       f"({volume} posts vs baseline {state.volume_mean:.1f})")
+        return alert
@@ -1,21 +1,26 @@
 import os
 import sys
 import json
+import time
 import asyncio
 import logging
+import threading
+from contextlib import asynccontextmanager
 from datetime import datetime
 from typing import List, Optional
 
-from fastapi import FastAPI, HTTPException, BackgroundTasks, Query
+from fastapi import FastAPI, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
 
-# Add project root for imports
-sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+# Add backend root for imports
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
-from ingestion.ingestion import DataIngestion
-from ai.ai_scoring import VIPThreatScorer
+# Keep module imports light: DuckDB, pandas, the platform SDKs and the model are loaded
+# by init_components() after the server is listening
+from ingestion.state import MonitoringState
+from ai.policy import ScoringPolicy
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -23,14 +28,62 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Paths served before the heavy components finish loading
+STARTUP_PATHS = {'/', '/health', '/docs', '/redoc', '/openapi.json'}
+# How long other requests wait for initialization before getting a 503
+INIT_WAIT_SECONDS = float(os.getenv('API_INIT_WAIT_SECONDS', 30))
+
+# Global instances. The API only reads the database; scraping, scoring and all writes
+# happen in the ingestion worker (python -m ingestion.worker), so any number of API
+# worker processes can run side by side.
+data_ingestion = None
+threat_scorer = None
+monitoring_state = MonitoringState()
+components_ready = threading.Event()
+components_error = None
+
+def init_components():
+    global data_ingestion, threat_scorer, components_error
+    started = time.monotonic()
+    try:
+        from ingestion.ingestion import DataIngestion
+        from ai.ai_scoring import VIPThreatScorer
+        data_ingestion = DataIngestion(read_only=True)
+        threat_scorer = VIPThreatScorer()
+        logger.info(f"Components initialized in {time.monotonic() - started:.2f}s")
+    except Exception as e:
+        components_error = str(e)
+        logger.error(f"Component initialization failed: {e}")
+    finally:
+        components_ready.set()
+
+@asynccontextmanager
+async def lifespan(app):
+    threading.Thread(target=init_components, name="init-components", daemon=True).start()
+    yield
+
 app = FastAPI(
     title="VIP Threat Monitoring API",
     description="AI-powered VIP threat detection and monitoring system",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan
 )
 
+# Registered before CORS so CORS stays the outer layer and 503s carry its headers
+@app.middleware("http")
+async def wait_for_components(request, call_next):
+    if request.url.path not in STARTUP_PATHS:
+        if not components_ready.is_set():
+            loop = asyncio.get_running_loop()
+            if not await loop.run_in_executor(None, components_ready.wait, INIT_WAIT_SECONDS):
+                return JSONResponse({"detail": "Service is initializing"}, status_code=503,
+                                    headers={"Retry-After": "1"})
+        if components_error:
+            return JSONResponse({"detail": f"Initialization failed: {components_error}"}, status_code=503)
+    return await call_next(request)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],  # For production, configure specific origins
@@ -39,11 +92,31 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize global instances
-data_ingestion = DataIngestion()
-threat_scorer = VIPThreatScorer()
-monitoring_active = False
-last_ingestion_time = None
+# Handlers that open the database (or run the model) are plain `def`: FastAPI runs them in
+# its threadpool, so lock-retry backoff and slow queries never block the event loop
+
+def refresh_policy():
+    # The worker owns policy changes; pick up whatever it last applied
+    stored = data_ingestion.get_scoring_policy()
+    if stored and stored['version'] != threat_scorer.policy.version:
+        threat_scorer.policy = ScoringPolicy(**stored)
+    return threat_scorer.policy
+
+def fetch_rows(query, params=()):
+    conn = data_ingestion._get_db_connection()
+    try:
+        cursor = conn.execute(query, params)
+        columns = [d[0] for d in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+    finally:
+        conn.close()
+
+def fetch_value(query, params=()):
+    conn = data_ingestion._get_db_connection()
+    try:
+        return conn.execute(query, params).fetchone()[0]
+    finally:
+        conn.close()
 
 # Pydantic models
 
@@ -53,6 +126,13 @@ class MonitoringStatus(BaseModel):
     total_posts: int
     high_threat_posts: int
     system_health: str
+    worker_alive: bool = False
+    running_cycle: bool = False
+    cycles_completed: int = 0
+    last_cycle: Optional[dict] = None
+    scoring_queue: Optional[dict] = None
+    # Sharded workers by id, with the storage partitions each one holds
+    workers: Optional[dict] = None
 
 class Post(BaseModel):
     id: str
@@ -69,27 +149,76 @@ class Post(BaseModel):
 class ThreatAnalysisRequest(BaseModel):
     text: str
 
+class SearchHit(Post):
+    vip_target: Optional[str] = None
+    url: Optional[str] = None
+    relevance: float
+
+class AuthorProfile(BaseModel):
+    platform: str
+    author_id: str
+    author_username: Optional[str] = None
+    post_count: int
+    harassment_count: int
+    threat_count: int
+    doxxing_count: int
+    misinformation_count: int
+    spam_count: int
+    risk_score: float
+    first_seen: Optional[datetime]
+    last_seen: Optional[datetime]
+    vips_targeted: List[str]
+
+class CampaignAlert(BaseModel):
+    vip_target: str
+    platform: str
+    reason: str
+    window_start: datetime
+    window_end: datetime
+    volume: int
+    baseline_volume: float
+    volume_z: float
+    mean_score: float
+    baseline_score: float
+    score_z: float
+    detected_at: datetime
+
+class SearchResponse(BaseModel):
+    query: str
+    total: int
+    limit: int
+    offset: int
+    results: List[SearchHit]
+
 @app.get("/")
 async def root():
     return {
         "message": "VIP Threat Monitoring API",
         "version": "1.0.0",
         "status": "active",
-        "monitoring_active": monitoring_active,
+        "monitoring_active": monitoring_state.read_control()['active'],
         "docs": "/docs",
         "timestamp": datetime.now().isoformat()
     }
 
 @app.get("/health")
-async def health_check():
+def health_check():
+    if not components_ready.is_set() or components_error:
+        return {
+            "status": "unhealthy" if components_error else "starting",
+            "error": components_error,
+            "monitoring_active": monitoring_state.read_control()['active'],
+            "worker_alive": monitoring_state.worker_alive(),
+            "model_loaded": False,
+            "timestamp": datetime.now().isoformat()
+        }
     try:
-        conn = data_ingestion._get_db_connection()
-        total = conn.execute("SELECT COUNT(*) AS count FROM posts").fetchone()['count']
-        conn.close()
+        total = fetch_value("SELECT COUNT(*) FROM posts")
         return {
             "status": "healthy",
             "total_posts": total,
-            "monitoring_active": monitoring_active,
+            "monitoring_active": monitoring_state.read_control()['active'],
+            "worker_alive": monitoring_state.worker_alive(),
             "model_loaded": threat_scorer.pipeline is not None,
             "timestamp": datetime.now().isoformat()
         }
@@ -102,84 +231,64 @@ async def health_check():
         }
 
 @app.get("/api/monitoring/status", response_model=MonitoringStatus)
-async def get_monitoring_status():
+def get_monitoring_status():
     try:
-        conn = data_ingestion._get_db_connection()
-        total_posts = conn.execute("SELECT COUNT(*) as count FROM posts").fetchone()['count']
-        high_threat_posts = conn.execute(
-            "SELECT COUNT(*) as count FROM posts WHERE threat_score >= ?", (threat_scorer.threat_threshold,)
-        ).fetchone()['count']
-        conn.close()
+        refresh_policy()
+        total_posts = fetch_value("SELECT COUNT(*) FROM posts")
+        high_threat_posts = fetch_value(
+            "SELECT COUNT(*) FROM posts WHERE threat_score >= ?", (threat_scorer.threat_threshold,)
+        )
+        status = monitoring_state.read_cluster_status()
+        worker_alive = monitoring_state.worker_alive(status)
 
         return MonitoringStatus(
-            active=monitoring_active,
-            last_run=last_ingestion_time,
+            active=monitoring_state.read_control()['active'],
+            last_run=status['last_run'],
             total_posts=total_posts,
             high_threat_posts=high_threat_posts,
-            system_health="healthy"
+            system_health="healthy" if worker_alive else "worker_down",
+            worker_alive=worker_alive,
+            running_cycle=status['running_cycle'],
+            cycles_completed=status['cycles_completed'],
+            last_cycle=status['last_cycle'],
+            scoring_queue=status.get('scoring_queue') or (status['last_cycle'] or {}).get('scoring_queue'),
+            workers=status.get('workers')
         )
     except Exception as e:
         logger.error(f"Error getting monitoring status: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/monitoring/start")
-async def start_monitoring(background_tasks: BackgroundTasks):
-    global monitoring_active
-    if monitoring_active:
+async def start_monitoring():
+    if monitoring_state.read_control()['active']:
         return {"message": "Monitoring already active", "status": "active"}
-
-    monitoring_active = True
-
-    def monitoring_loop():
-        global last_ingestion_time
-        while monitoring_active:
-            logger.info("Running monitoring cycle...")
-            try:
-                data_ingestion.run_ingestion_cycle()
-                posts_df = data_ingestion.get_posts_for_analysis(limit=1000)
-                if not posts_df.empty:
-                    scores = threat_scorer.score_posts(posts_df)
-                    data_ingestion.update_post_scores(scores)
-                last_ingestion_time = datetime.now()
-                logger.info("Monitoring cycle completed")
-            except Exception as e:
-                logger.error(f"Error in monitoring loop: {e}")
-            # Sleep 5 minutes between cycles
-            import time
-            time.sleep(300)
-
-    background_tasks.add_task(monitoring_loop)
-    return {"message": "Monitoring started successfully", "status": "active"}
+    monitoring_state.update_control(active=True)
+    message = "Monitoring started successfully"
+    if not monitoring_state.worker_alive():
+        message += " (no ingestion worker is running; start one with: python -m ingestion.worker)"
+    return {"message": message, "status": "active"}
 
 @app.post("/api/monitoring/stop")
 async def stop_monitoring():
-    global monitoring_active
-    monitoring_active = False
+    monitoring_state.update_control(active=False)
     return {"message": "Monitoring stopped", "status": "inactive"}
 
-@app.post("/api/monitoring/run-cycle")
+@app.post("/api/monitoring/run-cycle", status_code=202)
 async def run_manual_cycle():
-    try:
-        ingestion_results = data_ingestion.run_ingestion_cycle()
-        posts_df = data_ingestion.get_posts_for_analysis(limit=500)
-        updated_count = 0
-        if not posts_df.empty:
-            scores = threat_scorer.score_posts(posts_df)
-            updated_count = data_ingestion.update_post_scores(scores)
-        return {
-            "message": "Manual cycle completed",
-            "ingestion_results": ingestion_results,
-            "posts_scored": updated_count,
-            "timestamp": datetime.now().isoformat()
-        }
-    except Exception as e:
-        logger.error(f"Manual cycle error: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+    if not monitoring_state.worker_alive():
+        raise HTTPException(status_code=503, detail="No ingestion worker is running")
+    requested_at = datetime.now().isoformat()
+    monitoring_state.update_control(run_requested_at=requested_at)
+    return {
+        "message": "Manual cycle requested; results appear in /api/monitoring/status",
+        "requested_at": requested_at,
+        "last_cycle": monitoring_state.read_cluster_status()['last_cycle'],
+        "timestamp": datetime.now().isoformat()
+    }
 
 @app.get("/api/posts/recent", response_model=List[Post])
-async def get_recent_posts(platform: Optional[str] = None, limit: int = Query(100, le=500)):
+def get_recent_posts(platform: Optional[str] = None, limit: int = Query(100, le=500)):
     try:
-        conn = data_ingestion._get_db_connection()
         query = "SELECT * FROM posts"
         params = []
         if platform:
@@ -187,8 +296,7 @@ async def get_recent_posts(platform: Optional[str] = None, limit: int = Query(10
             params.append(platform)
         query += " ORDER BY timestamp DESC LIMIT ?"
         params.append(limit)
-        rows = conn.execute(query, params).fetchall()
-        conn.close()
+        rows = fetch_rows(query, params)
         posts = []
         for row in rows:
             posts.append(Post(
@@ -209,12 +317,13 @@ async def get_recent_posts(platform: Optional[str] = None, limit: int = Query(10
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/posts/high-threat", response_model=List[Post])
-async def get_high_threat_posts(threshold: float = 0.7, limit: int = Query(50, le=200)):
+def get_high_threat_posts(threshold: Optional[float] = Query(None, ge=0.0, le=1.0),
+                                limit: int = Query(50, le=200)):
     try:
-        conn = data_ingestion._get_db_connection()
+        if threshold is None:
+            threshold = refresh_policy().threat_threshold
         query = "SELECT * FROM posts WHERE threat_score >= ? ORDER BY threat_score DESC LIMIT ?"
-        rows = conn.execute(query, (threshold, limit)).fetchall()
-        conn.close()
+        rows = fetch_rows(query, (threshold, limit))
         posts = []
         for row in rows:
             posts.append(Post(
@@ -234,17 +343,170 @@ async def get_high_threat_posts(threshold: float = 0.7, limit: int = Query(50, l
         logger.error(f"Error fetching high threat posts: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/posts/search", response_model=SearchResponse)
+def search_posts(
+    q: str = Query(..., min_length=1, description='Terms, "quoted phrases", AND / OR / NOT'),
+    vip: Optional[str] = None,
+    platform: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    min_score: Optional[float] = Query(None, ge=0.0, le=1.0),
+    max_score: Optional[float] = Query(None, ge=0.0, le=1.0),
+    limit: int = Query(50, ge=1, le=200),
+    offset: int = Query(0, ge=0)
+):
+    try:
+        total, rows = data_ingestion.search_posts(
+            q, vip=vip, platform=platform, since=since, until=until,
+            min_score=min_score, max_score=max_score, limit=limit, offset=offset
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error searching posts: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    results = [SearchHit(
+        id=row['id'],
+        platform=row['platform'],
+        content=row['content'],
+        author_username=row['author_username'],
+        timestamp=row['timestamp'],
+        threat_score=row['threat_score'],
+        threat_category=row['threat_category'],
+        likes=row['likes'],
+        shares=row['shares'],
+        comments=row['comments'],
+        vip_target=row['vip_target'],
+        url=row['url'],
+        relevance=row['relevance']
+    ) for row in rows]
+    return SearchResponse(query=q, total=total, limit=limit, offset=offset, results=results)
+
+EXPORT_FORMATS = {
+    'arrow': ('application/vnd.apache.arrow.stream', 'arrows'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+
+class ChunkSink:
+    """Write-only file object whose contents are handed out and dropped after every batch."""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def take(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+def stream_export(fmt, columns, filters, batch_size):
+    # Runs in Starlette's threadpool; the database is already closed and each snapshot batch
+    # is encoded and sent before the next is read
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    with data_ingestion.export_posts(columns, batch_size=batch_size, **filters) as reader:
+        sink = ChunkSink()
+        if fmt == 'parquet':
+            writer = pq.ParquetWriter(pa.PythonFile(sink, mode='w'), reader.schema, compression='zstd')
+        else:
+            writer = pa.ipc.new_stream(pa.PythonFile(sink, mode='w'), reader.schema)
+        for batch in reader:
+            if fmt == 'parquet':
+                writer.write_table(pa.Table.from_batches([batch]), row_group_size=batch_size)
+            else:
+                writer.write_batch(batch)
+            chunk = sink.take()
+            if chunk:
+                yield chunk
+        writer.close()
+        yield sink.take()
+
+@app.get("/api/export")
+def export_posts(
+    format: str = Query('arrow', pattern='^(arrow|parquet)$'),
+    columns: Optional[str] = Query(None, description="Comma-separated posts columns (default: all)"),
+    vip: Optional[str] = None,
+    platform: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    min_score: Optional[float] = Query(None, ge=0.0, le=1.0),
+    batch_size: int = Query(65536, ge=1024, le=1048576)
+):
+    """Stream matching posts as an Arrow IPC stream or a Parquet file, one row group per batch."""
+    selected = None
+    if columns:
+        selected = [c.strip() for c in columns.split(',') if c.strip()]
+        unknown = set(selected) - set(data_ingestion.post_columns())
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown columns: {', '.join(sorted(unknown))}")
+    filters = {'vip': vip, 'platform': platform, 'since': since, 'until': until, 'min_score': min_score}
+    media_type, extension = EXPORT_FORMATS[format]
+    filename = f"posts-{datetime.now().strftime('%Y%m%dT%H%M%S')}.{extension}"
+    return StreamingResponse(
+        stream_export(format, selected, filters, batch_size),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@app.get("/api/authors/{author_id}", response_model=List[AuthorProfile])
+def get_author_profile(author_id: str, platform: Optional[str] = None):
+    try:
+        profiles = data_ingestion.author_profiles.fetch(author_id, platform=platform)
+    except Exception as e:
+        logger.error(f"Error fetching author profile: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    if not profiles:
+        raise HTTPException(status_code=404, detail="Author not found")
+    return [AuthorProfile(**p) for p in profiles]
+
+@app.get("/api/alerts/campaigns", response_model=List[CampaignAlert])
+def get_campaign_alerts(vip: Optional[str] = None, platform: Optional[str] = None,
+                              since: Optional[datetime] = None, limit: int = Query(100, ge=1, le=500)):
+    try:
+        query = "SELECT * FROM campaign_alerts WHERE 1 = 1"
+        params = []
+        if vip:
+            query += " AND vip_target = ?"
+            params.append(vip)
+        if platform:
+            query += " AND platform = ?"
+            params.append(platform)
+        if since:
+            query += " AND detected_at >= ?"
+            params.append(since)
+        query += " ORDER BY detected_at DESC LIMIT ?"
+        params.append(limit)
+        return [CampaignAlert(**row) for row in fetch_rows(query, params)]
+    except Exception as e:
+        logger.error(f"Error fetching campaign alerts: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.get("/api/analytics/dashboard")
-async def get_dashboard_analytics():
+def get_dashboard_analytics():
     try:
-        conn = data_ingestion._get_db_connection()
-        total_posts = conn.execute("SELECT COUNT(*) as count FROM posts").fetchone()['count']
-        threat_posts = conn.execute(
-            "SELECT COUNT(*) as count FROM posts WHERE threat_score >= ?", (threat_scorer.threat_threshold,)
-        ).fetchone()['count']
-        platforms = conn.execute("SELECT DISTINCT platform FROM posts").fetchall()
-        platform_count = len(platforms)
-        conn.close()
+        refresh_policy()
+        total_posts = fetch_value("SELECT COUNT(*) FROM posts")
+        threat_posts = fetch_value(
+            "SELECT COUNT(*) FROM posts WHERE threat_score >= ?", (threat_scorer.threat_threshold,)
+        )
+        platform_count = fetch_value("SELECT COUNT(DISTINCT platform) FROM posts")
         return {
             "total_posts": total_posts,
             "threats_detected": threat_posts,
@@ -258,28 +520,68 @@ async def get_dashboard_analytics():
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/ai/analyze-text")
-async def analyze_text_get(text: str):
+def analyze_text_get(text: str):
     # Convenience GET handler (optional)
-    return await analyze_text_post(ThreatAnalysisRequest(text=text))
+    return analyze_text_post(ThreatAnalysisRequest(text=text))
 
 @app.post("/api/ai/analyze-text")
-async def analyze_text_post(request: ThreatAnalysisRequest):
+def analyze_text_post(request: ThreatAnalysisRequest):
     if not request.text.strip():
         raise HTTPException(status_code=400, detail="Text cannot be empty.")
+    refresh_policy()
     result = threat_scorer.predict_threat(request.text)
     return {
         "analysis": result,
         "timestamp": datetime.now().isoformat()
     }
 
+@app.get("/api/scoring/policy")
+def get_scoring_policy():
+    try:
+        active = refresh_policy()
+    except Exception as e:
+        logger.error(f"Error fetching scoring policy: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    control = monitoring_state.read_control()
+    status = monitoring_state.read_cluster_status()
+    pending = None
+    if control.get('policy_requested_at') and control['policy_requested_at'] != status.get('policy_request_handled'):
+        pending = control.get('scoring_policy')
+    return {
+        "active": active,
+        "pending": pending,
+        "last_change": status.get('last_policy_change'),
+        "timestamp": datetime.now().isoformat()
+    }
+
+@app.put("/api/scoring/policy", status_code=202)
+async def update_scoring_policy(policy: ScoringPolicy):
+    # Applied by the ingestion worker, which re-derives stored scores in SQL
+    if not monitoring_state.worker_alive():
+        raise HTTPException(status_code=503, detail="No ingestion worker is running")
+    requested_at = datetime.now().isoformat()
+    monitoring_state.update_control(scoring_policy=policy.model_dump(exclude={'version'}),
+                                    policy_requested_at=requested_at)
+    return {"message": "Scoring policy change requested", "requested_at": requested_at}
+
 @app.get("/api/config")
-async def get_configuration():
+def get_configuration():
     return {
-        "threat_threshold": threat_scorer.threat_threshold,
+        "threat_threshold": refresh_policy().threat_threshold,
         "vip_keywords": threat_scorer.vip_keywords,
         "threat_keywords": threat_scorer.threat_keywords,
         "model_path": threat_scorer.model_path,
         "database_path": data_ingestion.db_path,
-        "monitoring_active": monitoring_active,
+        "monitoring_active": monitoring_state.read_control()['active'],
         "timestamp": datetime.now().isoformat()
     }
+
+if __name__ == "__main__":
+    import uvicorn
+    # Several API workers are safe: they share no in-process state and open the database read-only
+    uvicorn.run(
+        "dashboard:app",
+        host=os.getenv('API_HOST', '0.0.0.0'),
+        port=int(os.getenv('API_PORT', 8000)),
+        workers=int(os.getenv('API_WORKERS', 1))
+    )
@@ -0,0 +1,140 @@
+"""
+VIP Threat Monitoring - API Startup Benchmark
+Cold-starts the dashboard API in a fresh interpreter and reports the time to the first
+/health answer and to full readiness, plus a `-X importtime` breakdown of the modules
+imported before the server could answer and of those deferred to background init.
+
+Runs against a fresh empty database in a temp directory unless --db is given.
+
+Usage (from backend/):
+    python dashboard/startup_benchmark.py --runs 3 --top 15
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+import subprocess
+import urllib.request
+import urllib.error
+
+DASHBOARD_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(DASHBOARD_DIR)
+
+
+def create_database(directory):
+    """An empty posts database, as the worker would create it."""
+    sys.path.insert(0, BACKEND_DIR)
+    from ingestion.ingestion import DataIngestion
+    return DataIngestion(db_path=os.path.join(directory, 'vip_threats.db')).db_path
+
+
+def poll_health(url, deadline):
+    """GET /health until it answers; returns the decoded body or None on timeout."""
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=1) as resp:
+                return json.loads(resp.read())
+        except (urllib.error.URLError, ConnectionError, OSError):
+            time.sleep(0.01)
+    return None
+
+
+def cold_start(port, importtime=False, timeout=60.0, env=None):
+    """Start the API once. Returns (seconds_to_health, seconds_to_ready, stderr_path, health_offset)."""
+    env = dict(env or os.environ, API_HOST='127.0.0.1', API_PORT=str(port), API_WORKERS='1')
+    # Same working directory as run_complete.py / start_app.sh give the API
+    command = [sys.executable] + (['-X', 'importtime'] if importtime else []) + [os.path.join('dashboard', 'dashboard.py')]
+    stderr = tempfile.NamedTemporaryFile('w+', suffix='.log', delete=False)
+    url = f"http://127.0.0.1:{port}/health"
+
+    started = time.monotonic()
+    proc = subprocess.Popen(command, cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=stderr)
+    try:
+        deadline = started + timeout
+        body = poll_health(url, deadline)
+        if body is None:
+            raise RuntimeError(f"API did not answer {url} within {timeout}s (see {stderr.name})")
+        to_health = time.monotonic() - started
+        # Everything written to stderr so far was imported before the first answer
+        health_offset = os.path.getsize(stderr.name)
+
+        while body.get('status') == 'starting' and time.monotonic() < deadline:
+            time.sleep(0.02)
+            body = poll_health(url, deadline) or body
+        to_ready = time.monotonic() - started
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
+        stderr.close()
+    return to_health, to_ready, stderr.name, health_offset
+
+
+def parse_importtime(path, start=0, end=None):
+    """Top-level (depth 0) imports from -X importtime output as [(cumulative_us, module)]."""
+    with open(path, 'rb') as f:
+        f.seek(start)
+        data = f.read(None if end is None else end - start).decode('utf-8', 'replace')
+    imports = []
+    for line in data.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative_us, name = line[len('import time:'):].split('|')
+        # Nested imports are indented two extra spaces per level
+        name = name[1:]
+        if not name.startswith(' '):
+            imports.append((int(cumulative_us), name.strip()))
+    return sorted(imports, reverse=True)
+
+
+def print_imports(title, imports, top):
+    total = sum(us for us, _ in imports)
+    print(f"\n{title}: {len(imports)} top-level modules, {total / 1e6:.3f}s cumulative")
+    for us, name in imports[:top]:
+        print(f"  {us / 1000:9.1f} ms  {name}")
+
+
+def run_benchmark(args, env):
+    health_times, ready_times = [], []
+    for _ in range(args.runs):
+        to_health, to_ready, log_path, _ = cold_start(args.port, env=env)
+        os.unlink(log_path)
+        health_times.append(to_health)
+        ready_times.append(to_ready)
+
+    print(f"Cold start over {args.runs} run(s):")
+    print(f"  first /health  median {statistics.median(health_times):.3f}s  max {max(health_times):.3f}s")
+    print(f"  fully ready    median {statistics.median(ready_times):.3f}s  max {max(ready_times):.3f}s")
+
+    # Separate run: -X importtime itself slows imports down
+    _, _, log_path, health_offset = cold_start(args.port, importtime=True, env=env)
+    try:
+        print_imports("Imported before first /health", parse_importtime(log_path, 0, health_offset), args.top)
+        print_imports("Imported by background init", parse_importtime(log_path, health_offset), args.top)
+    finally:
+        os.unlink(log_path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure dashboard API cold start")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--top', type=int, default=15, help="imports to list per phase")
+    parser.add_argument('--db', help="database to open (default: a fresh empty one)")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as scratch:
+        env = dict(os.environ, MONITOR_STATE_DIR=os.path.join(scratch, 'state'),
+                   DATABASE_PATH=os.path.abspath(args.db) if args.db else create_database(scratch))
+        run_benchmark(args, env)
+
+
+if __name__ == "__main__":
+    main()
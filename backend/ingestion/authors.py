@@ -0,0 +1,217 @@
+"""
+VIP Threat Monitoring - Author Risk Profiles
+Per-author aggregates keyed by (platform, author_id), updated incrementally as posts are scored
+"""
+
+import os
+import math
+import logging
+from datetime import datetime
+
+import pandas as pd
+
+from ai.policy import _sql_double
+
+logger = logging.getLogger(__name__)
+
+PROFILE_CATEGORIES = ['harassment', 'threat', 'doxxing', 'misinformation', 'spam']
+
+
+def author_key(author_id, author_username=None):
+    """The id a profile is keyed by: author_id, else the username; None when both are missing."""
+    for value in (author_id, author_username):
+        if _present(value):
+            return value
+    return None
+
+
+def _present(value):
+    # Missing values arrive as None, NaN or pd.NA from DataFrames, or as empty strings
+    return value is not None and not (pd.api.types.is_scalar(value) and pd.isna(value)) and str(value).strip() != ''
+
+
+class AuthorProfileStore:
+    """
+    Write-back cache over the author_profiles table.
+
+    Profiles for a scoring batch are loaded with one query, updated in memory in O(1)
+    per post and written back with one upsert on flush().
+    """
+
+    def __init__(self, connect):
+        self._connect = connect
+        self.half_life_hours = float(os.getenv('AUTHOR_RISK_HALF_LIFE_HOURS', 72))
+        self._profiles = {}
+        self._dirty = set()
+
+    def create_table(self, conn):
+        category_columns = ",\n".join(f"                {c}_count INTEGER DEFAULT 0" for c in PROFILE_CATEGORIES)
+        conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS author_profiles (
+                platform VARCHAR,
+                author_id VARCHAR,
+                author_username VARCHAR,
+                post_count INTEGER DEFAULT 0,
+{category_columns},
+                risk_score DOUBLE DEFAULT 0.0,
+                risk_updated_at TIMESTAMP,
+                first_seen TIMESTAMP,
+                last_seen TIMESTAMP,
+                vips_targeted VARCHAR[],
+                PRIMARY KEY (platform, author_id)
+            )
+        """)
+
+    def load(self, keys):
+        """Bring the profiles for (platform, author_id) keys into the cache."""
+        missing = {k for k in keys if k[1] and k not in self._profiles}
+        if not missing:
+            return
+        conn = self._connect()
+        try:
+            keys_df = pd.DataFrame(list(missing), columns=['platform', 'author_id'])
+            conn.register('wanted_authors', keys_df)
+            cursor = conn.execute("""
+                SELECT a.* FROM author_profiles a
+                JOIN wanted_authors w ON a.platform = w.platform AND a.author_id = w.author_id
+            """)
+            columns = [d[0] for d in cursor.description]
+            for row in cursor.fetchall():
+                profile = dict(zip(columns, row))
+                profile['vips_targeted'] = set(profile['vips_targeted'] or [])
+                self._profiles[(profile['platform'], profile['author_id'])] = profile
+            conn.unregister('wanted_authors')
+        finally:
+            conn.close()
+
+    def get(self, platform, author_id, now=None):
+        """Return the cached profile with its risk decayed to `now`, or None for unknown authors."""
+        profile = self._profiles.get((platform, author_id))
+        if profile is None:
+            return None
+        return dict(profile, risk_score=self._decayed_risk(profile, now or datetime.utcnow()))
+
+    def record(self, platform, author_id, author_username, category, threat_score, vip_target=None, now=None):
+        """Fold one scored post into its author's profile; `now` is the post's time."""
+        if not _present(author_id):
+            return
+        if not _present(author_username):
+            author_username = None
+        now = now or datetime.utcnow()
+        key = (platform, author_id)
+        profile = self._profiles.get(key)
+        if profile is None:
+            profile = {
+                'platform': platform,
+                'author_id': author_id,
+                'author_username': author_username,
+                'post_count': 0,
+                'risk_score': 0.0,
+                'risk_updated_at': now,
+                'first_seen': now,
+                'last_seen': now,
+                'vips_targeted': set()
+            }
+            for c in PROFILE_CATEGORIES:
+                profile[f'{c}_count'] = 0
+            self._profiles[key] = profile
+
+        updated = profile['risk_updated_at']
+        if updated and now < updated:
+            # A post older than the profile's last update adds its score decayed to that time
+            hours = (updated - now).total_seconds() / 3600
+            profile['risk_score'] += float(threat_score) * math.pow(0.5, hours / self.half_life_hours)
+        else:
+            profile['risk_score'] = self._decayed_risk(profile, now) + float(threat_score)
+            profile['risk_updated_at'] = now
+        profile['post_count'] += 1
+        if category in PROFILE_CATEGORIES:
+            profile[f'{category}_count'] += 1
+        if vip_target:
+            profile['vips_targeted'].add(vip_target)
+        if author_username:
+            profile['author_username'] = author_username
+        profile['first_seen'] = min(profile['first_seen'] or now, now)
+        profile['last_seen'] = max(profile['last_seen'] or now, now)
+        self._dirty.add(key)
+
+    def flush(self):
+        """Persist updated profiles and drop the batch cache. Returns profiles written."""
+        if not self._dirty:
+            self._profiles.clear()
+            return 0
+        rows = []
+        for key in self._dirty:
+            profile = dict(self._profiles[key])
+            profile['vips_targeted'] = sorted(profile['vips_targeted'])
+            rows.append(profile)
+        df = pd.DataFrame(rows)
+        columns = ['platform', 'author_id', 'author_username', 'post_count'] + \
+                  [f'{c}_count' for c in PROFILE_CATEGORIES] + \
+                  ['risk_score', 'risk_updated_at', 'first_seen', 'last_seen', 'vips_targeted']
+        df = df[columns]
+        updates = ", ".join(f"{c} = excluded.{c}" for c in columns
+                            if c not in ('platform', 'author_id', 'first_seen', 'last_seen'))
+
+        conn = self._connect()
+        try:
+            conn.register('dirty_authors', df)
+            conn.execute(f"""
+                INSERT INTO author_profiles ({", ".join(columns)})
+                SELECT {", ".join(columns)} FROM dirty_authors
+                ON CONFLICT (platform, author_id) DO UPDATE SET {updates},
+                    first_seen = LEAST(author_profiles.first_seen, excluded.first_seen),
+                    last_seen = GREATEST(author_profiles.last_seen, excluded.last_seen)
+            """)
+            conn.unregister('dirty_authors')
+        finally:
+            conn.close()
+
+        written = len(rows)
+        self._dirty.clear()
+        self._profiles.clear()
+        return written
+
+    def fetch(self, author_id, platform=None):
+        """Read persisted profiles for an author, with risk decayed to now."""
+        conn = self._connect()
+        try:
+            query = "SELECT * FROM author_profiles WHERE author_id = ?"
+            params = [author_id]
+            if platform:
+                query += " AND platform = ?"
+                params.append(platform)
+            cursor = conn.execute(query + " ORDER BY last_seen DESC", params)
+            columns = [d[0] for d in cursor.description]
+            profiles = [dict(zip(columns, row)) for row in cursor.fetchall()]
+        finally:
+            conn.close()
+        now = datetime.utcnow()
+        merged = {}
+        for profile in profiles:
+            profile['vips_targeted'] = list(profile['vips_targeted'] or [])
+            profile['risk_score'] = self._decayed_risk(profile, now)
+            # With sharded storage an author has one row per partition they posted into
+            key = profile['platform']
+            if key not in merged:
+                merged[key] = profile
+                continue
+            combined = merged[key]
+            for column in ['post_count', 'risk_score'] + [f'{c}_count' for c in PROFILE_CATEGORIES]:
+                combined[column] += profile[column]
+            combined['first_seen'] = min(combined['first_seen'], profile['first_seen'])
+            combined['vips_targeted'] = sorted(set(combined['vips_targeted']) | set(profile['vips_targeted']))
+        return list(merged.values())
+
+    def risk_sql(self, now):
+        """_decayed_risk() to epoch seconds `now` as SQL over author_profiles aliased `a`."""
+        hours = f"({_sql_double(now)} - epoch_us(a.risk_updated_at) / 1000000.0) / 3600.0"
+        return (f"CASE WHEN a.risk_updated_at IS NULL OR {hours} <= 0 THEN a.risk_score "
+                f"ELSE a.risk_score * pow(0.5::DOUBLE, {hours} / {_sql_double(self.half_life_hours)}) END")
+
+    def _decayed_risk(self, profile, now):
+        updated = profile.get('risk_updated_at')
+        if not updated or now <= updated:
+            return profile['risk_score']
+        hours = (now - updated).total_seconds() / 3600
+        return profile['risk_score'] * math.pow(0.5, hours / self.half_life_hours)
@@ -0,0 +1,254 @@
+"""
+VIP Threat Monitoring - Conditional HTTP Response Cache
+Persistent ETag/Last-Modified cache underneath the Reddit (prawcore) and GitHub (PyGithub)
+clients. Repeated GETs are sent as conditional requests; a 304 is answered from the local
+copy, so polling a quiet subreddit or repository costs almost no quota or transfer time.
+
+Each platform gets one pooled keep-alive requests.Session with the caching adapter mounted.
+"""
+
+import os
+import json
+import base64
+import hashlib
+import logging
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+logger = logging.getLogger(__name__)
+
+POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', 10))
+# Entries older than this (since last stored or revalidated) are dropped, and only the
+# newest HTTP_CACHE_MAX_ENTRIES are kept
+CACHE_MAX_ENTRIES = int(os.getenv('HTTP_CACHE_MAX_ENTRIES', 5000))
+CACHE_MAX_AGE_SECONDS = float(os.getenv('HTTP_CACHE_MAX_AGE_HOURS', 168)) * 3600
+# Writes between pruning passes over the cache directory
+PRUNE_EVERY = 100
+
+# Describe the original transfer, not the decoded body we keep
+_DROPPED_HEADERS = ('Content-Encoding', 'Content-Length', 'Transfer-Encoding', 'Connection')
+# Request headers that select a different representation (or a different user's view) of
+# the same URL; always part of the cache key
+_KEY_HEADERS = ('Accept', 'Authorization')
+
+
+def _digest(value):
+    return hashlib.sha1((value or '').encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+    """
+    Validators and bodies of 200 GET responses, one JSON file per URL and key headers.
+
+    Request header values only enter the cache as hashes, so credentials never reach disk.
+    A response's Vary headers are recorded the same way and must match for a later hit.
+    """
+
+    def __init__(self, directory=None, max_entries=None, max_age_seconds=None):
+        self.directory = directory or os.getenv('HTTP_CACHE_DIR', './data/http_cache')
+        self.max_entries = max_entries if max_entries is not None else CACHE_MAX_ENTRIES
+        self.max_age_seconds = max_age_seconds if max_age_seconds is not None else CACHE_MAX_AGE_SECONDS
+        os.makedirs(self.directory, exist_ok=True)
+        self.stats = defaultdict(int)
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.prune()
+
+    def get(self, url, headers=None):
+        headers = headers or {}
+        path = self._path(url, headers)
+        try:
+            with open(path, 'r') as f:
+                age = time.time() - os.fstat(f.fileno()).st_mtime
+                entry = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        if age > self.max_age_seconds:
+            self._remove(path)
+            return None
+        if entry.get('url') != url:
+            return None
+        if any(_digest(headers.get(name)) != value for name, value in entry.get('vary', {}).items()):
+            return None
+        return entry
+
+    def put(self, url, response, headers=None):
+        """Store a 200 response to a request with `headers`. Returns False if it may not be cached."""
+        headers = headers or {}
+        vary = [name.strip() for name in response.headers.get('Vary', '').split(',') if name.strip()]
+        if '*' in vary:
+            return False
+        entry = {
+            'url': url,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'vary': {name: _digest(headers.get(name)) for name in vary},
+            'status': response.status_code,
+            'reason': response.reason,
+            'headers': {k: v for k, v in response.headers.items() if k not in _DROPPED_HEADERS},
+            'body': base64.b64encode(response.content).decode('ascii'),
+        }
+        # Write-then-rename so a crashed write never leaves a truncated entry
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, self._path(url, headers))
+        with self._lock:
+            self._writes += 1
+            prune = self._writes % PRUNE_EVERY == 0
+        if prune:
+            self.prune()
+        return True
+
+    def touch(self, url, headers=None):
+        """Mark an entry as just revalidated, restarting its age."""
+        try:
+            os.utime(self._path(url, headers or {}))
+        except FileNotFoundError:
+            pass
+
+    def prune(self):
+        """Drop expired entries, then the oldest ones beyond max_entries. Returns entries removed."""
+        entries = []
+        now = time.time()
+        with os.scandir(self.directory) as it:
+            for item in it:
+                if not item.name.endswith('.json'):
+                    continue
+                try:
+                    entries.append((item.stat().st_mtime, item.path))
+                except FileNotFoundError:
+                    continue
+        entries.sort(reverse=True)
+        stale = [path for mtime, path in entries if now - mtime > self.max_age_seconds]
+        fresh = [path for mtime, path in entries if now - mtime <= self.max_age_seconds]
+        removed = stale + fresh[self.max_entries:]
+        for path in removed:
+            self._remove(path)
+        if removed:
+            self.count('pruned', len(removed))
+        return len(removed)
+
+    def count(self, key, n=1):
+        with self._lock:
+            self.stats[key] += n
+
+    def _path(self, url, headers):
+        key = "\n".join([url] + [_digest(headers.get(name)) for name in _KEY_HEADERS])
+        return os.path.join(self.directory, hashlib.sha1(key.encode('utf-8')).hexdigest() + '.json')
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+class ConditionalCacheAdapter(HTTPAdapter):
+    """Transport adapter that revalidates cached GETs and turns 304s back into the cached 200."""
+
+    def __init__(self, cache, **kwargs):
+        self.cache = cache
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        if request.method != 'GET':
+            return super().send(request, **kwargs)
+
+        # Key on the headers as the caller sent them, before the validators are added
+        headers = CaseInsensitiveDict(request.headers)
+        entry = self.cache.get(request.url, headers)
+        if entry:
+            if entry.get('etag'):
+                request.headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                request.headers['If-Modified-Since'] = entry['last_modified']
+
+        response = super().send(request, **kwargs)
+
+        if response.status_code == 304 and entry:
+            self.cache.count('not_modified')
+            self.cache.touch(request.url, headers)
+            return self._from_cache(entry, response, request)
+        if (response.status_code == 200 and ('ETag' in response.headers or 'Last-Modified' in response.headers)
+                and self.cache.put(request.url, response, headers)):
+            self.cache.count('stored')
+        else:
+            self.cache.count('uncached')
+        return response
+
+    def _from_cache(self, entry, not_modified, request):
+        cached = requests.Response()
+        cached.status_code = entry['status']
+        cached.reason = entry['reason']
+        cached.headers = CaseInsensitiveDict(entry['headers'])
+        # Fresh per-request headers (rate limits, dates) come from the 304 itself
+        for key, value in not_modified.headers.items():
+            if key not in _DROPPED_HEADERS:
+                cached.headers[key] = value
+        cached._content = base64.b64decode(entry['body'])
+        cached.encoding = requests.utils.get_encoding_from_headers(cached.headers)
+        cached.url = request.url
+        cached.request = request
+        cached.elapsed = not_modified.elapsed
+        cached.connection = self
+        not_modified.close()
+        return cached
+
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def platform_session(platform, cache=None, max_retries=0):
+    """The shared pooled, caching session for one platform (created on first use)."""
+    with _sessions_lock:
+        session = _sessions.get(platform)
+        if session is None:
+            adapter = ConditionalCacheAdapter(cache or ResponseCache(), pool_connections=POOL_SIZE,
+                                              pool_maxsize=POOL_SIZE, max_retries=max_retries)
+            session = requests.Session()
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _sessions[platform] = session
+        return session
+
+
+def cache_stats():
+    """Conditional-request counters per platform session."""
+    stats = {}
+    for platform, session in list(_sessions.items()):
+        stats[platform] = dict(session.get_adapter('https://').cache.stats)
+    return stats
+
+
+def github_connection_classes(session):
+    """PyGithub connection classes that send every request through `session`."""
+    from github.Requester import Requester, HTTPRequestsConnectionClass, HTTPSRequestsConnectionClass
+
+    # PyGithub sets this so requests does not fall back to ~/.netrc credentials
+    session.auth = Requester.noopAuth
+
+    def init(self, host, port=None, strict=False, timeout=None, retry=None, pool_size=None, **kwargs):
+        # Same attributes as PyGithub's own classes, minus the private session and adapter
+        self.host = host
+        self.port = port if port else self.default_port
+        self.timeout = timeout
+        self.verify = kwargs.get('verify', True)
+        self.session = session
+
+    def close(self):
+        pass  # the shared session outlives PyGithub's per-request connection objects
+
+    http_class = type('CachedHTTPConnection', (HTTPRequestsConnectionClass,),
+                      {'__init__': init, 'close': close, 'protocol': 'http', 'default_port': 80})
+    https_class = type('CachedHTTPSConnection', (HTTPSRequestsConnectionClass,),
+                       {'__init__': init, 'close': close, 'protocol': 'https', 'default_port': 443})
+    return http_class, https_class
@@ -1,41 +1,517 @@
 # ingestion.py
 
-import snscrape.modules.twitter as sntwitter
-import praw
-from github import Github
-from telethon import TelegramClient, events, sync
+import os
+import json
+import time
+import logging
 import asyncio
+import tempfile
+from contextlib import contextmanager
+import duckdb
+import pandas as pd
+import pyarrow as pa
+import yaml
+from dotenv import load_dotenv
+
+from ingestion.models import CanonicalBatch
+from ingestion.search import PostSearchIndex
+from ingestion.authors import AuthorProfileStore
+from ingestion.replay import PayloadRecorder
+from ingestion.http_cache import platform_session, github_connection_classes, cache_stats
+from ingestion.sharding import PartitionLayout, connect_partitions, sharding_enabled
+from ai.policy import PROBABILITY_COLUMNS
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+DB_LOCK_RETRIES = int(os.getenv('DB_LOCK_RETRIES', 8))
+# The worker waits out API reads holding the file, such as an export writing its snapshot
+# (about a minute at the 1s backoff cap)
+DB_WRITE_LOCK_RETRIES = int(os.getenv('DB_WRITE_LOCK_RETRIES', 64))
+
+# Where exports snapshot their result before streaming it (default: the system temp dir)
+EXPORT_TMP_DIR = os.getenv('EXPORT_TMP_DIR') or None
+
+VIP_LIST_PATH = os.getenv('VIP_LIST_PATH', os.path.join(os.path.dirname(__file__), 'vip_list.yaml'))
+
+def load_vip_list(path=VIP_LIST_PATH):
+    with open(path, 'r') as f:
+        return yaml.safe_load(f).get('vips', [])
 
 class DataIngestion:
-    def __init__(self, twitter_username, reddit_client_id, reddit_client_secret, reddit_user_agent,
-                 github_access_token, telegram_api_id, telegram_api_hash, telegram_username):
-        # Initialize Twitter scraper username
+    def __init__(self, twitter_username=None, reddit_client_id=None, reddit_client_secret=None, reddit_user_agent=None,
+                 github_access_token=None, telegram_api_id=None, telegram_api_hash=None, telegram_username=None,
+                 db_path=None, read_only=False):
+        self.db_path = db_path or os.getenv('DATABASE_PATH', './data/vip_threats.db')
+        # API processes open the database read-only; only the ingestion worker writes
+        self.read_only = read_only
+        # With SHARD_DIR set, a reader without an explicit db_path sees all partition files
+        # as one database (ingestion.sharding); workers pass the partition file they own
+        self.partition_layout = None
+        if read_only and not db_path and sharding_enabled():
+            self.partition_layout = PartitionLayout()
+            self.db_path = self.partition_layout.directory
+
+        # Platform SDKs are imported and their clients built on first use (see the
+        # properties below), so processes that never scrape a source never load its SDK
         self.twitter_username = twitter_username
 
-        # Initialize Reddit client
-        self.reddit = praw.Reddit(
-            client_id=reddit_client_id,
-            client_secret=reddit_client_secret,
-            user_agent=reddit_user_agent
-        )
+        # *_API_BASE / TELEGRAM_FEED_URL redirect the clients, e.g. to ingestion.platform_simulator
+        self.reddit_client_id = reddit_client_id or os.getenv('REDDIT_CLIENT_ID')
+        self.reddit_client_secret = reddit_client_secret or os.getenv('REDDIT_CLIENT_SECRET')
+        self.reddit_user_agent = reddit_user_agent or os.getenv('REDDIT_USER_AGENT', 'VIPThreatMonitor/1.0')
+        self.github_access_token = github_access_token or os.getenv('GITHUB_TOKEN')
+        self.telegram_api_id = telegram_api_id or os.getenv('TELEGRAM_API_ID')
+        self.telegram_api_hash = telegram_api_hash or os.getenv('TELEGRAM_API_HASH')
+        self.telegram_feed_url = os.getenv('TELEGRAM_FEED_URL')
+        self.telegram_username = telegram_username
+        self._reddit = None
+        self._github = None
+        self._telegram_client = None
 
-        # Initialize Github client
-        self.g = Github(github_access_token)
+        self.author_profiles = AuthorProfileStore(self._get_db_connection)
+        if not read_only:
+            self._init_database()
 
-        # Initialize Telegram client
-        self.telegram_client = TelegramClient('session_name', telegram_api_id, telegram_api_hash)
-        self.telegram_username = telegram_username
+        # Optionally keep every raw payload for offline replay
+        record_dir = os.getenv('PAYLOAD_RECORD_DIR')
+        self.recorder = PayloadRecorder(record_dir) if record_dir else None
+
+    @property
+    def reddit_enabled(self):
+        return bool(self.reddit_client_id)
+
+    @property
+    def telegram_enabled(self):
+        return bool(self.telegram_feed_url or self.telegram_api_id)
+
+    @property
+    def reddit(self):
+        if self._reddit is None and self.reddit_enabled:
+            import praw
+            reddit_api_base = os.getenv('REDDIT_API_BASE')
+            endpoints = {'oauth_url': reddit_api_base, 'reddit_url': reddit_api_base} if reddit_api_base else {}
+            self._reddit = praw.Reddit(
+                client_id=self.reddit_client_id,
+                client_secret=self.reddit_client_secret,
+                user_agent=self.reddit_user_agent,
+                # Pooled session with the conditional-request cache (ingestion.http_cache)
+                requestor_kwargs={'session': platform_session('reddit')},
+                **endpoints
+            )
+        return self._reddit
+
+    @property
+    def g(self):
+        if self._github is None:
+            from github import Github
+            from github.GithubRetry import GithubRetry
+            from github.Requester import Requester
+            github_api_base = os.getenv('GITHUB_API_BASE')
+            github_options = {'base_url': github_api_base} if github_api_base else {}
+            if os.getenv('GITHUB_SECONDS_BETWEEN_REQUESTS'):
+                # PyGithub spaces every request (0.25s by default), including ones answered by a 304
+                github_options['seconds_between_requests'] = float(os.getenv('GITHUB_SECONDS_BETWEEN_REQUESTS'))
+            # All GitHub requests go through one pooled session with the conditional-request cache;
+            # 304 answers to conditional requests do not count against GitHub's rate limit
+            github_session = platform_session('github', max_retries=GithubRetry())
+            Requester.injectConnectionClasses(*github_connection_classes(github_session))
+            self._github = Github(self.github_access_token, **github_options)
+        return self._github
+
+    @property
+    def telegram_client(self):
+        if self._telegram_client is None and self.telegram_api_id and not self.telegram_feed_url:
+            from telethon import TelegramClient
+            self._telegram_client = TelegramClient('session_name', self.telegram_api_id, self.telegram_api_hash)
+        return self._telegram_client
+
+    def _get_db_connection(self):
+        # DuckDB refuses read-only opens while the writer holds the file and vice versa.
+        # Writes and API reads are short, exports a few seconds, so both sides retry
+        retries = DB_LOCK_RETRIES if self.read_only else DB_WRITE_LOCK_RETRIES
+        if self.partition_layout is not None:
+            return connect_partitions(self.partition_layout, retries)
+        if self.read_only and not os.path.exists(self.db_path):
+            # Nothing to wait for until the worker has created it
+            raise duckdb.IOException(f"Database {self.db_path} does not exist; start python -m ingestion.worker first")
+        delay = 0.05
+        for attempt in range(retries):
+            try:
+                return duckdb.connect(self.db_path, read_only=self.read_only)
+            except duckdb.IOException:
+                if attempt == retries - 1:
+                    raise
+                time.sleep(delay)
+                delay = min(delay * 2, 1.0)
+
+    def _init_database(self):
+        if os.path.dirname(self.db_path):
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        conn = self._get_db_connection()
+        try:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS posts (
+                    id VARCHAR PRIMARY KEY,
+                    platform VARCHAR,
+                    platform_id VARCHAR,
+                    vip_target VARCHAR,
+                    content VARCHAR,
+                    author_username VARCHAR,
+                    author_id VARCHAR,
+                    url VARCHAR,
+                    timestamp TIMESTAMP,
+                    likes INTEGER DEFAULT 0,
+                    shares INTEGER DEFAULT 0,
+                    comments INTEGER DEFAULT 0,
+                    threat_score DOUBLE DEFAULT 0.0,
+                    threat_category VARCHAR DEFAULT 'unscored',
+                    severity VARCHAR,
+                    metadata JSON,
+                    ingested_at TIMESTAMP
+                )
+            """)
+            # Model outputs kept so a scoring policy change can re-derive scores in SQL. They
+            # are DOUBLE like the Python floats they come from, so re-applying a policy
+            # reproduces the scores and severities computed at scoring time exactly
+            model_columns = list(PROBABILITY_COLUMNS.values()) + ['author_risk']
+            scoring_columns = [f"{col} DOUBLE" for col in model_columns] + [
+                "vip_keyword_hit BOOLEAN", "threat_keyword_hit BOOLEAN", "recommended_action VARCHAR"
+            ]
+            for column in scoring_columns:
+                conn.execute(f"ALTER TABLE posts ADD COLUMN IF NOT EXISTS {column}")
+            column_types = dict(conn.execute("SELECT column_name, data_type FROM information_schema.columns "
+                                             "WHERE table_name = 'posts'").fetchall())
+            for col in model_columns:
+                if column_types.get(col) == 'FLOAT':
+                    # Earlier databases stored these as FLOAT; going through the shortest decimal
+                    # text gets back the value that was written (0.7, not 0.699999988)
+                    conn.execute(f"ALTER TABLE posts ALTER COLUMN {col} TYPE DOUBLE "
+                                 f"USING CAST(CAST({col} AS VARCHAR) AS DOUBLE)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS scoring_policy (
+                    version INTEGER PRIMARY KEY,
+                    policy JSON,
+                    activated_at TIMESTAMP,
+                    posts_rescored BIGINT
+                )
+            """)
+            index = PostSearchIndex(conn)
+            index.create_tables()
+            index.index_missing_posts()
+            self.author_profiles.create_table(conn)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS campaign_alerts (
+                    vip_target VARCHAR,
+                    platform VARCHAR,
+                    reason VARCHAR,
+                    window_start TIMESTAMP,
+                    window_end TIMESTAMP,
+                    volume INTEGER,
+                    baseline_volume DOUBLE,
+                    volume_z DOUBLE,
+                    mean_score DOUBLE,
+                    baseline_score DOUBLE,
+                    score_z DOUBLE,
+                    detected_at TIMESTAMP
+                )
+            """)
+        finally:
+            conn.close()
+
+    def store_items(self, items):
+        """Insert CanonicalItems into the posts table and the search index. Returns rows added."""
+        return self.store_batch(CanonicalBatch.from_items(items))
+
+    def store_batch(self, batch):
+        """Insert a CanonicalBatch in one Arrow scan. Returns rows added."""
+        if not len(batch):
+            return 0
+        conn = self._get_db_connection()
+        try:
+            conn.register('new_posts', batch.to_arrow())
+            before = conn.execute("SELECT COUNT(*) FROM posts").fetchone()[0]
+            conn.execute("""
+                INSERT INTO posts (id, platform, platform_id, vip_target, content, author_username, author_id,
+                                   url, timestamp, likes, shares, comments, metadata, ingested_at)
+                SELECT id, platform, platform_id, vip_target, text, author, author_id,
+                       url, COALESCE(created_at, ingested_at), likes, shares, comments, metadata, ingested_at
+                FROM new_posts
+                ON CONFLICT (id) DO NOTHING
+            """)
+            added = conn.execute("SELECT COUNT(*) FROM posts").fetchone()[0] - before
+            conn.unregister('new_posts')
+            PostSearchIndex(conn).add_documents(zip(batch.ids, batch.texts))
+        finally:
+            conn.close()
+        logger.info(f"Stored {added} new posts")
+        return added
 
-    def scrape_twitter(self, limit=100):
+    def get_posts_for_analysis(self, limit=1000, ranked_by=None):
+        """
+        Unscored posts, newest first. With a ScoringQueue as `ranked_by` they come highest
+        queue priority first instead, so old but important posts are still offered.
+        """
+        conn = self._get_db_connection()
+        try:
+            return conn.execute(f"""
+                SELECT p.id, p.platform, p.vip_target, p.content, p.author_username, p.author_id, p.timestamp,
+                       p.likes, p.shares, p.comments
+                FROM {self._ranked_posts(ranked_by)}
+                WHERE p.threat_category = 'unscored'
+                ORDER BY {'p.timestamp' if ranked_by is None else self._priority_sql(ranked_by)} DESC
+                LIMIT ?
+            """, [limit]).df()
+        finally:
+            conn.close()
+
+    def shed_unscored_posts(self, older_than, ranked_by=None, below=None):
+        """
+        Give up on unscored posts published before `older_than`; they keep category 'shed'.
+        With a ScoringQueue as `ranked_by`, only those whose queue priority is under `below`.
+        Returns the count.
+        """
+        ranked = ""
+        params = [older_than]
+        if ranked_by is not None and below is not None:
+            ranked = f"AND {self._priority_sql(ranked_by)} < ?"
+            params.append(below)
+        conn = self._get_db_connection()
+        try:
+            return conn.execute(f"""
+                UPDATE posts SET threat_category = 'shed'
+                WHERE id IN (
+                    SELECT p.id FROM {self._ranked_posts(ranked_by)}
+                    WHERE p.threat_category = 'unscored' AND p.timestamp < ? {ranked}
+                )
+            """, params).fetchone()[0]
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _ranked_posts(ranked_by):
+        if ranked_by is None:
+            return "posts p"
+        # Same author key as ingestion.authors.author_key
+        return """posts p LEFT JOIN author_profiles a ON a.platform = p.platform AND a.author_id =
+                  CASE WHEN trim(p.author_id) <> '' THEN p.author_id
+                       WHEN trim(p.author_username) <> '' THEN p.author_username END"""
+
+    def _priority_sql(self, queue):
+        now = time.time()
+        return queue.priority_sql(now, author_risk=self.author_profiles.risk_sql(now))
+
+    def update_post_scores(self, scores):
+        """Write scorer results (dicts from VIPThreatScorer.predict_threat plus id) back to posts."""
+        if not scores:
+            return 0
+        rows = []
+        for score in scores:
+            row = {
+                'id': score['id'],
+                'threat_score': score['threat_score'],
+                'category': score['category'],
+                'severity': score['severity'],
+                'recommended_action': score.get('recommended_action'),
+                'vip_keyword_hit': score.get('vip_keyword_hit'),
+                'threat_keyword_hit': score.get('threat_keyword_hit'),
+                'author_risk': score.get('author_risk'),
+            }
+            probabilities = score.get('class_probabilities') or {}
+            for category, column in PROBABILITY_COLUMNS.items():
+                row[column] = probabilities.get(category)
+            rows.append(row)
+        scores_df = pd.DataFrame(rows)
+        prob_updates = ",\n                    ".join(f"{col} = new_scores.{col}" for col in PROBABILITY_COLUMNS.values())
+        conn = self._get_db_connection()
+        try:
+            conn.register('new_scores', scores_df)
+            conn.execute(f"""
+                UPDATE posts
+                SET threat_score = new_scores.threat_score,
+                    threat_category = new_scores.category,
+                    severity = new_scores.severity,
+                    recommended_action = new_scores.recommended_action,
+                    vip_keyword_hit = new_scores.vip_keyword_hit,
+                    threat_keyword_hit = new_scores.threat_keyword_hit,
+                    author_risk = new_scores.author_risk,
+                    {prob_updates}
+                FROM new_scores
+                WHERE posts.id = new_scores.id
+            """)
+            conn.unregister('new_scores')
+        finally:
+            conn.close()
+        return len(scores_df)
+
+    def get_scoring_policy(self):
+        """Latest applied scoring policy as a dict, or None if the defaults are in use."""
+        conn = self._get_db_connection()
+        try:
+            row = conn.execute("SELECT policy FROM scoring_policy ORDER BY version DESC LIMIT 1").fetchone()
+        finally:
+            conn.close()
+        return json.loads(row[0]) if row else None
+
+    def apply_scoring_policy(self, policy):
+        """
+        Record a new ScoringPolicy and re-derive threat score, severity and action for every
+        scored post that has stored model outputs (posts scored before those were kept
+        are left alone). Pure SQL, no inference. Returns posts updated.
+        """
+        score_sql, severity_sql, action_sql = policy.score_sql()
+        conn = self._get_db_connection()
+        try:
+            conn.begin()
+            updated = conn.execute(f"""
+                UPDATE posts
+                SET threat_score = {score_sql},
+                    severity = {severity_sql},
+                    recommended_action = {action_sql}
+                WHERE threat_category NOT IN ('unscored', 'shed')
+                  AND COALESCE({", ".join(PROBABILITY_COLUMNS.values())}) IS NOT NULL
+            """).fetchone()[0]
+            conn.execute(
+                "INSERT INTO scoring_policy VALUES (?, ?, current_timestamp, ?)",
+                [policy.version, policy.model_dump_json(), updated]
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+        logger.info(f"Applied scoring policy v{policy.version} to {updated} posts")
+        return updated
+
+    def store_campaign_alerts(self, alerts):
+        if not alerts:
+            return 0
+        alerts_df = pd.DataFrame(alerts)
+        conn = self._get_db_connection()
+        try:
+            conn.register('new_alerts', alerts_df)
+            conn.execute("INSERT INTO campaign_alerts BY NAME SELECT * FROM new_alerts")
+            conn.unregister('new_alerts')
+        finally:
+            conn.close()
+        return len(alerts_df)
+
+    def post_columns(self):
+        conn = self._get_db_connection()
+        try:
+            # DESCRIBE also covers the partitioned posts view
+            return [row[0] for row in conn.execute("DESCRIBE posts").fetchall()]
+        finally:
+            conn.close()
+
+    @contextmanager
+    def export_posts(self, columns=None, vip=None, platform=None, since=None, until=None, min_score=None,
+                     batch_size=65536):
+        """
+        Stream matching posts as a pyarrow RecordBatchReader, batch_size rows at a time.
+
+        The result is first written to a temporary Arrow IPC file and the DuckDB connection
+        closed, so a slow download never keeps the database open and the worker locked out.
+        DuckDB produces the Arrow batches itself and the snapshot is read back memory-mapped,
+        so memory stays at about one batch. Callers validate `columns` against post_columns().
+        """
+        select = ", ".join(f'"{c}"' for c in columns) if columns else "*"
+        query = f"SELECT {select} FROM posts WHERE 1 = 1"
+        params = []
+        if vip:
+            query += " AND vip_target = ?"
+            params.append(vip)
+        if platform:
+            query += " AND platform = ?"
+            params.append(platform)
+        if since:
+            query += " AND timestamp >= ?"
+            params.append(since)
+        if until:
+            query += " AND timestamp < ?"
+            params.append(until)
+        if min_score is not None:
+            query += " AND threat_score >= ?"
+            params.append(min_score)
+        fd, snapshot_path = tempfile.mkstemp(prefix='posts-export-', suffix='.arrows', dir=EXPORT_TMP_DIR)
+        os.close(fd)
+        try:
+            conn = self._get_db_connection()
+            try:
+                reader = conn.execute(query, params).fetch_record_batch(batch_size)
+                with pa.OSFile(snapshot_path, 'wb') as sink, \
+                        pa.ipc.new_stream(sink, reader.schema,
+                                          options=pa.ipc.IpcWriteOptions(compression='zstd')) as writer:
+                    for batch in reader:
+                        writer.write_batch(batch)
+            finally:
+                conn.close()
+            source = pa.memory_map(snapshot_path)
+            try:
+                yield pa.ipc.open_stream(source)
+            finally:
+                source.close()
+        finally:
+            os.remove(snapshot_path)
+
+    def search_posts(self, query, **filters):
+        conn = self._get_db_connection()
+        try:
+            return PostSearchIndex(conn).search(query, **filters)
+        finally:
+            conn.close()
+
+    def run_ingestion_cycle(self, vips=None, limit=100):
+        """Scrape every configured source for each VIP and store the results. Returns new posts per platform."""
+        results = {'twitter': 0, 'reddit': 0, 'github': 0, 'telegram': 0}
+        for vip in vips if vips is not None else load_vip_list():
+            name = vip['name']
+            jobs = []
+            if vip.get('twitter_handle'):
+                jobs.append(('twitter', lambda h=vip['twitter_handle']: self.scrape_twitter(limit, username=h)))
+            if self.reddit_enabled:
+                for subreddit in vip.get('subreddits') or []:
+                    jobs.append(('reddit', lambda s=subreddit: self.scrape_reddit(s, limit)))
+            for repo_name in vip.get('github_repos') or []:
+                jobs.append(('github', lambda r=repo_name: self.scrape_github(r, limit)))
+            if self.telegram_enabled:
+                for channel in vip.get('telegram_channels') or []:
+                    jobs.append(('telegram', lambda c=channel: asyncio.run(self.scrape_telegram(c, limit))))
+
+            for platform, scrape in jobs:
+                try:
+                    results[platform] += self.ingest_payloads(platform, scrape(), vip_target=name)
+                except Exception as e:
+                    logger.error(f"Error scraping {platform} for {name}: {e}")
+
+        logger.info(f"Ingestion cycle results: {results} (HTTP cache: {cache_stats()})")
+        return results
+
+    def ingest_payloads(self, platform, payloads, vip_target=None, record=True):
+        """Normalize raw scraper payloads and store them. Returns the number of new posts."""
+        if record and self.recorder is not None:
+            self.recorder.record(platform, payloads, vip_target=vip_target)
+        return self.store_batch(CanonicalBatch.from_payloads(platform, payloads, vip_target))
+
+    def scrape_twitter(self, limit=100, username=None):
+        import snscrape.modules.twitter as sntwitter
         tweets = []
-        for i, tweet in enumerate(sntwitter.TwitterUserScraper(self.twitter_username).get_items()):
+        scraper = sntwitter.TwitterUserScraper(username or self.twitter_username)
+        for i, tweet in enumerate(scraper.get_items()):
             if i >= limit:
                 break
             tweets.append({
                 "id": tweet.id,
                 "content": tweet.content,
                 "date": tweet.date,
-                "url": tweet.url
+                "url": tweet.url,
+                "author": tweet.user.username,
+                "author_id": tweet.user.id,
+                "likes": tweet.likeCount,
+                "shares": tweet.retweetCount,
+                "comments": tweet.replyCount
             })
         return tweets
 
@@ -48,7 +524,10 @@ class DataIngestion:
                 "title": post.title,
                 "selftext": post.selftext,
                 "url": post.url,
-                "created_utc": post.created_utc
+                "created_utc": post.created_utc,
+                "author": post.author.name if post.author else None,
+                "likes": post.score,
+                "comments": post.num_comments
             })
         return posts
 
@@ -64,11 +543,16 @@ class DataIngestion:
                 "title": issue.title,
                 "body": issue.body,
                 "url": issue.html_url,
-                "created_at": issue.created_at
+                "created_at": issue.created_at,
+                "author": issue.user.login if issue.user else None,
+                "author_id": issue.user.id if issue.user else None,
+                "comments": issue.comments
             })
         return collected
 
     async def scrape_telegram(self, channel_username, limit=100):
+        if self.telegram_feed_url:
+            return await self._scrape_telegram_feed(channel_username, limit)
         await self.telegram_client.start()
         posts = []
         async for message in self.telegram_client.iter_messages(channel_username, limit=limit):
@@ -76,10 +560,39 @@ class DataIngestion:
                 "id": message.id,
                 "text": message.message,
                 "date": message.date,
-                "url": f"https://t.me/{channel_username}/{message.id}"
+                "url": f"https://t.me/{channel_username}/{message.id}",
+                "channel": channel_username,
+                "author_id": message.sender_id,
+                "shares": message.forwards
             })
         return posts
 
+    async def _scrape_telegram_feed(self, channel_username, limit=100):
+        # HTTP feed with the same message fields as Telethon, served by ingestion.platform_simulator
+        import aiohttp
+        posts = []
+        offset_id = 0
+        async with aiohttp.ClientSession() as session:
+            while len(posts) < limit:
+                params = {'limit': min(100, limit - len(posts)), 'offset_id': offset_id}
+                async with session.get(f"{self.telegram_feed_url}/{channel_username}/messages", params=params) as resp:
+                    resp.raise_for_status()
+                    data = await resp.json()
+                for message in data['messages']:
+                    posts.append({
+                        "id": message['id'],
+                        "text": message['message'],
+                        "date": message['date'],
+                        "url": f"https://t.me/{channel_username}/{message['id']}",
+                        "channel": channel_username,
+                        "author_id": message.get('sender_id'),
+                        "shares": message.get('forwards')
+                    })
+                offset_id = data.get('next_offset_id')
+                if not offset_id:
+                    break
+        return posts
+
 # Usage example (needs proper credentials):
 # ingestion = DataIngestion(twitter_username='user', reddit_client_id='id', reddit_client_secret='secret',
 #                           reddit_user_agent='agent', github_access_token='token',
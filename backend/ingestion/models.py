@@ -1,10 +1,21 @@
 # src/models.py
+import sys
 from dataclasses import dataclass, field, asdict
-from datetime import datetime
+from datetime import datetime, timezone, timedelta
 import uuid
 import json
 
-@dataclass
+import pyarrow as pa
+
+# Slotted instances where the interpreter supports it (3.10+)
+_DATACLASS_OPTIONS = {'slots': True} if sys.version_info >= (3, 10) else {}
+
+EPOCH = datetime(1970, 1, 1)
+ENGAGEMENT_FIELDS = ('likes', 'shares', 'comments')
+# Same output as json.dumps(value, default=str), without rebuilding the encoder per call
+_METADATA_ENCODER = json.JSONEncoder(default=str)
+
+@dataclass(**_DATACLASS_OPTIONS)
 class CanonicalItem:
     id: str = field(default_factory=lambda: str(uuid.uuid4()))
     platform: str = None             # e.g., 'twitter','reddit','github','telegram'
@@ -34,3 +45,170 @@ class CanonicalItem:
             'raw': json.dumps(self.raw, default=str),
             'ingested_at': self.ingested_at.isoformat() if self.ingested_at else None
         }
+
+    @classmethod
+    def from_payload(cls, platform, payload, vip_target=None):
+        """Build an item from a raw scraper payload (the dicts returned by DataIngestion.scrape_*)."""
+        platform_id, author, author_id, text, created_at, url, metadata = _payload_fields(platform, payload)
+        return cls(
+            # Stable ids so re-scraped and replayed posts are deduplicated on insert
+            id=f"{platform}_{platform_id}",
+            platform=platform,
+            platform_id=platform_id,
+            vip_target=vip_target,
+            author=author,
+            author_id=author_id,
+            text=text,
+            created_at=_parse_time(created_at),
+            url=url,
+            metadata=metadata,
+            raw=payload
+        )
+
+
+class CanonicalBatch:
+    """
+    Column-wise buffer of canonical items.
+
+    Payloads are appended straight into per-field lists without building an item
+    object each; to_arrow() turns the buffer into one Arrow RecordBatch with
+    timestamps as int64 microseconds and engagement counts as typed columns, so
+    DuckDB can scan it directly. Metadata dicts are kept as they are and encoded
+    to JSON together in to_arrow(). Raw payloads are not kept here; record them with
+    ingestion.replay.PayloadRecorder if needed.
+    """
+
+    SCHEMA = pa.schema([
+        ('id', pa.string()),
+        ('platform', pa.string()),
+        ('platform_id', pa.string()),
+        ('vip_target', pa.string()),
+        ('author', pa.string()),
+        ('author_id', pa.string()),
+        ('text', pa.string()),
+        ('created_at', pa.timestamp('us')),
+        ('url', pa.string()),
+        ('likes', pa.int64()),
+        ('shares', pa.int64()),
+        ('comments', pa.int64()),
+        ('metadata', pa.string()),
+        ('ingested_at', pa.timestamp('us')),
+    ])
+    _BUFFERED = [name for name in SCHEMA.names if name != 'ingested_at']
+
+    def __init__(self, ingested_at=None):
+        self.ingested_at = ingested_at or datetime.utcnow()
+        self._columns = {name: [] for name in self._BUFFERED}
+
+    def __len__(self):
+        return len(self._columns['id'])
+
+    def append_payload(self, platform, payload, vip_target=None):
+        platform_id, author, author_id, text, created_at, url, metadata = _payload_fields(platform, payload)
+        self._append(f"{platform}_{platform_id}", platform, platform_id, vip_target, author, author_id,
+                     text, _time_to_micros(created_at), url, metadata)
+
+    def append_item(self, item):
+        self._append(item.id, item.platform, item.platform_id, item.vip_target, item.author, item.author_id,
+                     item.text, _time_to_micros(item.created_at), item.url, item.metadata or {})
+
+    @classmethod
+    def from_payloads(cls, platform, payloads, vip_target=None):
+        batch = cls()
+        for payload in payloads:
+            batch.append_payload(platform, payload, vip_target)
+        return batch
+
+    @classmethod
+    def from_items(cls, items):
+        batch = cls()
+        for item in items:
+            batch.append_item(item)
+        return batch
+
+    def to_arrow(self):
+        columns = dict(self._columns)
+        columns['metadata'] = list(map(_METADATA_ENCODER.encode, columns['metadata']))
+        n = len(self)
+        arrays = [pa.array(columns[name], type=self.SCHEMA.field(name).type) for name in self._BUFFERED]
+        ingested = _time_to_micros(self.ingested_at)
+        arrays.append(pa.array([ingested] * n, type=pa.int64()).cast(pa.timestamp('us')))
+        return pa.RecordBatch.from_arrays(arrays, schema=self.SCHEMA)
+
+    @property
+    def ids(self):
+        return self._columns['id']
+
+    @property
+    def texts(self):
+        return self._columns['text']
+
+    def _append(self, id, platform, platform_id, vip_target, author, author_id, text, created_micros, url, metadata):
+        c = self._columns
+        c['id'].append(id)
+        c['platform'].append(platform)
+        c['platform_id'].append(platform_id)
+        c['vip_target'].append(vip_target)
+        c['author'].append(author)
+        c['author_id'].append(author_id)
+        c['text'].append(text)
+        c['created_at'].append(created_micros)
+        c['url'].append(url)
+        c['likes'].append(_as_int(metadata.get('likes')))
+        c['shares'].append(_as_int(metadata.get('shares', metadata.get('retweets'))))
+        c['comments'].append(_as_int(metadata.get('comments')))
+        c['metadata'].append(metadata)
+
+
+def _payload_fields(platform, payload):
+    """Map a platform payload to (platform_id, author, author_id, text, created_at, url, metadata)."""
+    if platform == 'reddit':
+        text = '\n\n'.join(p for p in (payload.get('title'), payload.get('selftext')) if p)
+        created_at = payload.get('created_utc')
+    elif platform == 'github':
+        text = '\n\n'.join(p for p in (payload.get('title'), payload.get('body')) if p)
+        created_at = payload.get('created_at')
+    else:
+        text = payload.get('content') or payload.get('text') or ''
+        created_at = payload.get('date')
+
+    platform_id = str(payload.get('id'))
+    if payload.get('channel'):
+        # Telegram message ids are only unique within a channel
+        platform_id = f"{payload['channel']}/{platform_id}"
+    author = payload.get('author')
+    author_id = str(payload['author_id']) if payload.get('author_id') is not None else author
+    metadata = {k: payload[k] for k in ENGAGEMENT_FIELDS if payload.get(k) is not None}
+    return platform_id, author, author_id, text, created_at, payload.get('url'), metadata
+
+
+def _parse_time(value):
+    """Parse payload timestamps into naive UTC datetimes."""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return datetime.utcfromtimestamp(value)
+    if not isinstance(value, datetime):
+        value = str(value)
+        if value.endswith('Z'):
+            value = value[:-1] + '+00:00'
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _time_to_micros(value):
+    """Payload timestamp to int64 microseconds since the epoch (UTC)."""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return int(value * 1_000_000)
+    return (_parse_time(value) - EPOCH) // timedelta(microseconds=1)
+
+
+def _as_int(value):
+    try:
+        return int(value) if value is not None else 0
+    except (TypeError, ValueError):
+        return 0
@@ -0,0 +1,414 @@
+"""
+VIP Threat Monitoring - Simulated Platform API Server
+Local stand-in for the Reddit and GitHub REST APIs plus a Telegram-like feed, with
+configurable latency, pagination, 429 rate limiting, error injection and ETag/Last-Modified
+conditional responses.
+
+Usage (from backend/):
+    python -m ingestion.platform_simulator --port 8090 --latency lognormal:80:0.6 \\
+        --rate-limit 60/60 --error-rate 0.02
+
+Point DataIngestion at it with:
+    REDDIT_API_BASE=http://127.0.0.1:8090
+    GITHUB_API_BASE=http://127.0.0.1:8090/api/v3
+    TELEGRAM_FEED_URL=http://127.0.0.1:8090/telegram
+"""
+
+import json
+import math
+import zlib
+import hashlib
+import time
+import random
+import asyncio
+import logging
+import argparse
+import threading
+from collections import defaultdict
+from datetime import datetime, timezone
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Optional
+
+from fastapi import FastAPI, Request, Query
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+TEMPLATES = [
+    (0, "Great announcement from {vip} today"),
+    (0, "Interesting interview with {vip} about the new project"),
+    (0, "I disagree with {vip} on this, but respect the work"),
+    (1, "{vip} is a complete idiot and should disappear"),
+    (1, "Everyone at {vip} is worthless trash"),
+    (2, "Someone should take out {vip} for good"),
+    (2, "Time to bomb the {vip} office"),
+    (3, "Found the home address of the {vip} director: {n} Main St"),
+    (4, "BREAKING: {vip} caught in fake scandal (completely false)"),
+    (5, "Free crypto endorsed by {vip}! Click here"),
+]
+
+
+class SimulatorConfig(BaseModel):
+    # "fixed:MS", "uniform:LO:HI", "normal:MEAN:STD", "lognormal:MEDIAN_MS:SIGMA" or "exponential:MEAN_MS"
+    latency: str = "fixed:0"
+    # Requests allowed per platform per window; 0 disables rate limiting
+    rate_limit_requests: int = 0
+    rate_limit_window: float = 60.0
+    # Probability of answering with a random 500/502/503, and of stalling for timeout_seconds
+    error_rate: float = 0.0
+    timeout_rate: float = 0.0
+    timeout_seconds: float = 30.0
+    # Synthetic content: items already present per feed and new items per feed per minute
+    initial_items: int = 250
+    items_per_minute: float = 6.0
+    seed: int = 42
+
+
+def sample_latency(spec, rng):
+    """Draw one latency in seconds from a distribution spec like 'lognormal:80:0.6'."""
+    kind, *args = spec.split(':')
+    args = [float(a) for a in args]
+    if kind == 'fixed':
+        ms = args[0]
+    elif kind == 'uniform':
+        ms = rng.uniform(args[0], args[1])
+    elif kind == 'normal':
+        ms = rng.gauss(args[0], args[1])
+    elif kind == 'lognormal':
+        ms = rng.lognormvariate(math.log(max(args[0], 1e-3)), args[1])
+    elif kind == 'exponential':
+        ms = rng.expovariate(1.0 / args[0]) if args[0] > 0 else 0.0
+    else:
+        raise ValueError(f"Unknown latency distribution: {kind}")
+    return max(0.0, ms) / 1000.0
+
+
+class PlatformSimulator:
+    """Holds the synthetic feeds, rate-limit windows and request counters."""
+
+    def __init__(self, config=None):
+        self.config = config or SimulatorConfig()
+        self.started = time.time()
+        self.rng = random.Random(self.config.seed)
+        self._lock = threading.Lock()
+        self._windows = {}
+        self.stats = defaultdict(lambda: defaultdict(int))
+
+    # -- synthetic content ---------------------------------------------------
+
+    def feed(self, platform, name):
+        """All items currently 'published' in a feed, newest first. Deterministic per feed."""
+        cfg = self.config
+        elapsed_minutes = (time.time() - self.started) / 60.0
+        count = cfg.initial_items + int(elapsed_minutes * cfg.items_per_minute)
+        spacing = 60.0 / cfg.items_per_minute if cfg.items_per_minute > 0 else 60.0
+        feed_rng = random.Random(f"{cfg.seed}:{platform}:{name}")
+        items = []
+        for i in range(count):
+            label, template = feed_rng.choice(TEMPLATES)
+            items.append({
+                'seq': i + 1,
+                'text': template.format(vip=name, n=feed_rng.randint(1, 999)),
+                'label': label,
+                'author': f"user{feed_rng.randint(1, 500)}",
+                # Fixed publish times, so a feed with no new items serves identical pages
+                'created': self.started + (i + 1 - cfg.initial_items) * spacing,
+                'likes': feed_rng.randint(0, 5000),
+                'shares': feed_rng.randint(0, 500),
+                'comments': feed_rng.randint(0, 300),
+            })
+        items.reverse()
+        return items
+
+    # -- network behaviour ---------------------------------------------------
+
+    def check_rate_limit(self, platform):
+        """Returns (allowed, remaining, reset_epoch) for one request against a fixed window."""
+        cfg = self.config
+        if cfg.rate_limit_requests <= 0:
+            return True, None, None
+        now = time.time()
+        with self._lock:
+            window_start, used = self._windows.get(platform, (now, 0))
+            if now - window_start >= cfg.rate_limit_window:
+                window_start, used = now, 0
+            reset = window_start + cfg.rate_limit_window
+            if used >= cfg.rate_limit_requests:
+                return False, 0, reset
+            self._windows[platform] = (window_start, used + 1)
+            return True, cfg.rate_limit_requests - used - 1, reset
+
+    def refund(self, platform):
+        """Give back the rate-limit slot of a request that should not have been charged."""
+        with self._lock:
+            if platform in self._windows:
+                window_start, used = self._windows[platform]
+                self._windows[platform] = (window_start, max(0, used - 1))
+
+    async def behave(self, platform):
+        """Apply latency, rate limiting and error injection. Returns an error response, or the headers for a normal one."""
+        cfg = self.config
+        self.stats[platform]['requests'] += 1
+        await asyncio.sleep(sample_latency(cfg.latency, self.rng))
+
+        allowed, remaining, reset = self.check_rate_limit(platform)
+        headers = {}
+        if remaining is not None:
+            headers = rate_limit_headers(platform, cfg.rate_limit_requests, remaining, reset)
+        if not allowed:
+            self.stats[platform]['rate_limited'] += 1
+            headers['Retry-After'] = str(max(1, math.ceil(reset - time.time())))
+            return JSONResponse({'message': 'API rate limit exceeded'}, status_code=429, headers=headers)
+
+        if cfg.timeout_rate and self.rng.random() < cfg.timeout_rate:
+            self.stats[platform]['timeouts'] += 1
+            await asyncio.sleep(cfg.timeout_seconds)
+        if cfg.error_rate and self.rng.random() < cfg.error_rate:
+            self.stats[platform]['errors'] += 1
+            status = self.rng.choice([500, 502, 503])
+            return JSONResponse({'message': 'Injected server error'}, status_code=status, headers=headers)
+
+        self.stats[platform]['ok'] += 1
+        return headers
+
+
+def rate_limit_headers(platform, limit, remaining, reset):
+    if platform == 'github':
+        return {'X-RateLimit-Limit': str(limit), 'X-RateLimit-Remaining': str(remaining),
+                'X-RateLimit-Reset': str(int(reset))}
+    return {'X-Ratelimit-Used': str(limit - remaining), 'X-Ratelimit-Remaining': str(remaining),
+            'X-Ratelimit-Reset': str(max(0, int(reset - time.time())))}
+
+
+def conditional_response(sim, platform, request, content, headers, last_modified):
+    """Serve `content` with ETag/Last-Modified validators, or a 304 when the client's copy is current."""
+    body = json.dumps(content, separators=(',', ':')).encode('utf-8')
+    headers = dict(headers)
+    headers['ETag'] = f'W/"{hashlib.sha1(body).hexdigest()}"'
+    if last_modified is not None:
+        headers['Last-Modified'] = formatdate(last_modified, usegmt=True)
+
+    if_none_match = request.headers.get('if-none-match')
+    if_modified_since = request.headers.get('if-modified-since')
+    if if_none_match is not None:
+        fresh = headers['ETag'] in [tag.strip() for tag in if_none_match.split(',')]
+    elif if_modified_since is not None and last_modified is not None:
+        try:
+            fresh = int(last_modified) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            fresh = False
+    else:
+        fresh = False
+
+    if fresh:
+        sim.stats[platform]['not_modified'] += 1
+        if platform == 'github':
+            # GitHub does not charge conditional requests answered with 304
+            sim.refund(platform)
+            remaining = headers.get('X-RateLimit-Remaining')
+            if remaining is not None:
+                headers['X-RateLimit-Remaining'] = str(int(remaining) + 1)
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type='application/json', headers=headers)
+
+
+def iso(ts):
+    return datetime.fromtimestamp(ts, timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def create_app(config=None):
+    sim = PlatformSimulator(config)
+    app = FastAPI(title="Simulated Platform APIs", version="1.0.0")
+    app.state.simulator = sim
+
+    # -- control -------------------------------------------------------------
+
+    @app.get("/_sim/config", response_model=SimulatorConfig)
+    async def get_config():
+        return sim.config
+
+    @app.put("/_sim/config", response_model=SimulatorConfig)
+    async def update_config(config: SimulatorConfig):
+        sim.config = config
+        return sim.config
+
+    @app.get("/_sim/stats")
+    async def get_stats():
+        return {platform: dict(counts) for platform, counts in sim.stats.items()}
+
+    # -- Reddit --------------------------------------------------------------
+
+    @app.post("/api/v1/access_token")
+    async def reddit_access_token():
+        return {'access_token': 'simulated', 'token_type': 'bearer', 'expires_in': 3600, 'scope': '*'}
+
+    @app.get("/r/{subreddit}/new")
+    async def reddit_new(subreddit: str, request: Request, limit: int = 25, after: Optional[str] = None):
+        # Like the real APIs, oversized page sizes are clamped rather than rejected
+        limit = max(1, min(limit, 100))
+        outcome = await sim.behave('reddit')
+        if isinstance(outcome, JSONResponse):
+            return outcome
+        items = sim.feed('reddit', subreddit)
+        start = 0
+        if after:
+            start = next((i + 1 for i, item in enumerate(items)
+                          if f"t3_{_reddit_id(subreddit, item)}" == after), len(items))
+        page = items[start:start + limit]
+        children = []
+        for item in page:
+            post_id = _reddit_id(subreddit, item)
+            children.append({'kind': 't3', 'data': {
+                'id': post_id,
+                'name': f"t3_{post_id}",
+                'subreddit': subreddit,
+                'title': item['text'],
+                'selftext': '',
+                'author': item['author'],
+                'created_utc': item['created'],
+                'score': item['likes'],
+                'num_comments': item['comments'],
+                'permalink': f"/r/{subreddit}/comments/{post_id}/",
+                'url': f"https://www.reddit.com/r/{subreddit}/comments/{post_id}/",
+            }})
+        more = start + limit < len(items)
+        next_after = children[-1]['data']['name'] if children and more else None
+        listing = {'kind': 'Listing', 'data': {'after': next_after, 'before': None, 'dist': len(children),
+                                               'children': children}}
+        return conditional_response(sim, 'reddit', request, listing, outcome,
+                                    page[0]['created'] if page else None)
+
+    # -- GitHub --------------------------------------------------------------
+
+    @app.get("/api/v3/repos/{owner}/{repo}")
+    async def github_repo(owner: str, repo: str, request: Request):
+        outcome = await sim.behave('github')
+        if isinstance(outcome, JSONResponse):
+            return outcome
+        base = str(request.base_url).rstrip('/')
+        return conditional_response(sim, 'github', request, {
+            'id': _stable_id(f"{owner}/{repo}"),
+            'name': repo,
+            'full_name': f"{owner}/{repo}",
+            'owner': {'login': owner, 'id': _stable_id(owner), 'type': 'Organization'},
+            'url': f"{base}/api/v3/repos/{owner}/{repo}",
+            'html_url': f"https://github.com/{owner}/{repo}",
+        }, outcome, sim.started)
+
+    @app.get("/api/v3/repos/{owner}/{repo}/issues")
+    async def github_issues(owner: str, repo: str, request: Request, state: str = 'open',
+                            per_page: int = 30, page: int = Query(1, ge=1)):
+        per_page = max(1, min(per_page, 100))
+        outcome = await sim.behave('github')
+        if isinstance(outcome, JSONResponse):
+            return outcome
+        base = str(request.base_url).rstrip('/')
+        items = sim.feed('github', f"{owner}/{repo}")
+        start = (page - 1) * per_page
+        page_items = items[start:start + per_page]
+        issues = []
+        for item in page_items:
+            number = item['seq']
+            issues.append({
+                'id': _stable_id(f"{owner}/{repo}#{number}"),
+                'number': number,
+                'title': item['text'],
+                'body': item['text'],
+                'state': 'open',
+                'comments': item['comments'],
+                'created_at': iso(item['created']),
+                'updated_at': iso(item['created']),
+                'url': f"{base}/api/v3/repos/{owner}/{repo}/issues/{number}",
+                'html_url': f"https://github.com/{owner}/{repo}/issues/{number}",
+                'user': {'login': item['author'], 'id': int(item['author'][4:]), 'type': 'User'},
+            })
+        links = []
+        last_page = max(1, math.ceil(len(items) / per_page))
+        issues_url = f"{base}/api/v3/repos/{owner}/{repo}/issues?state={state}&per_page={per_page}"
+        if page < last_page:
+            links.append(f'<{issues_url}&page={page + 1}>; rel="next"')
+            links.append(f'<{issues_url}&page={last_page}>; rel="last"')
+        headers = dict(outcome)
+        if links:
+            headers['Link'] = ', '.join(links)
+        return conditional_response(sim, 'github', request, issues, headers,
+                                    page_items[0]['created'] if page_items else None)
+
+    # -- Telegram-like feed ----------------------------------------------------
+
+    @app.get("/telegram/{channel}/messages")
+    async def telegram_messages(channel: str, limit: int = 100, offset_id: int = 0):
+        limit = max(1, min(limit, 100))
+        outcome = await sim.behave('telegram')
+        if isinstance(outcome, JSONResponse):
+            return outcome
+        items = sim.feed('telegram', channel)
+        if offset_id:
+            items = [item for item in items if item['seq'] < offset_id]
+        page = items[:limit]
+        messages = [{
+            'id': item['seq'],
+            'message': item['text'],
+            'date': iso(item['created']),
+            'sender_id': int(item['author'][4:]),
+            'forwards': item['shares'],
+            'views': item['likes'],
+        } for item in page]
+        next_offset = page[-1]['seq'] if len(items) > limit else None
+        return JSONResponse({'messages': messages, 'next_offset_id': next_offset}, headers=outcome)
+
+    return app
+
+
+def _stable_id(key):
+    return zlib.crc32(key.encode('utf-8'))
+
+
+def _reddit_id(subreddit, item):
+    return f"{subreddit.lower()}{_base36(item['seq'])}"
+
+
+def _base36(n):
+    digits = '0123456789abcdefghijklmnopqrstuvwxyz'
+    out = ''
+    while True:
+        n, r = divmod(n, 36)
+        out = digits[r] + out
+        if n == 0:
+            return out
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the simulated platform API server")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8090)
+    parser.add_argument('--latency', default='fixed:0', help="e.g. fixed:50, uniform:10:200, lognormal:80:0.6")
+    parser.add_argument('--rate-limit', default='0/60', help="REQUESTS/WINDOW_SECONDS per platform, 0 disables")
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--timeout-rate', type=float, default=0.0)
+    parser.add_argument('--initial-items', type=int, default=250)
+    parser.add_argument('--items-per-minute', type=float, default=6.0)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args(argv)
+
+    requests_allowed, window = args.rate_limit.split('/')
+    config = SimulatorConfig(
+        latency=args.latency,
+        rate_limit_requests=int(requests_allowed),
+        rate_limit_window=float(window),
+        error_rate=args.error_rate,
+        timeout_rate=args.timeout_rate,
+        initial_items=args.initial_items,
+        items_per_minute=args.items_per_minute,
+        seed=args.seed,
+    )
+    sample_latency(config.latency, random.Random())  # fail fast on a bad spec
+
+    import uvicorn
+    logging.basicConfig(level=logging.INFO)
+    uvicorn.run(create_app(config), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
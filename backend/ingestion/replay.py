@@ -0,0 +1,177 @@
+"""
+VIP Threat Monitoring - Payload Record & Replay
+Records raw scraper payloads to gzip-compressed, chunked JSONL and replays them
+through the ingestion pipeline for offline load and regression testing.
+
+Usage (from backend/):
+    python -m ingestion.replay ./data/recordings --speed 10 --score
+    python -m ingestion.replay ./data/recordings --max --db /tmp/replay.db
+"""
+
+import os
+import sys
+import glob
+import gzip
+import json
+import time
+import uuid
+import heapq
+import atexit
+import logging
+import argparse
+import threading
+import itertools
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+
+class PayloadRecorder:
+    """
+    Writes raw payloads to <directory>/payloads-<session>-<chunk>.jsonl.gz, rotating every
+    chunk_size records. The session name carries the pid and a random suffix, so workers
+    sharing a directory never write to the same file.
+    """
+
+    def __init__(self, directory, chunk_size=10000):
+        self.directory = directory
+        self.chunk_size = chunk_size
+        self.session = f"{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._chunk = 0
+        self._records_in_chunk = 0
+        self._file = None
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        atexit.register(self.close)
+
+    def record(self, platform, payloads, vip_target=None, captured_at=None):
+        """Write one scrape result; every payload shares the capture time used for replay pacing."""
+        if not payloads:
+            return
+        captured_at = (captured_at or datetime.utcnow()).isoformat()
+        with self._lock:
+            for payload in payloads:
+                if self._file is None or self._records_in_chunk >= self.chunk_size:
+                    self._rotate()
+                line = {'platform': platform, 'vip_target': vip_target, 'captured_at': captured_at, 'payload': payload}
+                self._file.write(json.dumps(line, default=str) + '\n')
+                self._records_in_chunk += 1
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def _rotate(self):
+        if self._file is not None:
+            self._file.close()
+        self._chunk += 1
+        self._records_in_chunk = 0
+        path = os.path.join(self.directory, f"payloads-{self.session}-{self._chunk:05d}.jsonl.gz")
+        self._file = gzip.open(path, 'xt', encoding='utf-8')
+        logger.info(f"Recording payloads to {path}")
+
+
+class ReplaySource:
+    """
+    Reads recordings back as scrape batches in capture order.
+
+    speed=1.0 reproduces the original timing, speed=N compresses it N times and
+    speed=None replays as fast as the pipeline accepts data.
+    """
+
+    def __init__(self, path, speed=1.0):
+        if os.path.isdir(path):
+            self.files = sorted(glob.glob(os.path.join(path, '*.jsonl.gz')))
+        else:
+            self.files = [path]
+        self.speed = speed
+
+    def batches(self):
+        """Yield (platform, vip_target, captured_at, payloads) for each recorded scrape."""
+        current_key = None
+        payloads = []
+        for record in self._records():
+            key = (record['platform'], record['vip_target'], record['captured_at'])
+            if key != current_key and payloads:
+                yield current_key + (payloads,)
+                payloads = []
+            current_key = key
+            payloads.append(record['payload'])
+        if payloads:
+            yield current_key + (payloads,)
+
+    def _records(self):
+        # Each session's chunks are in capture order; sessions recorded side by side
+        # (one per worker) are merged on capture time
+        sessions = itertools.groupby(self.files, key=lambda path: os.path.basename(path).rsplit('-', 1)[0])
+        streams = [self._read(list(paths)) for _, paths in sessions]
+        return heapq.merge(*streams, key=lambda record: record['captured_at'])
+
+    @staticmethod
+    def _read(paths):
+        for path in paths:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                for line in f:
+                    if line.strip():
+                        yield json.loads(line)
+
+    def paced_batches(self):
+        """Like batches(), but sleeps so batches arrive at the recorded rate divided by speed."""
+        first_capture = None
+        started = time.monotonic()
+        for platform, vip_target, captured_at, payloads in self.batches():
+            if self.speed:
+                captured = datetime.fromisoformat(captured_at)
+                first_capture = first_capture or captured
+                due = (captured - first_capture).total_seconds() / self.speed
+                delay = due - (time.monotonic() - started)
+                if delay > 0:
+                    time.sleep(delay)
+            yield platform, vip_target, captured_at, payloads
+
+    def run(self, ingestion, scorer=None):
+        """Feed every batch through ingestion (and scoring, if a scorer is given). Returns throughput stats."""
+        stats = {'batches': 0, 'payloads': 0, 'posts_added': 0, 'posts_scored': 0}
+        started = time.monotonic()
+        for platform, vip_target, _, payloads in self.paced_batches():
+            stats['batches'] += 1
+            stats['payloads'] += len(payloads)
+            stats['posts_added'] += ingestion.ingest_payloads(platform, payloads, vip_target=vip_target, record=False)
+            if scorer is not None:
+                posts_df = ingestion.get_posts_for_analysis(limit=max(1000, len(payloads)))
+                if not posts_df.empty:
+                    scores = scorer.score_posts(posts_df, author_store=ingestion.author_profiles)
+                    stats['posts_scored'] += ingestion.update_post_scores(scores)
+        stats['elapsed_seconds'] = round(time.monotonic() - started, 3)
+        stats['payloads_per_second'] = round(stats['payloads'] / stats['elapsed_seconds'], 1) if stats['elapsed_seconds'] else None
+        return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay recorded platform payloads through the ingestion pipeline")
+    parser.add_argument('path', help="Recording directory or a single .jsonl.gz chunk")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--speed', type=float, default=1.0, help="Replay speed multiplier (default: 1.0)")
+    group.add_argument('--max', action='store_true', help="Replay as fast as possible")
+    parser.add_argument('--score', action='store_true', help="Also run threat scoring on replayed posts")
+    parser.add_argument('--db', help="Database path (defaults to DATABASE_PATH)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    from ingestion.ingestion import DataIngestion
+    ingestion = DataIngestion(db_path=args.db)
+    scorer = None
+    if args.score:
+        from ai.ai_scoring import VIPThreatScorer
+        scorer = VIPThreatScorer()
+
+    source = ReplaySource(args.path, speed=None if args.max else args.speed)
+    stats = source.run(ingestion, scorer)
+    print(json.dumps(stats, indent=2))
+
+
+if __name__ == "__main__":
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+    main()
@@ -0,0 +1,352 @@
+"""
+VIP Threat Monitoring - Post Search Index
+Inverted index over post content, maintained on insert and ranked with BM25 in DuckDB
+
+Postings are kept clustered by term: search_postings is a sequence of term-sorted runs, so
+DuckDB's per-row-group min/max statistics let a `term = ?` filter skip all but a row group
+or two per run. New postings land in the small unsorted search_postings_tail table, which
+is sorted and appended to search_postings as a new run once it reaches SEARCH_TAIL_ROWS.
+Each posting also carries its post's length and immutable attributes (timestamp, VIP,
+platform), so ranking and most filters never join the posts table.
+"""
+
+import os
+import re
+import math
+import logging
+from collections import Counter
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+QUERY_RE = re.compile(r'"([^"]*)"|(\S+)')
+
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Postings buffered in search_postings_tail before they are sorted into a new run
+SEARCH_TAIL_ROWS = int(os.getenv('SEARCH_TAIL_ROWS', 250000))
+POSTINGS_COLUMNS = """
+                term VARCHAR,
+                post_id VARCHAR,
+                tf INTEGER,
+                doc_len INTEGER,
+                timestamp TIMESTAMP,
+                vip_target VARCHAR,
+                platform VARCHAR
+"""
+
+
+def tokenize(text):
+    return TOKEN_RE.findall((text or '').lower())
+
+
+def parse_query(query):
+    """
+    Parse a search query into OR-groups of AND-ed clauses.
+
+    Supported syntax: bare terms, "quoted phrases", AND / OR / NOT operators
+    and a leading '-' as shorthand for NOT. Adjacent clauses are AND-ed and
+    AND binds tighter than OR. Each clause is (negated, tokens, is_phrase).
+    """
+    groups = [[]]
+    negate_next = False
+    for match in QUERY_RE.finditer(query or ''):
+        phrase, word = match.group(1), match.group(2)
+        if word in ('AND', '&&'):
+            continue
+        if word in ('OR', '||'):
+            if groups[-1]:
+                groups.append([])
+            continue
+        if word in ('NOT', '!'):
+            negate_next = True
+            continue
+
+        negated = negate_next
+        negate_next = False
+        if phrase is None and word.startswith('-') and len(word) > 1:
+            negated = True
+            word = word[1:]
+
+        tokens = tokenize(phrase if phrase is not None else word)
+        if not tokens:
+            continue
+        groups[-1].append((negated, tokens, phrase is not None and len(tokens) > 1))
+
+    groups = [g for g in groups if g]
+    for group in groups:
+        if not any(not negated for negated, _, _ in group):
+            raise ValueError("Each OR-branch of a query needs at least one non-negated term")
+    return groups
+
+
+class PostSearchIndex:
+    """Full-text index stored alongside the posts table in the same DuckDB file."""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def create_tables(self):
+        self.conn.execute(f"CREATE TABLE IF NOT EXISTS search_postings ({POSTINGS_COLUMNS})")
+        self.conn.execute(f"CREATE TABLE IF NOT EXISTS search_postings_tail ({POSTINGS_COLUMNS})")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS search_docs (
+                post_id VARCHAR PRIMARY KEY,
+                doc_len INTEGER
+            )
+        """)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS search_terms (
+                term VARCHAR PRIMARY KEY,
+                df BIGINT
+            )
+        """)
+        # Document count and total length for BM25, kept current by add_documents
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS search_stats (
+                n BIGINT,
+                total_len BIGINT
+            )
+        """)
+        if not self.conn.execute("SELECT COUNT(*) FROM search_stats").fetchone()[0]:
+            self.conn.execute("INSERT INTO search_stats SELECT COUNT(*), COALESCE(SUM(doc_len), 0) FROM search_docs")
+        self._migrate_postings()
+
+    def _migrate_postings(self):
+        """Rewrite postings from the older unclustered (term, post_id, tf) layout as one sorted run."""
+        columns = {row[0] for row in self.conn.execute("DESCRIBE search_postings").fetchall()}
+        if 'platform' in columns:
+            return
+        logger.info("Clustering search postings by term (one-time migration)")
+        self.conn.execute("DROP INDEX IF EXISTS idx_search_postings_term")
+        self.conn.execute("ALTER TABLE search_postings RENAME TO search_postings_old")
+        self.conn.execute("""
+            CREATE TABLE search_postings AS
+            SELECT sp.term, sp.post_id, sp.tf, sd.doc_len, p.timestamp, p.vip_target, p.platform
+            FROM search_postings_old sp
+            JOIN search_docs sd USING (post_id)
+            JOIN posts p ON p.id = sp.post_id
+            ORDER BY sp.term
+        """)
+        self.conn.execute("DROP TABLE search_postings_old")
+
+    def merge_tail(self):
+        """Sort the buffered postings into a new run of search_postings."""
+        self.conn.execute("INSERT INTO search_postings SELECT * FROM search_postings_tail ORDER BY term")
+        self.conn.execute("DELETE FROM search_postings_tail")
+
+    def add_documents(self, docs):
+        """Index (post_id, text) pairs of stored posts. Posts already in the index are skipped."""
+        postings = []
+        lengths = []
+        for post_id, text in docs:
+            tokens = tokenize(text)
+            lengths.append((post_id, len(tokens)))
+            for term, tf in Counter(tokens).items():
+                postings.append((term, post_id, tf))
+        if not lengths:
+            return 0
+
+        docs_df = pd.DataFrame(lengths, columns=['post_id', 'doc_len'])
+        postings_df = pd.DataFrame(postings, columns=['term', 'post_id', 'tf'])
+        self.conn.register('new_search_docs', docs_df)
+        self.conn.register('new_search_postings', postings_df)
+        try:
+            self.conn.execute("""
+                CREATE TEMP TABLE fresh_search_docs AS
+                SELECT DISTINCT ON (post_id) post_id, doc_len FROM new_search_docs
+                WHERE post_id NOT IN (SELECT post_id FROM search_docs)
+            """)
+            added = self.conn.execute("SELECT COUNT(*) FROM fresh_search_docs").fetchone()[0]
+            self.conn.execute("INSERT INTO search_docs SELECT * FROM fresh_search_docs")
+            self.conn.execute("""
+                INSERT INTO search_postings_tail
+                SELECT sp.term, sp.post_id, sp.tf, fd.doc_len, p.timestamp, p.vip_target, p.platform
+                FROM new_search_postings sp
+                JOIN fresh_search_docs fd USING (post_id)
+                JOIN posts p ON p.id = sp.post_id
+            """)
+            self.conn.execute("""
+                INSERT INTO search_terms
+                SELECT term, COUNT(*) FROM new_search_postings
+                WHERE post_id IN (SELECT post_id FROM fresh_search_docs)
+                GROUP BY term
+                ON CONFLICT (term) DO UPDATE SET df = search_terms.df + excluded.df
+            """)
+            self.conn.execute("""
+                UPDATE search_stats
+                SET n = search_stats.n + fresh.n, total_len = search_stats.total_len + fresh.total_len
+                FROM (SELECT COUNT(*) AS n, COALESCE(SUM(doc_len), 0) AS total_len FROM fresh_search_docs) fresh
+            """)
+        finally:
+            self.conn.execute("DROP TABLE IF EXISTS fresh_search_docs")
+            self.conn.unregister('new_search_docs')
+            self.conn.unregister('new_search_postings')
+        if self.conn.execute("SELECT COUNT(*) FROM search_postings_tail").fetchone()[0] >= SEARCH_TAIL_ROWS:
+            self.merge_tail()
+        return added
+
+    def index_missing_posts(self, batch_size=50000):
+        """Backfill posts stored before the index existed."""
+        total = 0
+        while True:
+            rows = self.conn.execute("""
+                SELECT id, content FROM posts
+                WHERE id NOT IN (SELECT post_id FROM search_docs)
+                LIMIT ?
+            """, [batch_size]).fetchall()
+            if not rows:
+                break
+            total += self.add_documents(rows)
+        if total:
+            logger.info(f"Indexed {total} existing posts for search")
+        return total
+
+    def _clause_sql(self, tokens, is_phrase):
+        params = []
+        parts = []
+        for term in dict.fromkeys(tokens):
+            parts.append("SELECT post_id FROM hits WHERE term = ?")
+            params.append(term)
+        sql = " INTERSECT ".join(parts)
+        if is_phrase:
+            # Postings only prove the terms co-occur; verify adjacency on the candidates
+            sql = f"SELECT id AS post_id FROM posts WHERE id IN ({sql}) AND regexp_matches(lower(content), ?)"
+            params.append(r"\b" + r"[^a-z0-9]+".join(tokens) + r"\b")
+        return sql, params
+
+    def _term_weights(self, terms):
+        """BM25 idf per term and the average document length, from search_terms and search_stats."""
+        n, total_len = self.conn.execute("SELECT SUM(n), SUM(total_len) FROM search_stats").fetchone()
+        n = n or 0
+        placeholders = ", ".join("?" for _ in terms)
+        df = dict(self.conn.execute(f"SELECT term, df FROM search_terms WHERE term IN ({placeholders})",
+                                    list(terms)).fetchall())
+        idf = {t: math.log(1 + (n - df[t] + 0.5) / (df[t] + 0.5)) for t in terms if t in df}
+        return idf, (total_len / n if n else 1.0)
+
+    def search(self, query, vip=None, platform=None, since=None, until=None,
+               min_score=None, max_score=None, limit=50, offset=0):
+        """
+        Run a BM25-ranked search with optional post filters.
+        Returns (total_matches, rows) where rows are dicts of post columns plus 'relevance'.
+
+        Postings are read with one `term = ?` lookup per query term and run; the boolean
+        query, the ranking and all filters but the score range only ever touch those rows,
+        and full post rows are read for the returned page alone.
+        """
+        groups = parse_query(query)
+        if not groups:
+            raise ValueError("Search query is empty")
+
+        terms = []
+        positive_terms = set()
+        for group in groups:
+            for negated, tokens, _ in group:
+                terms.extend(tokens)
+                if not negated:
+                    positive_terms.update(tokens)
+        terms = list(dict.fromkeys(terms))
+        idf, avgdl = self._term_weights(positive_terms)
+        if not idf:
+            return 0, []
+
+        params = []
+        lookups = []
+        for term in terms:
+            for table in ('search_postings', 'search_postings_tail'):
+                lookups.append(f"SELECT * FROM {table} WHERE term = ?")
+                params.append(term)
+        hits_sql = " UNION ALL ".join(lookups)
+
+        group_sqls = []
+        for group in groups:
+            include = []
+            exclude = []
+            for negated, tokens, is_phrase in group:
+                (exclude if negated else include).append(self._clause_sql(tokens, is_phrase))
+            sql = " INTERSECT ".join(f"({c})" for c, _ in include)
+            if exclude:
+                sql = f"({sql}) EXCEPT (" + " UNION ".join(f"({c})" for c, _ in exclude) + ")"
+            for _, clause_params in include + exclude:
+                params.extend(clause_params)
+            group_sqls.append(f"({sql})")
+        matched_sql = " UNION ".join(group_sqls)
+
+        weights_sql = ", ".join("(?, ?)" for _ in idf)
+        for term, weight in idf.items():
+            params.extend([term, weight])
+
+        # Post attributes on the postings serve these filters; only the mutable threat
+        # score needs the posts table
+        filters = []
+        if vip:
+            filters.append("h.vip_target = ?")
+            params.append(vip)
+        if platform:
+            filters.append("h.platform = ?")
+            params.append(platform)
+        if since:
+            filters.append("h.timestamp >= ?")
+            params.append(since)
+        if until:
+            filters.append("h.timestamp < ?")
+            params.append(until)
+        score_filters = []
+        if min_score is not None:
+            score_filters.append("p.threat_score >= ?")
+            params.append(min_score)
+        if max_score is not None:
+            score_filters.append("p.threat_score <= ?")
+            params.append(max_score)
+        where = ("WHERE " + " AND ".join(filters)) if filters else ""
+        score_join = ""
+        if score_filters:
+            score_join = "JOIN posts p ON p.id = r.post_id AND " + " AND ".join(score_filters)
+        params.extend([limit, offset])
+
+        page = self.conn.execute(f"""
+            WITH hits AS MATERIALIZED ({hits_sql}),
+            matched AS ({matched_sql}),
+            weights (term, idf) AS (VALUES {weights_sql}),
+            ranked AS (
+                SELECT h.post_id, ANY_VALUE(h.timestamp) AS timestamp,
+                       SUM(w.idf * h.tf * ({BM25_K1} + 1)
+                           / (h.tf + {BM25_K1} * (1 - {BM25_B} + {BM25_B} * h.doc_len / {float(avgdl)}))) AS relevance
+                FROM hits h
+                JOIN weights w USING (term)
+                JOIN matched USING (post_id)
+                {where}
+                GROUP BY h.post_id
+            )
+            SELECT r.post_id, r.relevance, COUNT(*) OVER () AS total_matches
+            FROM ranked r
+            {score_join}
+            ORDER BY r.relevance DESC, r.timestamp DESC, r.post_id
+            LIMIT ? OFFSET ?
+        """, params).fetchall()
+
+        if not page:
+            # Past the last page: still report how many matches exist
+            total = self.count(query, vip, platform, since, until, min_score, max_score) if offset else 0
+            return total, []
+
+        placeholders = ", ".join("?" for _ in page)
+        cursor = self.conn.execute(f"SELECT * FROM posts WHERE id IN ({placeholders})", [post_id for post_id, _, _ in page])
+        columns = [d[0] for d in cursor.description]
+        posts = {post['id']: post for post in (dict(zip(columns, row)) for row in cursor.fetchall())}
+        rows = []
+        for post_id, relevance, _ in page:
+            row = posts[post_id]
+            row['relevance'] = relevance
+            rows.append(row)
+        return page[0][2], rows
+
+    def count(self, query, vip=None, platform=None, since=None, until=None,
+              min_score=None, max_score=None):
+        total, _ = self.search(query, vip, platform, since, until, min_score, max_score, limit=1, offset=0)
+        return total
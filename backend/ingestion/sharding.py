@@ -0,0 +1,179 @@
+"""
+VIP Threat Monitoring - Sharded Storage and Processing
+Spreads monitoring over several ingestion workers on one machine.
+
+- Each VIP hashes to one of STORAGE_PARTITIONS fixed partitions. A partition is its own
+  DuckDB file with the full schema (posts, search index, author profiles, alerts, policy).
+- Partitions are assigned to the live workers with a consistent-hash ring, so a worker
+  joining or leaving moves only about 1/N of the partitions.
+- A worker writes a partition only while it holds that partition's lease (an flock), so
+  every file keeps a single writer even while ownership is changing hands.
+- The API attaches every partition read-only and reads them through UNION ALL views named
+  after the single-file tables, so its queries are the same in both layouts.
+
+Enabled by setting SHARD_DIR; without it everything uses the single DATABASE_PATH file.
+"""
+
+import os
+import re
+import time
+import fcntl
+import bisect
+import hashlib
+import logging
+
+import duckdb
+
+logger = logging.getLogger(__name__)
+
+PARTITIONS = int(os.getenv('STORAGE_PARTITIONS', 16))
+# Points per worker on the ring; more points give a more even split
+RING_VNODES = int(os.getenv('SHARD_RING_VNODES', 64))
+
+# Tables every partition holds, read as one logical table by the API
+PARTITIONED_TABLES = ('posts', 'scoring_policy', 'search_postings', 'search_postings_tail', 'search_docs',
+                      'search_stats', 'author_profiles', 'campaign_alerts')
+
+_PARTITION_FILE = re.compile(r'^p(\d+)\.db$')
+
+
+def sharding_enabled():
+    return bool(os.getenv('SHARD_DIR'))
+
+
+def stable_hash(key):
+    """64-bit hash that is the same in every process (unlike hash())."""
+    return int.from_bytes(hashlib.md5(str(key).encode('utf-8')).digest()[:8], 'big')
+
+
+def partition_for(vip_name, partitions=PARTITIONS):
+    return stable_hash(vip_name) % partitions
+
+
+class HashRing:
+    """Consistent-hash ring mapping keys to members."""
+
+    def __init__(self, members, vnodes=RING_VNODES):
+        self.members = sorted(set(members))
+        points = sorted((stable_hash(f"{member}#{i}"), member) for member in self.members for i in range(vnodes))
+        self._hashes = [h for h, _ in points]
+        self._owners = [member for _, member in points]
+
+    def assignments(self, partitions=PARTITIONS):
+        """
+        Member -> sorted partition numbers. Loads are bounded (consistent hashing with
+        bounded loads): a member already holding its ceil(partitions / members) share
+        passes the partition on to the next member clockwise, so a handful of
+        partitions still splits evenly.
+        """
+        owned = {member: [] for member in self.members}
+        if not owned:
+            return owned
+        cap = -(-partitions // len(owned))
+        for partition in range(partitions):
+            index = bisect.bisect(self._hashes, stable_hash(f"partition-{partition}"))
+            while True:
+                member = self._owners[index % len(self._owners)]
+                if len(owned[member]) < cap:
+                    owned[member].append(partition)
+                    break
+                index += 1
+        return owned
+
+
+class PartitionLayout:
+    """Where the partition files and their lease files live."""
+
+    def __init__(self, directory=None, partitions=None):
+        self.directory = directory or os.getenv('SHARD_DIR', './data/shards')
+        self.partitions = partitions or PARTITIONS
+        os.makedirs(self.directory, exist_ok=True)
+
+    def path(self, partition):
+        return os.path.join(self.directory, f"p{partition:03d}.db")
+
+    def lease_path(self, partition):
+        return os.path.join(self.directory, f"p{partition:03d}.lease")
+
+    def existing(self):
+        """Partition number -> path for every partition file created so far."""
+        found = {}
+        for name in sorted(os.listdir(self.directory)):
+            match = _PARTITION_FILE.match(name)
+            if match and int(match.group(1)) < self.partitions:
+                found[int(match.group(1))] = os.path.join(self.directory, name)
+        return found
+
+    def owned_by(self, worker_id, workers):
+        return HashRing(workers).assignments(self.partitions).get(worker_id, [])
+
+
+class PartitionLeases:
+    """Exclusive, non-blocking flocks on partition lease files. The kernel drops them if the worker dies."""
+
+    def __init__(self, layout):
+        self.layout = layout
+        self._files = {}
+
+    @property
+    def held(self):
+        return set(self._files)
+
+    def acquire(self, partition):
+        if partition in self._files:
+            return True
+        lease_file = open(self.layout.lease_path(partition), 'w')
+        try:
+            fcntl.flock(lease_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lease_file.close()
+            return False
+        lease_file.write(str(os.getpid()))
+        lease_file.flush()
+        self._files[partition] = lease_file
+        return True
+
+    def release(self, partition):
+        lease_file = self._files.pop(partition, None)
+        if lease_file is not None:
+            fcntl.flock(lease_file, fcntl.LOCK_UN)
+            lease_file.close()
+
+    def release_all(self):
+        for partition in list(self._files):
+            self.release(partition)
+
+
+def connect_partitions(layout, retries, delay=0.05):
+    """
+    In-memory DuckDB connection with every partition attached read-only and one view per
+    table in PARTITIONED_TABLES (plus search_terms) over all of them.
+    """
+    paths = layout.existing()
+    if not paths:
+        raise duckdb.IOException(f"No partitions in {layout.directory}; start python -m ingestion.worker first")
+    conn = duckdb.connect()
+    try:
+        for partition, path in paths.items():
+            # Each attach waits out that partition's writer on its own
+            wait = delay
+            for attempt in range(retries):
+                try:
+                    conn.execute(f"ATTACH '{path}' AS p{partition:03d} (READ_ONLY)")
+                    break
+                except duckdb.IOException:
+                    if attempt == retries - 1:
+                        raise
+                    time.sleep(wait)
+                    wait = min(wait * 2, 1.0)
+        aliases = [f"p{partition:03d}" for partition in paths]
+        for table in PARTITIONED_TABLES:
+            union = " UNION ALL BY NAME ".join(f"SELECT * FROM {alias}.{table}" for alias in aliases)
+            conn.execute(f"CREATE TEMP VIEW {table} AS {union}")
+        # Document frequencies add up across partitions
+        union = " UNION ALL ".join(f"SELECT term, df FROM {alias}.search_terms" for alias in aliases)
+        conn.execute(f"CREATE TEMP VIEW search_terms AS SELECT term, SUM(df) AS df FROM ({union}) GROUP BY term")
+    except Exception:
+        conn.close()
+        raise
+    return conn
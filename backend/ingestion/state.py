@@ -0,0 +1,152 @@
+"""
+VIP Threat Monitoring - Shared Monitoring State
+Small JSON files that let API workers and the ingestion worker coordinate without
+sharing memory or a writable database connection.
+
+- control.json is written by the API (start/stop, manual cycle requests)
+- status.json is written only by the ingestion worker (heartbeat, last run, cycle stats);
+  sharded workers (ingestion.sharding) each write status-<worker id>.json instead
+"""
+
+import os
+import re
+import json
+import time
+import tempfile
+from datetime import datetime
+
+# A worker that has not written a heartbeat for this long is reported as down.
+# Heartbeats pause while a cycle runs, so cycles get a longer allowance.
+HEARTBEAT_TIMEOUT_SECONDS = 30
+CYCLE_TIMEOUT_SECONDS = 900
+
+_WORKER_STATUS_FILE = re.compile(r'^status-(.+)\.json$')
+
+
+class MonitoringState:
+    def __init__(self, state_dir=None, worker_id=None):
+        self.state_dir = state_dir or os.getenv('MONITOR_STATE_DIR', './data/state')
+        os.makedirs(self.state_dir, exist_ok=True)
+        self.control_path = os.path.join(self.state_dir, 'control.json')
+        self.status_path = self._status_path(worker_id)
+        self.lock_path = self._lock_path(worker_id)
+
+    def read_control(self):
+        control = {'active': False, 'run_requested_at': None}
+        control.update(self._read(self.control_path))
+        return control
+
+    def update_control(self, **changes):
+        control = self.read_control()
+        control.update(changes)
+        self._write(self.control_path, control)
+        return control
+
+    def read_status(self):
+        status = {
+            'worker_pid': None,
+            'heartbeat': None,
+            'running_cycle': False,
+            'last_run': None,
+            'last_cycle': None,
+            'cycles_completed': 0,
+        }
+        status.update(self._read(self.status_path))
+        return status
+
+    def write_status(self, status):
+        self._write(self.status_path, status)
+
+    def worker_statuses(self):
+        """Worker id -> status for every sharded worker that has published one."""
+        statuses = {}
+        for name in sorted(os.listdir(self.state_dir)):
+            match = _WORKER_STATUS_FILE.match(name)
+            if match:
+                statuses[match.group(1)] = self._read(os.path.join(self.state_dir, name))
+        return statuses
+
+    def live_workers(self):
+        """
+        Ids of sharded workers that are sending heartbeats from a running process. Only the
+        status files are read: probing the workers' lock files could make a restarting
+        worker's own lock attempt fail.
+        """
+        return [worker_id for worker_id, status in self.worker_statuses().items()
+                if self.worker_alive(status) and _process_running(status['worker_pid'])]
+
+    def read_cluster_status(self):
+        """
+        Status of the ingestion side as a whole: status.json for a single worker, or the
+        sharded workers' statuses combined, with each one under 'workers'.
+        """
+        statuses = self.worker_statuses()
+        if not statuses:
+            return self.read_status()
+        alive = {worker_id: s for worker_id, s in statuses.items() if self.worker_alive(s)}
+        latest = max(statuses.values(), key=lambda s: s.get('last_run') or '')
+        freshest = max(alive.values() or statuses.values(), key=lambda s: s.get('heartbeat') or '')
+        handled = {s.get('policy_request_handled') for s in alive.values()}
+        return {
+            'worker_pid': freshest.get('worker_pid'),
+            'heartbeat': freshest.get('heartbeat'),
+            'running_cycle': any(s.get('running_cycle') for s in alive.values()),
+            'last_run': latest.get('last_run'),
+            'last_cycle': latest.get('last_cycle'),
+            'cycles_completed': sum(s.get('cycles_completed', 0) for s in statuses.values()),
+            # A policy change is only done once every live worker has applied it
+            'policy_request_handled': handled.pop() if len(handled) == 1 else None,
+            'last_policy_change': latest.get('last_policy_change'),
+            'workers': {
+                worker_id: {
+                    'alive': worker_id in alive,
+                    'worker_pid': s.get('worker_pid'),
+                    'heartbeat': s.get('heartbeat'),
+                    'running_cycle': s.get('running_cycle', False),
+                    'partitions': s.get('partitions', []),
+                    'partitions_waiting': s.get('partitions_waiting', []),
+                    'last_run': s.get('last_run'),
+                    'cycles_completed': s.get('cycles_completed', 0),
+                    'scoring_queue': s.get('scoring_queue'),
+                }
+                for worker_id, s in statuses.items()
+            },
+        }
+
+    def worker_alive(self, status=None):
+        status = status or self.read_cluster_status()
+        if not status.get('heartbeat') or not status.get('worker_pid'):
+            return False
+        age = time.time() - datetime.fromisoformat(status['heartbeat']).timestamp()
+        return age < (CYCLE_TIMEOUT_SECONDS if status.get('running_cycle') else HEARTBEAT_TIMEOUT_SECONDS)
+
+    def _status_path(self, worker_id):
+        return os.path.join(self.state_dir, f'status-{worker_id}.json' if worker_id else 'status.json')
+
+    def _lock_path(self, worker_id):
+        return os.path.join(self.state_dir, f'worker-{worker_id}.lock' if worker_id else 'worker.lock')
+
+    def _read(self, path):
+        try:
+            with open(path, 'r') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _write(self, path, data):
+        # Write-then-rename so readers never see a half-written file
+        fd, tmp_path = tempfile.mkstemp(dir=self.state_dir, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f, default=str)
+        os.replace(tmp_path, path)
+
+
+def _process_running(pid):
+    # Catches a worker killed mid-cycle long before its heartbeat allowance runs out
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass  # running under another user
+    return True
@@ -0,0 +1,316 @@
+"""
+VIP Threat Monitoring - Ingestion Worker
+Long-running process that owns all database writes: it runs the scrape -> score -> store
+cycle and publishes its state for the API processes to read.
+
+With SHARD_DIR set, several workers split the VIPs between them (see ingestion.sharding):
+each one scrapes, scores and writes only the storage partitions it owns, and ownership is
+rebalanced whenever a worker starts or stops.
+
+Usage (from backend/):
+    python -m ingestion.worker                    # MONITOR_WORKERS workers (default 1)
+    python -m ingestion.worker --workers 4        # four sharded workers, w0..w3
+    python -m ingestion.worker --worker-id w4     # one more sharded worker; takes over its share
+"""
+
+import os
+import sys
+import time
+import fcntl
+import signal
+import logging
+import argparse
+import subprocess
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from dotenv import load_dotenv
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from ingestion.ingestion import DataIngestion, load_vip_list
+from ingestion.state import MonitoringState
+from ingestion.http_cache import cache_stats
+from ingestion.sharding import PartitionLayout, PartitionLeases, partition_for, sharding_enabled
+from ai.ai_scoring import VIPThreatScorer
+from ai.spike_detection import CampaignSpikeDetector
+from ai.policy import ScoringPolicy
+from ai.scoring_queue import ScoringQueue, vip_priorities
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# How often the worker re-reads control.json and refreshes its heartbeat
+POLL_SECONDS = 1.0
+
+
+class MonitoringWorker:
+    """
+    Runs monitoring cycles over the storage partitions this worker holds. Unsharded there
+    is one partition, 0, backed by the DATABASE_PATH file, and every VIP belongs to it.
+    """
+
+    def __init__(self, data_ingestion=None, threat_scorer=None, state=None, interval=None, worker_id=None):
+        self.worker_id = worker_id
+        self.threat_scorer = threat_scorer or VIPThreatScorer()
+        self.state = state or MonitoringState(worker_id=worker_id)
+        self.spike_detector = CampaignSpikeDetector()
+        self.scoring_queue = ScoringQueue()
+        # Per-cycle scoring time; whatever is left is drained between cycles
+        self.scoring_budget = float(os.getenv('SCORING_BUDGET_SECONDS', 30))
+        self.shed_after = timedelta(hours=float(os.getenv('SCORING_SHED_AFTER_HOURS', 24)))
+        self.interval = interval if interval is not None else float(os.getenv('MONITOR_INTERVAL_SECONDS', 300))
+        # Partition number -> DataIngestion writing that partition's file
+        self.partitions = {}
+        self.layout = None
+        self.leases = None
+        if worker_id:
+            self.layout = PartitionLayout()
+            self.leases = PartitionLeases(self.layout)
+        else:
+            self.partitions[0] = data_ingestion or DataIngestion()
+            self._sync_policy()
+        self.status = self.state.read_status()
+        self._stopping = False
+        self._lock_file = None
+
+    @property
+    def partition_count(self):
+        return self.layout.partitions if self.layout else 1
+
+    def run_cycle(self):
+        started = time.monotonic()
+        vips = load_vip_list()
+        owned = self.owned_vips(vips)
+        ingestion_results = defaultdict(int)
+        for partition, partition_vips in owned.items():
+            if not partition_vips:
+                continue
+            for platform, added in self.partitions[partition].run_ingestion_cycle(partition_vips).items():
+                ingestion_results[platform] += added
+        self.scoring_queue.vip_priorities = vip_priorities(vips)
+        self.refill_queue()
+        posts_scored, campaign_alerts = self.score_queued(self.scoring_budget)
+        return {
+            'ingestion_results': dict(ingestion_results),
+            'vips_monitored': sum(len(partition_vips) for partition_vips in owned.values()),
+            'partitions': sorted(self.partitions),
+            'posts_scored': posts_scored,
+            'campaign_alerts': campaign_alerts,
+            'scoring_queue': self.scoring_queue.snapshot(),
+            'http_cache': cache_stats(),
+            'duration_seconds': round(time.monotonic() - started, 3),
+        }
+
+    def owned_vips(self, vips):
+        """Partition -> VIPs, for the partitions this worker holds."""
+        owned = {partition: [] for partition in self.partitions}
+        for vip in vips:
+            partition = partition_for(vip['name'], self.partition_count)
+            if partition in owned:
+                owned[partition].append(vip)
+        return owned
+
+    def refill_queue(self):
+        """
+        Offer each partition's highest-priority unscored posts to the scoring queue. When it
+        is full, shed stale posts that rank below everything it holds.
+        """
+        queue = self.scoring_queue
+        for partition, ingestion in self.partitions.items():
+            posts_df = ingestion.get_posts_for_analysis(limit=queue.capacity, ranked_by=queue)
+            posts_df['partition'] = partition
+            queue.push_posts(posts_df, author_store=ingestion.author_profiles)
+        if queue.saturated:
+            cutoff = datetime.utcnow() - self.shed_after
+            floor = queue.lowest_priority
+            queue.record_shed(sum(ingestion.shed_unscored_posts(cutoff, ranked_by=queue, below=floor)
+                                  for ingestion in self.partitions.values()))
+
+    def score_queued(self, budget):
+        """Score queued posts in priority order, one batch at a time, for up to `budget` seconds."""
+        deadline = time.monotonic() + budget
+        posts_scored = 0
+        campaign_alerts = 0
+        while len(self.scoring_queue) and time.monotonic() < deadline:
+            batch = self.scoring_queue.pop_batch()
+            for partition, posts_df in batch.groupby('partition', sort=False):
+                ingestion = self.partitions.get(partition)
+                if ingestion is None:
+                    continue  # handed over since it was queued; the new owner scores it
+                posts_df = posts_df.reset_index(drop=True)
+                scores = self.threat_scorer.score_posts(posts_df, author_store=ingestion.author_profiles)
+                # Written per batch so the top posts are visible to the API within seconds
+                scored = ingestion.update_post_scores(scores)
+                self.scoring_queue.record_scored(scored)
+                posts_scored += scored
+                alerts = self.spike_detector.observe_scores(posts_df, scores)
+                campaign_alerts += ingestion.store_campaign_alerts(alerts)
+        return posts_scored, campaign_alerts
+
+    def rebalance(self):
+        """
+        Hand over partitions the ring now gives to another live worker and take up the ones
+        it gives to this one. A partition still leased by its previous owner (mid-cycle) is
+        taken up on a later call.
+        """
+        if self.layout is None:
+            return
+        workers = set(self.state.live_workers()) | {self.worker_id}
+        wanted = set(self.layout.owned_by(self.worker_id, workers))
+        for partition in sorted(set(self.partitions) - wanted):
+            del self.partitions[partition]
+            self.leases.release(partition)
+            logger.info(f"Worker {self.worker_id} handed over partition {partition}")
+        acquired = []
+        for partition in sorted(wanted - set(self.partitions)):
+            if self.leases.acquire(partition):
+                self.partitions[partition] = DataIngestion(db_path=self.layout.path(partition))
+                acquired.append(partition)
+        if acquired:
+            logger.info(f"Worker {self.worker_id} took up partitions {acquired} ({len(workers)} workers)")
+            self._sync_policy()
+        self.status['partitions'] = sorted(self.partitions)
+        self.status['partitions_waiting'] = sorted(wanted - set(self.partitions))
+
+    def run(self):
+        self._acquire_lock()
+        signal.signal(signal.SIGTERM, self._handle_signal)
+        signal.signal(signal.SIGINT, self._handle_signal)
+        name = f"Ingestion worker {self.worker_id or os.getpid()}"
+        logger.info(f"{name} started (interval {self.interval}s)")
+        if self.layout is not None:
+            # Let workers started alongside this one register before partitions are claimed
+            self._publish(running_cycle=False)
+            time.sleep(POLL_SECONDS)
+
+        next_run = 0.0
+        handled_request = self.state.read_control().get('run_requested_at')
+        while not self._stopping:
+            self.rebalance()
+            control = self.state.read_control()
+            manual = control.get('run_requested_at') and control['run_requested_at'] != handled_request
+            due = control.get('active') and time.monotonic() >= next_run
+
+            if control.get('policy_requested_at') and \
+                    control['policy_requested_at'] != self.status.get('policy_request_handled'):
+                self._apply_policy(control)
+
+            if manual or due:
+                handled_request = control.get('run_requested_at')
+                self._publish(running_cycle=True)
+                try:
+                    logger.info("Running monitoring cycle...")
+                    result = self.run_cycle()
+                    result['trigger'] = 'manual' if manual else 'scheduled'
+                    self.status['last_run'] = datetime.now().isoformat()
+                    self.status['last_cycle'] = result
+                    self.status['cycles_completed'] = self.status.get('cycles_completed', 0) + 1
+                    logger.info("Monitoring cycle completed")
+                except Exception as e:
+                    logger.error(f"Error in monitoring cycle: {e}")
+                    self.status['last_cycle'] = {'error': str(e), 'finished_at': datetime.now().isoformat()}
+                next_run = time.monotonic() + self.interval
+                self._publish(running_cycle=False)
+            elif len(self.scoring_queue):
+                # Drain leftover backlog between cycles without blocking control requests
+                try:
+                    self.score_queued(POLL_SECONDS)
+                except Exception as e:
+                    logger.error(f"Error scoring queued posts: {e}")
+                    time.sleep(POLL_SECONDS)
+                self._publish(running_cycle=False, scoring_queue=self.scoring_queue.snapshot())
+            else:
+                self._publish(running_cycle=False)
+                time.sleep(POLL_SECONDS)
+
+        if self.leases is not None:
+            self.leases.release_all()
+            self.status['partitions'] = []
+        self._publish(running_cycle=False, worker_pid=None)
+        logger.info(f"{name} stopped")
+
+    def _apply_policy(self, control):
+        try:
+            policy = ScoringPolicy(**control['scoring_policy'])
+            policy.version = self.threat_scorer.policy.version + 1
+            updated = sum(ingestion.apply_scoring_policy(policy) for ingestion in self.partitions.values())
+            self.threat_scorer.policy = policy
+            self.status['last_policy_change'] = {'version': policy.version, 'posts_rescored': updated}
+        except Exception as e:
+            logger.error(f"Failed to apply scoring policy: {e}")
+            self.status['last_policy_change'] = {'error': str(e)}
+        self._publish(policy_request_handled=control['policy_requested_at'])
+
+    def _sync_policy(self):
+        """Adopt the newest policy stored in any held partition and apply it to those behind."""
+        stored = {partition: ingestion.get_scoring_policy() for partition, ingestion in self.partitions.items()}
+        newest = max((policy for policy in stored.values() if policy), key=lambda p: p['version'], default=None)
+        if newest and newest['version'] > self.threat_scorer.policy.version:
+            self.threat_scorer.policy = ScoringPolicy(**newest)
+        policy = self.threat_scorer.policy
+        for partition, current in stored.items():
+            # e.g. a partition whose owner was down while a policy change went out
+            if policy.version > (current['version'] if current else 0):
+                self.partitions[partition].apply_scoring_policy(policy)
+
+    def _publish(self, **changes):
+        self.status['worker_pid'] = os.getpid()
+        self.status.update(changes)
+        self.status['heartbeat'] = datetime.now().isoformat()
+        self.state.write_status(self.status)
+
+    def _acquire_lock(self):
+        # Only one process may write to the database (or, sharded, run under this worker id)
+        self._lock_file = open(self.state.lock_path, 'w')
+        try:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise SystemExit(f"Another ingestion worker holds {self.state.lock_path}")
+        self._lock_file.write(str(os.getpid()))
+        self._lock_file.flush()
+
+    def _handle_signal(self, signum, frame):
+        logger.info(f"Received signal {signum}, finishing current cycle")
+        self._stopping = True
+
+
+def run_workers(count):
+    """Start `count` sharded workers (w0, w1, ...) as child processes and wait for them."""
+    children = [subprocess.Popen([sys.executable, '-m', 'ingestion.worker', '--worker-id', f'w{i}'])
+                for i in range(count)]
+
+    def forward(signum, frame):
+        for child in children:
+            if child.poll() is None:
+                child.send_signal(signum)
+
+    signal.signal(signal.SIGTERM, forward)
+    signal.signal(signal.SIGINT, forward)
+    for child in children:
+        child.wait()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the ingestion worker(s)")
+    parser.add_argument('--workers', type=int, default=int(os.getenv('MONITOR_WORKERS', 1)),
+                        help="sharded workers to start (more than 1 needs SHARD_DIR)")
+    parser.add_argument('--worker-id', help="run a single sharded worker with this id")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    if (args.worker_id or args.workers > 1) and not sharding_enabled():
+        raise SystemExit("Sharded workers need SHARD_DIR (see .env.example)")
+    if args.worker_id:
+        MonitoringWorker(worker_id=args.worker_id).run()
+    elif sharding_enabled() and args.workers > 1:
+        run_workers(args.workers)
+    elif sharding_enabled():
+        MonitoringWorker(worker_id='w0').run()
+    else:
+        MonitoringWorker().run()
+
+
+if __name__ == "__main__":
+    main()
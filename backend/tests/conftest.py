@@ -0,0 +1,9 @@
+"""
+VIP Threat Monitoring - Test Configuration
+Puts backend/ on sys.path so tests import `ingestion.*` and `ai.*` the way the services do
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
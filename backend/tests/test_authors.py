@@ -0,0 +1,97 @@
+from datetime import datetime, timedelta
+
+import duckdb
+import pandas as pd
+import pytest
+
+from ai.ai_scoring import VIPThreatScorer
+from ingestion.authors import AuthorProfileStore, author_key
+
+T0 = datetime(2024, 1, 1)
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setenv('AUTHOR_RISK_HALF_LIFE_HOURS', '10')
+    path = str(tmp_path / 'authors.db')
+    profiles = AuthorProfileStore(lambda: duckdb.connect(path))
+    conn = duckdb.connect(path)
+    profiles.create_table(conn)
+    conn.close()
+    return profiles
+
+
+def test_risk_decays_between_post_times(store):
+    store.load({('twitter', 'a1')})
+    store.record('twitter', 'a1', 'alice', 'threat', 1.0, now=T0)
+    assert store.get('twitter', 'a1', now=T0 + timedelta(hours=10))['risk_score'] == pytest.approx(0.5)
+    store.record('twitter', 'a1', 'alice', 'threat', 1.0, now=T0 + timedelta(hours=10))
+    assert store.get('twitter', 'a1', now=T0 + timedelta(hours=10))['risk_score'] == pytest.approx(1.5)
+
+
+def test_older_post_is_decayed_to_latest_update(store):
+    store.load({('twitter', 'a1')})
+    store.record('twitter', 'a1', 'alice', 'threat', 1.0, now=T0 + timedelta(hours=10))
+    store.record('twitter', 'a1', 'alice', 'spam', 1.0, now=T0)
+    profile = store.get('twitter', 'a1', now=T0 + timedelta(hours=10))
+    assert profile['risk_score'] == pytest.approx(1.5)
+    assert profile['risk_updated_at'] == T0 + timedelta(hours=10)
+    assert profile['first_seen'] == T0
+    assert profile['last_seen'] == T0 + timedelta(hours=10)
+
+
+def test_first_and_last_seen_follow_post_time_across_flushes(store):
+    store.load({('twitter', 'a1')})
+    store.record('twitter', 'a1', 'alice', 'threat', 0.5, now=T0 + timedelta(days=2))
+    store.flush()
+
+    # A later batch scores posts written before and after the stored range
+    store.load({('twitter', 'a1')})
+    store.record('twitter', 'a1', 'alice', 'threat', 0.5, now=T0)
+    store.record('twitter', 'a1', 'alice', 'threat', 0.5, now=T0 + timedelta(days=1))
+    store.flush()
+
+    profile, = store.fetch('a1')
+    assert profile['post_count'] == 3
+    assert profile['first_seen'] == T0
+    assert profile['last_seen'] == T0 + timedelta(days=2)
+    assert profile['risk_updated_at'] == T0 + timedelta(days=2)
+
+
+def test_author_key_skips_missing_values():
+    assert author_key('a1', 'alice') == 'a1'
+    assert author_key(float('nan'), 'alice') == 'alice'
+    assert author_key(pd.NA, '') is None
+    assert author_key(None, float('nan')) is None
+
+
+def test_record_ignores_missing_author(store):
+    store.record('telegram', float('nan'), None, 'threat', 1.0, now=T0)
+    store.record('telegram', '', None, 'threat', 1.0, now=T0)
+    assert store.flush() == 0
+
+
+@pytest.fixture
+def scorer(tmp_path, monkeypatch):
+    monkeypatch.setenv('MODEL_PATH', str(tmp_path / 'model.pkl'))
+    monkeypatch.setenv('FEATURE_STORE_DIR', str(tmp_path / 'features'))
+    scorer = VIPThreatScorer()
+    scorer.train_model()
+    return scorer
+
+
+def test_authorless_posts_score_without_a_profile(scorer, store):
+    # Telegram channel posts have neither an author id nor a username
+    posts_df = pd.DataFrame([
+        {'id': 'p1', 'platform': 'telegram', 'author_id': 'a1', 'author_username': 'alice',
+         'content': 'Time to bomb the senator', 'vip_target': 'VIP A', 'timestamp': pd.Timestamp(T0)},
+        {'id': 'p2', 'platform': 'telegram', 'author_id': float('nan'), 'author_username': None,
+         'content': 'Channel announcement', 'vip_target': 'VIP A', 'timestamp': pd.Timestamp(T0)},
+    ])
+    assert [s['id'] for s in scorer.score_posts(posts_df, author_store=store)] == ['p1', 'p2']
+    assert [p['author_id'] for p in store.fetch('a1')] == ['a1']
+    conn = store._connect()
+    try:
+        assert conn.execute("SELECT count(*) FROM author_profiles").fetchone() == (1,)
+    finally:
+        conn.close()
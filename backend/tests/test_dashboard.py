@@ -0,0 +1,80 @@
+import os
+import sys
+import time
+import tempfile
+import threading
+import subprocess
+
+import pytest
+from fastapi.testclient import TestClient
+
+from ingestion.ingestion import DataIngestion
+from ingestion.state import MonitoringState
+
+
+@pytest.fixture
+def dashboard(tmp_path, monkeypatch):
+    monkeypatch.setenv('DATABASE_PATH', str(tmp_path / 'missing.db'))
+    monkeypatch.setenv('MODEL_PATH', str(tmp_path / 'model.pkl'))
+    monkeypatch.setenv('MONITOR_STATE_DIR', str(tmp_path / 'state'))
+    # Imported here so its module-level state lands in tmp_path
+    from dashboard import dashboard
+    monkeypatch.setattr(dashboard, 'monitoring_state', MonitoringState())
+    return dashboard
+
+
+@pytest.fixture
+def api(dashboard, monkeypatch):
+    monkeypatch.setattr(dashboard, 'components_ready', threading.Event())
+    monkeypatch.setattr(dashboard, 'components_error', None)
+    with TestClient(dashboard.app) as client:
+        assert dashboard.components_ready.wait(30)
+        yield client
+
+
+def test_missing_database_fails_fast(api):
+    started = time.monotonic()
+    body = api.get('/health').json()
+    assert body['status'] == 'unhealthy' and 'does not exist' in body['error']
+    assert api.get('/api/posts/recent').status_code == 500
+    assert time.monotonic() - started < 1.0
+
+
+def test_start_and_stop_write_control(api, dashboard):
+    assert 'no ingestion worker' in api.post('/api/monitoring/start').json()['message']
+    assert dashboard.monitoring_state.read_control()['active'] is True
+    api.post('/api/monitoring/stop')
+    assert dashboard.monitoring_state.read_control()['active'] is False
+    assert api.post('/api/monitoring/run-cycle').status_code == 503
+
+
+def test_health_answers_while_components_load(dashboard, tmp_path, monkeypatch):
+    monkeypatch.setenv('DATABASE_PATH', DataIngestion(db_path=str(tmp_path / 'posts.db')).db_path)
+    release = threading.Event()
+    load = dashboard.init_components
+
+    def slow_init():
+        release.wait(30)
+        load()
+
+    monkeypatch.setattr(dashboard, 'init_components', slow_init)
+    monkeypatch.setattr(dashboard, 'INIT_WAIT_SECONDS', 0.1)
+    monkeypatch.setattr(dashboard, 'components_ready', threading.Event())
+    with TestClient(dashboard.app) as client:
+        assert client.get('/health').json()['status'] == 'starting'
+        response = client.get('/api/config')
+        assert response.status_code == 503 and response.headers['Retry-After'] == '1'
+        release.set()
+        assert dashboard.components_ready.wait(30)
+        assert client.get('/api/config').status_code == 200
+        assert client.get('/health').json()['status'] == 'healthy'
+
+
+def test_heavy_imports_are_deferred():
+    backend = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    script = ("import sys; sys.path.insert(0, 'dashboard'); import dashboard; "
+              "print(' '.join(m for m in ('duckdb', 'pandas', 'pyarrow', 'numpy', 'sklearn', 'joblib') if m in sys.modules))")
+    result = subprocess.run([sys.executable, '-c', script], cwd=backend, capture_output=True, text=True, timeout=60,
+                            env=dict(os.environ, MONITOR_STATE_DIR=tempfile.mkdtemp()))
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == ''
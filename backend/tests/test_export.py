@@ -0,0 +1,61 @@
+import os
+from datetime import datetime, timedelta
+
+import duckdb
+import pytest
+
+from ingestion import ingestion as ingestion_module
+from ingestion.ingestion import DataIngestion
+from ingestion.models import CanonicalItem
+
+T0 = datetime(2024, 1, 1)
+
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(ingestion_module, 'EXPORT_TMP_DIR', str(tmp_path / 'exports'))
+    os.makedirs(tmp_path / 'exports')
+    path = str(tmp_path / 'posts.db')
+    DataIngestion(db_path=path).store_items([
+        CanonicalItem(id=f'p{i}', platform='twitter' if i % 2 else 'reddit', platform_id=str(i),
+                      vip_target='VIP A', text=f'post {i}', created_at=T0 + timedelta(minutes=i))
+        for i in range(5000)
+    ])
+    return path
+
+
+def test_export_streams_snapshot_after_closing_database(db_path, tmp_path):
+    reader_api = DataIngestion(db_path=db_path, read_only=True)
+    exported = []
+    with reader_api.export_posts(['id', 'platform'], platform='twitter', batch_size=1000) as reader:
+        assert reader.schema.names == ['id', 'platform']
+        assert len(os.listdir(tmp_path / 'exports')) == 1
+        # The database is free for the worker while the client is still downloading
+        writer = duckdb.connect(db_path)
+        writer.execute("DELETE FROM posts")
+        writer.close()
+        for batch in reader:
+            assert batch.num_rows <= 1000
+            exported.extend(batch.column('id').to_pylist())
+    assert len(exported) == 2500
+    assert all(int(post_id[1:]) % 2 for post_id in exported)
+    assert os.listdir(tmp_path / 'exports') == []
+
+
+def test_abandoned_export_removes_snapshot(db_path, tmp_path):
+    def download():
+        with DataIngestion(db_path=db_path, read_only=True).export_posts(batch_size=1024) as reader:
+            for batch in reader:
+                yield batch
+
+    stream = download()
+    next(stream)
+    stream.close()  # client went away mid-download
+    assert os.listdir(tmp_path / 'exports') == []
+
+
+def test_failed_query_removes_snapshot(db_path, tmp_path):
+    with pytest.raises(duckdb.Error):
+        with DataIngestion(db_path=db_path, read_only=True).export_posts(['no_such_column']):
+            pass
+    assert os.listdir(tmp_path / 'exports') == []
@@ -0,0 +1,217 @@
+import os
+import shutil
+
+import numpy as np
+import pytest
+import scipy.sparse as sp
+
+from ai import feature_store
+from ai.feature_store import FeatureStore, text_key
+
+WIDTH = 8
+
+
+def rows(*values):
+    """One CSR row per value, with `value` in column value % WIDTH."""
+    matrix = sp.lil_matrix((len(values), WIDTH))
+    for i, value in enumerate(values):
+        matrix[i, value % WIDTH] = value
+    return matrix.tocsr()
+
+
+def dense(matrix):
+    return np.asarray(matrix.todense())
+
+
+def memory_mapped(array):
+    """True when `array` is a view onto a memory-mapped file rather than a copy."""
+    while array is not None:
+        if isinstance(array, np.memmap):
+            return True
+        array = getattr(array, 'base', None)
+    return False
+
+
+def segments(store):
+    return sorted(name for name in os.listdir(store.directory) if name.startswith('seg-'))
+
+
+@pytest.fixture
+def store(tmp_path):
+    return FeatureStore('v1', directory=str(tmp_path))
+
+
+def test_put_and_get(store):
+    store.put(['a', 'b', 'c'], rows(1, 2, 3))
+    store.put(['d'], rows(4))
+    assert len(store) == 4 and 'd' in store and 'z' not in store
+    assert (dense(store.get(['c', 'a'])) == dense(rows(3, 1))).all()
+    # Rows from several segments come back in the order asked for
+    assert (dense(store.get(['d', 'b', 'a'])) == dense(rows(4, 2, 1))).all()
+    assert store.get([]).shape == (0, WIDTH)
+    with pytest.raises(KeyError):
+        store.get(['a', 'missing'])
+
+
+def test_whole_segment_is_returned_from_the_memory_map(store):
+    store.put(['a', 'b'], rows(1, 2))
+    matrix = store.get(['a', 'b'])
+    assert memory_mapped(matrix.data) and memory_mapped(matrix.indices)
+    # A subset is copied out
+    assert not memory_mapped(store.get(['b']).data)
+
+
+def test_missing_and_later_rows_win(store):
+    store.put(['a', 'b'], rows(1, 2))
+    assert store.missing(['a', 'x', 'b', 'y']) == ['x', 'y']
+    store.put(['a'], rows(7))
+    assert (dense(store.get(['a'])) == dense(rows(7))).all()
+    assert len(store) == 2
+
+
+def test_compact_merges_all_segments(store):
+    for i in range(4):
+        store.put([f'k{i}'], rows(i + 1))
+    store.put(['k0'], rows(9))
+    store.compact()
+    assert len(segments(store)) == 1
+    assert store.stats()['segments'] == 1
+    keys = [f'k{i}' for i in range(4)]
+    assert (dense(store.get(keys)) == dense(rows(9, 2, 3, 4))).all()
+
+
+def test_compact_publishes_merged_segment_before_deleting(store, monkeypatch):
+    store.put(['a'], rows(1))
+    store.put(['b'], rows(2))
+    old = segments(store)
+    seen = []
+    rmtree = shutil.rmtree
+
+    def checking_rmtree(path, *args, **kwargs):
+        # Every removal happens with the merged segment already in place
+        seen.append(set(segments(store)) - set(old))
+        rmtree(path, *args, **kwargs)
+
+    monkeypatch.setattr(feature_store.shutil, 'rmtree', checking_rmtree)
+    store.compact()
+    assert len(seen) == 2 and all(len(new) == 1 for new in seen)
+
+
+def test_other_instance_survives_concurrent_compaction(tmp_path):
+    writer = FeatureStore('v1', directory=str(tmp_path))
+    reader = FeatureStore('v1', directory=str(tmp_path))
+    writer.put(['a', 'b'], rows(1, 2))
+    writer.put(['c'], rows(3))
+    assert reader.missing(['a', 'c']) == []
+
+    writer.compact()
+    # The reader's open segments are gone from disk; it drops them and reads the merged one
+    assert reader.missing(['a', 'b', 'c']) == []
+    assert (dense(reader.get(['c', 'a'])) == dense(rows(3, 1))).all()
+    assert reader.stats()['segments'] == 1
+
+
+def test_refresh_skips_incomplete_segments(store):
+    store.put(['a'], rows(1))
+    # A segment directory whose files are already gone (removed mid-listing)
+    os.makedirs(os.path.join(store.directory, 'seg-9999999999999999-deadbeef'))
+    store.refresh()
+    assert store.stats()['segments'] == 1
+    assert (dense(store.get(['a'])) == dense(rows(1))).all()
+
+
+def test_small_segments_are_compacted_automatically(store, monkeypatch):
+    monkeypatch.setattr(feature_store, 'MAX_SMALL_SEGMENTS', 3)
+    for i in range(4):
+        store.put([f'k{i}'], rows(i))
+    assert len(segments(store)) == 1
+    assert len(store) == 4
+
+
+def test_auto_compaction_leaves_other_writers_segments(tmp_path, monkeypatch):
+    monkeypatch.setattr(feature_store, 'MAX_SMALL_SEGMENTS', 3)
+    mine = FeatureStore('v1', directory=str(tmp_path))
+    theirs = FeatureStore('v1', directory=str(tmp_path))
+    theirs.put(['t'], rows(5))
+    their_segment = segments(mine)
+    for i in range(4):
+        mine.put([f'k{i}'], rows(i))
+    assert set(their_segment) <= set(segments(mine))
+    assert len(segments(mine)) == 2
+
+
+def test_text_keys_are_stable():
+    assert text_key('hello') == text_key('hello') != text_key('hello!')
+    assert text_key(None) == text_key('')
+
+
+def test_refresh_is_incremental(tmp_path, monkeypatch):
+    writer = FeatureStore('v1', directory=str(tmp_path))
+    for i in range(3):
+        writer.put([f'k{i}'], rows(i))
+    reader = FeatureStore('v1', directory=str(tmp_path))
+    index = reader._index
+
+    loads = []
+    load = np.load
+    monkeypatch.setattr(feature_store.np, 'load', lambda path, **kwargs: loads.append(path) or load(path, **kwargs))
+    reader.refresh()
+    assert loads == [] and reader._index is index
+
+    writer.put(['k3'], rows(3))
+    loads.clear()  # the writer's own refresh
+    assert reader.missing(['k3']) == []
+    assert len(loads) == len(feature_store.SEGMENT_ARRAYS)
+    assert reader._index is index
+
+
+def test_removed_segment_drops_only_its_own_keys(tmp_path):
+    writer = FeatureStore('v1', directory=str(tmp_path))
+    writer.put(['a', 'b'], rows(1, 2))
+    first = segments(writer)[0]
+    writer.put(['b', 'c'], rows(7, 3))
+    reader = FeatureStore('v1', directory=str(tmp_path))
+
+    # Remove the older segment behind the reader's back: 'b' lives on in the newer one
+    shutil.rmtree(os.path.join(str(tmp_path), 'v1', first))
+    reader.refresh()
+    assert sorted(reader._index) == ['b', 'c']
+    assert (dense(reader.get(['b', 'c'])) == dense(rows(7, 3))).all()
+
+
+def test_removed_segment_keys_fall_back_to_older_segment(tmp_path):
+    writer = FeatureStore('v1', directory=str(tmp_path))
+    writer.put(['a', 'b'], rows(1, 2))
+    writer.put(['b', 'c'], rows(7, 3))
+    newer = segments(writer)[1]
+    reader = FeatureStore('v1', directory=str(tmp_path))
+    assert (dense(reader.get(['b'])) == dense(rows(7))).all()
+
+    shutil.rmtree(os.path.join(str(tmp_path), 'v1', newer))
+    reader.refresh()
+    assert sorted(reader._index) == ['a', 'b']
+    assert (dense(reader.get(['a', 'b'])) == dense(rows(1, 2))).all()
+
+
+def test_segments_sort_in_write_order(store):
+    for i in range(50):
+        store.put(['k'], rows(i))
+    names = segments(store)
+    assert names == sorted(store._segments, key=store._order.get)
+    assert (dense(store.get(['k'])) == dense(rows(49))).all()
+
+
+def test_older_segment_listed_late_does_not_win(tmp_path):
+    writer = FeatureStore('v1', directory=str(tmp_path))
+    writer.put(['k'], rows(1))
+    writer.put(['k'], rows(2))
+    older = os.path.join(str(tmp_path), 'v1', segments(writer)[0])
+    reader = FeatureStore('v1', directory=str(tmp_path))
+
+    # The older segment disappears and comes back, e.g. a slow copy into place
+    os.rename(older, older.replace('seg-', '.moved-seg-'))
+    reader.refresh()
+    os.rename(older.replace('seg-', '.moved-seg-'), older)
+    reader.refresh()
+    assert reader.stats()['segments'] == 2
+    assert (dense(reader.get(['k'])) == dense(rows(2))).all()
@@ -0,0 +1,166 @@
+import io
+import os
+import time
+
+import pytest
+import requests
+from requests.adapters import HTTPAdapter
+
+from ingestion.http_cache import ConditionalCacheAdapter, ResponseCache
+
+URL = 'https://api.example.test/r/news/new.json'
+
+
+class FakeServer:
+    """Answers GETs with a fixed body and ETag, or a 304 when the client sends that ETag."""
+
+    def __init__(self, etag='"v1"', body=b'{"posts": [1, 2]}', vary=None):
+        self.etag = etag
+        self.body = body
+        self.vary = vary
+        self.requests = []
+
+    def send(self, adapter, request, **kwargs):
+        self.requests.append(dict(request.headers))
+        response = requests.Response()
+        response.url = request.url
+        response.request = request
+        response.raw = io.BytesIO()
+        response.headers['X-RateLimit-Remaining'] = str(100 - len(self.requests))
+        if request.headers.get('If-None-Match') == self.etag:
+            response.status_code = 304
+            response.reason = 'Not Modified'
+            response._content = b''
+        else:
+            response.status_code = 200
+            response.reason = 'OK'
+            response.headers['ETag'] = self.etag
+            if self.vary:
+                response.headers['Vary'] = self.vary
+            response._content = self.body
+        return response
+
+
+@pytest.fixture
+def server(monkeypatch):
+    fake = FakeServer()
+    monkeypatch.setattr(HTTPAdapter, 'send', lambda adapter, request, **kwargs: fake.send(adapter, request))
+    return fake
+
+
+def session_for(cache):
+    session = requests.Session()
+    session.mount('https://', ConditionalCacheAdapter(cache))
+    return session
+
+
+def test_not_modified_is_served_from_cache(tmp_path, server):
+    cache = ResponseCache(str(tmp_path))
+    session = session_for(cache)
+
+    first = session.get(URL)
+    assert first.status_code == 200
+    assert 'If-None-Match' not in server.requests[0]
+
+    second = session.get(URL)
+    assert server.requests[1]['If-None-Match'] == '"v1"'
+    assert second.status_code == 200
+    assert second.json() == {'posts': [1, 2]}
+    # Per-request headers come from the 304, the rest from the stored response
+    assert second.headers['X-RateLimit-Remaining'] == '98'
+    assert second.headers['ETag'] == '"v1"'
+    assert dict(cache.stats) == {'stored': 1, 'not_modified': 1}
+
+
+def test_changed_resource_replaces_entry(tmp_path, server):
+    cache = ResponseCache(str(tmp_path))
+    session = session_for(cache)
+    session.get(URL)
+    server.etag, server.body = '"v2"', b'{"posts": [3]}'
+    assert session.get(URL).json() == {'posts': [3]}
+    assert session.get(URL).json() == {'posts': [3]}
+    assert server.requests[2]['If-None-Match'] == '"v2"'
+
+
+def test_accept_and_authorization_are_part_of_the_key(tmp_path, server):
+    cache = ResponseCache(str(tmp_path))
+    session = session_for(cache)
+    session.get(URL, headers={'Authorization': 'bearer alice-token'})
+    session.get(URL, headers={'Authorization': 'bearer bob-token'})
+    session.get(URL, headers={'Authorization': 'bearer alice-token', 'Accept': 'application/vnd.raw'})
+    assert all('If-None-Match' not in headers for headers in server.requests)
+
+    session.get(URL, headers={'Authorization': 'bearer alice-token'})
+    assert server.requests[-1]['If-None-Match'] == '"v1"'
+    # Credentials are hashed, never written
+    for name in os.listdir(tmp_path):
+        with open(tmp_path / name) as f:
+            assert 'alice-token' not in f.read()
+
+
+def test_vary_headers_must_match(tmp_path, server):
+    server.vary = 'Accept-Language'
+    cache = ResponseCache(str(tmp_path))
+    session = session_for(cache)
+    session.get(URL, headers={'Accept-Language': 'en'})
+    session.get(URL, headers={'Accept-Language': 'de'})
+    assert 'If-None-Match' not in server.requests[1]
+    # The German response replaced the English one
+    session.get(URL, headers={'Accept-Language': 'de'})
+    assert server.requests[2]['If-None-Match'] == '"v1"'
+
+
+def test_vary_star_is_not_cached(tmp_path, server):
+    server.vary = '*'
+    cache = ResponseCache(str(tmp_path))
+    session = session_for(cache)
+    session.get(URL)
+    session.get(URL)
+    assert 'If-None-Match' not in server.requests[1]
+    assert cache.stats['uncached'] == 2
+
+
+def test_expired_entries_are_not_revalidated(tmp_path, server):
+    cache = ResponseCache(str(tmp_path), max_age_seconds=3600)
+    session = session_for(cache)
+    session.get(URL)
+    old = time.time() - 7200
+    for name in os.listdir(tmp_path):
+        os.utime(tmp_path / name, (old, old))
+    session.get(URL)
+    assert 'If-None-Match' not in server.requests[1]
+
+
+def test_revalidation_restarts_age(tmp_path, server):
+    cache = ResponseCache(str(tmp_path), max_age_seconds=3600)
+    session = session_for(cache)
+    session.get(URL)
+    old = time.time() - 3000
+    for name in os.listdir(tmp_path):
+        os.utime(tmp_path / name, (old, old))
+    session.get(URL)
+    assert all(time.time() - os.path.getmtime(tmp_path / name) < 60 for name in os.listdir(tmp_path))
+
+
+def test_prune_keeps_newest_entries(tmp_path, server):
+    cache = ResponseCache(str(tmp_path), max_entries=3, max_age_seconds=3600)
+    session = session_for(cache)
+    now = time.time()
+    for i in range(5):
+        session.get(f'{URL}?page={i}')
+    # Give page i an mtime i minutes ago, so page 0 is the newest
+    headers = requests.utils.default_headers()
+    for i in range(5):
+        path = cache._path(f'{URL}?page={i}', headers)
+        os.utime(path, (now - 60 * i, now - 60 * i))
+    assert cache.prune() == 2
+    assert [cache.get(f'{URL}?page={i}', headers) is not None for i in range(5)] == [True, True, True, False, False]
+    assert cache.stats['pruned'] == 2
+
+
+def test_304_without_entry_passes_through(tmp_path, server):
+    cache = ResponseCache(str(tmp_path))
+    session = session_for(cache)
+    response = session.get(URL, headers={'If-None-Match': '"v1"'})
+    assert response.status_code == 304
+    assert cache.stats['uncached'] == 1
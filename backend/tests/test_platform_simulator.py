@@ -0,0 +1,96 @@
+import random
+
+import pytest
+import requests
+from fastapi.testclient import TestClient
+
+from ingestion.platform_simulator import SimulatorConfig, create_app, sample_latency
+
+
+def client_for(**config):
+    config = dict({'initial_items': 55, 'items_per_minute': 0.0}, **config)
+    return TestClient(create_app(SimulatorConfig(**config)))
+
+
+def stats(client):
+    return client.get('/_sim/stats').json()
+
+
+def test_github_issues_follow_link_header():
+    client = client_for()
+    url = '/api/v3/repos/acme/site/issues?per_page=20'
+    numbers, pages = [], 0
+    while url:
+        response = client.get(url)
+        assert response.status_code == 200
+        numbers += [issue['number'] for issue in response.json()]
+        links = requests.utils.parse_header_links(response.headers.get('Link', ''))
+        rels = {link['rel']: link['url'] for link in links if link}
+        if 'next' in rels:
+            assert 'page=3' in rels['last']
+        url = rels.get('next')
+        pages += 1
+    assert pages == 3
+    assert numbers == list(range(55, 0, -1))
+
+
+def test_reddit_after_cursor_walks_the_feed():
+    client = client_for()
+    names, after = [], None
+    while True:
+        params = {'limit': 25} if after is None else {'limit': 25, 'after': after}
+        listing = client.get('/r/news/new', params=params).json()['data']
+        names += [child['data']['name'] for child in listing['children']]
+        after = listing['after']
+        if after is None:
+            break
+    assert len(names) == len(set(names)) == 55
+
+
+def test_telegram_offset_id_pages():
+    client = client_for()
+    ids, offset = [], 0
+    while offset is not None:
+        body = client.get('/telegram/chan/messages', params={'limit': 20, 'offset_id': offset}).json()
+        ids += [message['id'] for message in body['messages']]
+        offset = body['next_offset_id']
+    assert ids == list(range(55, 0, -1))
+
+
+def test_rate_limit_answers_429_with_retry_after():
+    client = client_for(rate_limit_requests=2, rate_limit_window=60)
+    remaining = [client.get('/api/v3/repos/acme/site').headers['X-RateLimit-Remaining'] for _ in range(2)]
+    assert remaining == ['1', '0']
+    response = client.get('/api/v3/repos/acme/site')
+    assert response.status_code == 429
+    assert 1 <= int(response.headers['Retry-After']) <= 60
+    # Windows are per platform
+    assert client.get('/r/news/new').status_code == 200
+    assert stats(client)['github']['rate_limited'] == 1
+
+
+def test_not_modified_github_requests_are_not_charged():
+    client = client_for(rate_limit_requests=5, rate_limit_window=60)
+    first = client.get('/api/v3/repos/acme/site')
+    second = client.get('/api/v3/repos/acme/site', headers={'If-None-Match': first.headers['ETag']})
+    assert second.status_code == 304
+    assert second.headers['X-RateLimit-Remaining'] == first.headers['X-RateLimit-Remaining']
+
+
+def test_error_injection():
+    client = client_for(error_rate=1.0)
+    statuses = {client.get('/r/news/new').status_code for _ in range(20)}
+    assert statuses <= {500, 502, 503} and len(statuses) > 1
+    assert stats(client)['reddit'] == {'requests': 20, 'errors': 20}
+
+    client.put('/_sim/config', json={'initial_items': 55, 'items_per_minute': 0.0, 'error_rate': 0.0})
+    assert client.get('/r/news/new').status_code == 200
+
+
+def test_latency_specs():
+    rng = random.Random(1)
+    assert sample_latency('fixed:250', rng) == 0.25
+    assert 0.01 <= sample_latency('uniform:10:20', rng) <= 0.02
+    assert sample_latency('normal:-50:1', rng) == 0.0
+    with pytest.raises(ValueError):
+        sample_latency('pareto:1', rng)
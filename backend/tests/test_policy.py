@@ -0,0 +1,117 @@
+import random
+from datetime import datetime
+
+import duckdb
+import pytest
+
+from ai.policy import CATEGORIES, PROBABILITY_COLUMNS, ScoringPolicy
+from ingestion.ingestion import DataIngestion
+from ingestion.models import CanonicalItem
+
+
+def cases():
+    """Probability vectors and flags, including ones that land exactly on the severity cuts."""
+    rng = random.Random(7)
+    vectors = []
+    for cut in (0.9, 0.7, 0.4):
+        vectors.append(({'threat': cut, 'safe': round(1 - cut, 10)}, False, False, 0.0))
+        vectors.append(({'harassment': cut - 0.3, 'safe': 1.3 - cut}, True, True, 0.0))
+    for _ in range(300):
+        weights = [rng.random() for _ in CATEGORIES]
+        total = sum(weights)
+        probabilities = {c: w / total for c, w in zip(CATEGORIES, weights)}
+        vectors.append((probabilities, rng.random() < 0.3, rng.random() < 0.3, rng.choice([0.0, rng.random() * 3])))
+    return vectors
+
+
+@pytest.fixture
+def ingestion(tmp_path):
+    return DataIngestion(db_path=str(tmp_path / 'posts.db'))
+
+
+def store_scored(ingestion, policy):
+    items = [CanonicalItem(id=f'p{i}', platform='twitter', platform_id=str(i), text='x',
+                           created_at=datetime(2024, 1, 1)) for i in range(len(cases()))]
+    ingestion.store_items(items)
+    scores = []
+    for item, (probabilities, vip_hit, threat_hit, author_risk) in zip(items, cases()):
+        threat_score, _, severity, action = policy.evaluate(probabilities, vip_hit, threat_hit, author_risk)
+        scores.append({
+            'id': item.id, 'threat_score': threat_score, 'category': 'threat', 'severity': severity,
+            'recommended_action': action, 'vip_keyword_hit': vip_hit, 'threat_keyword_hit': threat_hit,
+            'author_risk': author_risk, 'class_probabilities': probabilities,
+        })
+    ingestion.update_post_scores(scores)
+    return {s['id']: (s['threat_score'], s['severity'], s['recommended_action']) for s in scores}
+
+
+def stored_scores(ingestion):
+    conn = duckdb.connect(ingestion.db_path)
+    try:
+        rows = conn.execute("SELECT id, threat_score, severity, recommended_action FROM posts").fetchall()
+    finally:
+        conn.close()
+    return {post_id: (score, severity, action) for post_id, score, severity, action in rows}
+
+
+def test_evaluate_at_cut_points():
+    policy = ScoringPolicy(author_risk_weight=0.5, threat_threshold=0.7)
+    assert policy.evaluate({'threat': 0.7, 'safe': 0.3}, False, False)[2] == 'high'
+    assert policy.evaluate({'threat': 0.4}, False, False)[2] == 'medium'
+    assert policy.evaluate({'threat': 0.65}, True, True)[:3] == (0.95, 0.95, 'critical')
+    assert policy.evaluate({'threat': 0.65}, True, True, author_risk=5.0)[0] == 1.0
+
+
+def test_reapplying_policy_reproduces_python_scores(ingestion):
+    policy = ScoringPolicy(author_risk_weight=0.5, threat_threshold=0.7)
+    expected = store_scored(ingestion, policy)
+    assert stored_scores(ingestion) == expected
+
+    ingestion.apply_scoring_policy(policy)
+    assert stored_scores(ingestion) == expected
+
+
+def test_sql_matches_python_for_other_policies(ingestion):
+    store_scored(ingestion, ScoringPolicy(author_risk_weight=0.5))
+    policy = ScoringPolicy(version=2, class_weights={'threat': 0.9, 'doxxing': 1.1, 'spam': 0.1},
+                           keyword_boost=0.15, author_risk_weight=1.3,
+                           critical_threshold=0.8, high_threshold=0.55, medium_threshold=0.3)
+    ingestion.apply_scoring_policy(policy)
+    expected = {}
+    for i, (probabilities, vip_hit, threat_hit, author_risk) in enumerate(cases()):
+        threat_score, _, severity, action = policy.evaluate(probabilities, vip_hit, threat_hit, author_risk)
+        expected[f'p{i}'] = (threat_score, severity, action)
+    assert stored_scores(ingestion) == expected
+
+
+def test_policy_skips_unscored_and_shed_posts(ingestion):
+    ingestion.store_items([CanonicalItem(id=post_id, platform='twitter', platform_id=post_id, text='x',
+                                         created_at=datetime(2024, 1, 1)) for post_id in ('a', 'b', 'c')])
+    conn = duckdb.connect(ingestion.db_path)
+    conn.execute("UPDATE posts SET p_threat = 1.0, threat_score = 0.0")
+    conn.execute("UPDATE posts SET threat_category = 'shed' WHERE id = 'b'")
+    conn.execute("UPDATE posts SET threat_category = 'threat' WHERE id = 'c'")
+    conn.close()
+    assert ingestion.apply_scoring_policy(ScoringPolicy(version=1)) == 1
+    assert {k: v[0] for k, v in stored_scores(ingestion).items()} == {'a': 0.0, 'b': 0.0, 'c': 1.0}
+
+
+def test_float_columns_are_migrated_to_double(tmp_path):
+    path = str(tmp_path / 'posts.db')
+    DataIngestion(db_path=path)
+    conn = duckdb.connect(path)
+    for col in list(PROBABILITY_COLUMNS.values()) + ['author_risk']:
+        conn.execute(f"ALTER TABLE posts ALTER COLUMN {col} TYPE FLOAT")
+    conn.execute("INSERT INTO posts (id, threat_category, p_threat, author_risk) VALUES ('a', 'threat', 0.7, 0.3)")
+    assert conn.execute("SELECT p_threat FROM posts").fetchone()[0] != 0.7
+    conn.close()
+
+    DataIngestion(db_path=path)
+    conn = duckdb.connect(path)
+    try:
+        types = dict(conn.execute("SELECT column_name, data_type FROM information_schema.columns "
+                                  "WHERE table_name = 'posts'").fetchall())
+        assert types['p_threat'] == types['author_risk'] == 'DOUBLE'
+        assert conn.execute("SELECT p_threat, author_risk FROM posts").fetchone() == (0.7, 0.3)
+    finally:
+        conn.close()
@@ -0,0 +1,82 @@
+import gzip
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+from ingestion import replay
+from ingestion.ingestion import DataIngestion
+from ingestion.replay import PayloadRecorder, ReplaySource
+
+T0 = datetime(2024, 1, 1, 12)
+
+
+def tweet(i):
+    return {'id': i, 'content': f'post {i}', 'date': T0.isoformat(), 'url': f'https://x.test/{i}',
+            'author': 'alice', 'author_id': 'a1', 'likes': i, 'retweets': 0, 'replies': 0}
+
+
+def record(directory, captures, chunk_size=10000):
+    recorder = PayloadRecorder(str(directory), chunk_size=chunk_size)
+    for seconds, platform, payloads in captures:
+        recorder.record(platform, payloads, vip_target='VIP A', captured_at=T0 + timedelta(seconds=seconds))
+    recorder.close()
+    return recorder
+
+
+def test_round_trip_keeps_batches_in_capture_order(tmp_path):
+    record(tmp_path, [(0, 'twitter', [tweet(1), tweet(2)]), (5, 'twitter', [tweet(3)]), (5, 'reddit', [{'id': 'r1'}])],
+           chunk_size=2)
+    # Chunks rotate every two records; the batch spanning a rotation comes back whole
+    assert len(os.listdir(tmp_path)) == 2
+    batches = list(ReplaySource(str(tmp_path)).batches())
+    assert [(b[0], b[2], [p['id'] for p in b[3]]) for b in batches] == [
+        ('twitter', T0.isoformat(), [1, 2]),
+        ('twitter', (T0 + timedelta(seconds=5)).isoformat(), [3]),
+        ('reddit', (T0 + timedelta(seconds=5)).isoformat(), ['r1']),
+    ]
+    assert all(b[1] == 'VIP A' for b in batches)
+
+
+def test_concurrent_sessions_write_separate_files(tmp_path):
+    first = PayloadRecorder(str(tmp_path))
+    second = PayloadRecorder(str(tmp_path))
+    first.record('twitter', [tweet(1)], captured_at=T0)
+    second.record('twitter', [tweet(2)], captured_at=T0 + timedelta(seconds=1))
+    first.record('twitter', [tweet(3)], captured_at=T0 + timedelta(seconds=2))
+    first.close()
+    second.close()
+
+    assert first.session != second.session
+    for name in os.listdir(tmp_path):
+        with gzip.open(tmp_path / name, 'rt') as f:
+            f.read()
+    # Sessions recorded side by side are interleaved by capture time on replay
+    assert [b[3][0]['id'] for b in ReplaySource(str(tmp_path)).batches()] == [1, 2, 3]
+
+
+def test_pacing_follows_capture_times(tmp_path, monkeypatch):
+    record(tmp_path, [(0, 'twitter', [tweet(1)]), (10, 'twitter', [tweet(2)]), (30, 'twitter', [tweet(3)])])
+    clock = [0.0]
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        clock[0] += seconds
+
+    monkeypatch.setattr(replay.time, 'monotonic', lambda: clock[0])
+    monkeypatch.setattr(replay.time, 'sleep', sleep)
+    assert len(list(ReplaySource(str(tmp_path), speed=10).paced_batches())) == 3
+    assert sleeps == pytest.approx([1.0, 2.0])
+
+    sleeps.clear()
+    list(ReplaySource(str(tmp_path), speed=None).paced_batches())
+    assert sleeps == []
+
+
+def test_replay_stores_recorded_posts(tmp_path):
+    record(tmp_path / 'rec', [(0, 'twitter', [tweet(1), tweet(2)]), (1, 'twitter', [tweet(2), tweet(3)])])
+    ingestion = DataIngestion(db_path=str(tmp_path / 'posts.db'))
+    stats = ReplaySource(str(tmp_path / 'rec'), speed=None).run(ingestion)
+    assert (stats['batches'], stats['payloads'], stats['posts_added']) == (2, 4, 3)
+    assert sorted(ingestion.get_posts_for_analysis()['id']) == ['twitter_1', 'twitter_2', 'twitter_3']
@@ -0,0 +1,212 @@
+import time
+import random
+from datetime import datetime, timedelta
+
+import duckdb
+import pandas as pd
+import pytest
+
+from ai.ai_scoring import VIPThreatScorer
+from ai.scoring_queue import ScoringQueue, vip_priorities
+from ingestion.ingestion import DataIngestion
+from ingestion.models import CanonicalItem
+from ingestion.state import MonitoringState
+from ingestion.worker import MonitoringWorker
+
+NOW = datetime(2024, 6, 1, 12)
+
+
+def post(post_id, vip='Minor VIP', likes=0, shares=0, comments=0, age_hours=1.0):
+    return {'id': post_id, 'platform': 'twitter', 'vip_target': vip, 'author_id': None, 'author_username': None,
+            'likes': likes, 'shares': shares, 'comments': comments, 'content': 'x',
+            'timestamp': pd.Timestamp(NOW - timedelta(hours=age_hours))}
+
+
+@pytest.fixture
+def queue():
+    priorities = vip_priorities([{'name': 'Head of State', 'priority': 5}, {'name': 'Minor VIP'}])
+    return ScoringQueue(priorities, capacity=3, batch_size=2)
+
+
+def test_priority_components(queue):
+    now = NOW.timestamp()
+    base = queue.priority(post('a'), now=now)
+    assert queue.priority(post('a', vip='Head of State'), now=now) > base
+    assert queue.priority(post('a', likes=500, shares=100), now=now) > base
+    assert queue.priority(post('a'), author_risk=2.0, now=now) > base
+    assert queue.priority(post('a', age_hours=48), now=now) < base
+    assert 0.0 <= queue.priority(post('a', vip='Head of State', likes=10 ** 9), author_risk=50, now=now) <= 1.0
+
+
+def test_pop_batch_returns_best_first(queue):
+    now = NOW.timestamp()
+    queue.push(post('old', age_hours=72), now=now)
+    queue.push(post('vip', vip='Head of State'), now=now)
+    queue.push(post('viral', likes=5000, shares=2000), now=now)
+    assert queue.pop_batch()['id'].tolist() == ['vip', 'viral']
+    assert queue.pop_batch()['id'].tolist() == ['old']
+    assert len(queue) == 0
+    assert queue.pop_batch().empty
+
+
+def test_full_queue_defers_lowest_priority(queue):
+    now = NOW.timestamp()
+    for post_id, age in (('a', 1), ('b', 24), ('c', 48)):
+        assert queue.push(post(post_id, age_hours=age), now=now)
+    assert queue.saturated
+
+    # Better than the worst queued post: the worst ('c') is evicted
+    assert queue.push(post('vip', vip='Head of State'), now=now)
+    # Worse than everything queued: turned away
+    assert not queue.push(post('stale', age_hours=500), now=now)
+    assert queue.stats['deferred'] == 2
+    assert len(queue) == 3
+    assert queue.pop_batch(10)['id'].tolist() == ['vip', 'a', 'b']
+
+
+def test_duplicate_push_is_ignored(queue):
+    now = NOW.timestamp()
+    assert queue.push(post('a'), now=now)
+    assert queue.push(post('a'), now=now)
+    assert len(queue) == 1
+    assert queue.stats['queued'] == 1
+
+
+def test_snapshot_tracks_depth_and_counts(queue):
+    now = NOW.timestamp()
+    for i in range(5):
+        queue.push(post(f'p{i}', age_hours=i), now=now)
+    queue.record_scored(len(queue.pop_batch()))
+    queue.record_shed(4)
+    snapshot = queue.snapshot()
+    assert (snapshot['depth'], snapshot['capacity'], snapshot['max_depth']) == (1, 3, 3)
+    # p3 and p4 arrive older than everything queued and are turned away
+    assert (snapshot['queued'], snapshot['deferred'], snapshot['scored'], snapshot['shed']) == (3, 2, 2, 4)
+    assert snapshot['last_batch_wait_seconds'] is not None
+
+
+def test_push_posts_uses_author_risk(queue):
+    class Authors:
+        def load(self, keys):
+            self.loaded = keys
+
+        def get(self, platform, author_id, now=None):
+            return {'risk_score': 3.0} if author_id == 'troll' else None
+
+    rows = [dict(post('calm'), author_id='calm'), dict(post('troll'), author_id='troll')]
+    authors = Authors()
+    assert queue.push_posts(pd.DataFrame(rows), author_store=authors) == 2
+    assert authors.loaded == {('twitter', 'calm'), ('twitter', 'troll')}
+    assert queue.pop_batch(1)['id'].tolist() == ['troll']
+
+
+def test_shed_marks_only_old_unscored_posts(tmp_path):
+    store = DataIngestion(db_path=str(tmp_path / 'posts.db'))
+    store.store_items([
+        CanonicalItem(id=post_id, platform='twitter', platform_id=post_id, text='x',
+                      created_at=NOW - timedelta(hours=age))
+        for post_id, age in (('fresh', 1), ('stale', 48), ('stale-scored', 48))
+    ])
+    conn = duckdb.connect(store.db_path)
+    conn.execute("UPDATE posts SET threat_category = 'threat' WHERE id = 'stale-scored'")
+    conn.close()
+
+    assert store.shed_unscored_posts(NOW - timedelta(hours=24)) == 1
+    assert store.get_posts_for_analysis()['id'].tolist() == ['fresh']
+    conn = duckdb.connect(store.db_path)
+    try:
+        categories = dict(conn.execute("SELECT id, threat_category FROM posts").fetchall())
+    finally:
+        conn.close()
+    assert categories == {'fresh': 'unscored', 'stale': 'shed', 'stale-scored': 'threat'}
+
+
+def test_pop_order_matches_sorting_under_churn():
+    rng = random.Random(3)
+    queue = ScoringQueue(capacity=50, batch_size=7)
+    now = NOW.timestamp()
+    expected = {}
+    for round_ in range(40):
+        for i in range(20):
+            post_id = f'r{round_}-{i}'
+            if queue.push(post(post_id, likes=rng.randint(0, 10000), age_hours=rng.random() * 48), now=now):
+                expected[post_id] = queue._rows[post_id][3]
+        expected = {k: v for k, v in expected.items() if k in queue._rows}
+        batch = queue.pop_batch()['id'].tolist()
+        assert batch == sorted(expected, key=expected.get, reverse=True)[:7]
+        for post_id in batch:
+            del expected[post_id]
+    # Entries left behind by evictions and pops do not pile up
+    assert len(queue._lowest) + len(queue._highest) <= 4 * len(queue) + 64 + 2
+
+
+@pytest.fixture
+def ranked_store(tmp_path, queue):
+    store = DataIngestion(db_path=str(tmp_path / 'posts.db'))
+    posts = [
+        ('fresh-1', 'Minor VIP', 0, 1), ('fresh-2', 'Minor VIP', 0, 2), ('fresh-3', 'Minor VIP', 0, 3),
+        ('old-viral', 'Head of State', 5000, 30), ('stale-viral', 'Head of State', 5000, 48),
+        ('stale-minor', 'Minor VIP', 0, 48),
+    ]
+    store.store_items([
+        CanonicalItem(id=post_id, platform='twitter', platform_id=post_id, vip_target=vip, text='x',
+                      author_id='troll' if post_id == 'fresh-3' else None,
+                      created_at=datetime.utcnow() - timedelta(hours=age), metadata={'likes': likes, 'shares': likes})
+        for post_id, vip, likes, age in posts
+    ])
+    store.author_profiles.record('twitter', 'troll', 'troll', 'threat', 2.0, now=datetime.utcnow() - timedelta(hours=5))
+    store.author_profiles.flush()
+    return store
+
+
+def test_sql_priority_matches_python(ranked_store, queue):
+    now = time.time()
+    expression = queue.priority_sql(now, author_risk=ranked_store.author_profiles.risk_sql(now))
+    conn = duckdb.connect(ranked_store.db_path)
+    try:
+        in_sql = dict(conn.execute(f"SELECT p.id, {expression} FROM {ranked_store._ranked_posts(queue)}").fetchall())
+    finally:
+        conn.close()
+    posts_df = ranked_store.get_posts_for_analysis()
+    ranked_store.author_profiles.load({('twitter', 'troll')})
+    for row in posts_df.to_dict('records'):
+        profile = ranked_store.author_profiles.get('twitter', row['author_id'], now=datetime.utcfromtimestamp(now))
+        risk = profile['risk_score'] if profile else 0.0
+        assert in_sql[row['id']] == pytest.approx(queue.priority(row, risk, now=now), abs=1e-9), row['id']
+
+
+def test_candidates_are_ranked_by_priority(ranked_store, queue):
+    assert ranked_store.get_posts_for_analysis(limit=2)['id'].tolist() == ['fresh-1', 'fresh-2']
+    # The 30-hour-old viral post outranks newer posts nobody engaged with
+    assert ranked_store.get_posts_for_analysis(limit=2, ranked_by=queue)['id'].tolist()[0] == 'old-viral'
+
+
+def test_saturated_worker_sheds_only_posts_below_the_queue(ranked_store, queue, tmp_path, monkeypatch):
+    monkeypatch.setenv('MODEL_PATH', str(tmp_path / 'model.pkl'))
+    worker = MonitoringWorker(data_ingestion=ranked_store, threat_scorer=VIPThreatScorer(),
+                              state=MonitoringState(str(tmp_path / 'state')), interval=0)
+    worker.scoring_queue = queue
+    worker.refill_queue()
+    assert queue.saturated and queue.stats['shed'] == 1
+    conn = duckdb.connect(ranked_store.db_path)
+    try:
+        shed = [row[0] for row in conn.execute("SELECT id FROM posts WHERE threat_category = 'shed'").fetchall()]
+    finally:
+        conn.close()
+    # Both stale posts are past the cutoff; the important one is kept for later
+    assert shed == ['stale-minor']
+
+
+def test_push_posts_skips_authorless_posts(queue):
+    class Authors:
+        def load(self, keys):
+            self.loaded = keys
+
+        def get(self, platform, author_id, now=None):
+            assert author_id == 'a1'
+            return None
+
+    rows = [dict(post('p1'), author_id='a1'), dict(post('p2'), author_id=float('nan'))]
+    authors = Authors()
+    assert queue.push_posts(pd.DataFrame(rows), author_store=authors) == 2
+    assert ('twitter', 'a1') in authors.loaded
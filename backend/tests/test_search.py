@@ -0,0 +1,135 @@
+from datetime import datetime, timedelta
+
+import duckdb
+import pytest
+
+from ingestion import search
+from ingestion.ingestion import DataIngestion
+from ingestion.models import CanonicalItem
+from ingestion.search import PostSearchIndex, parse_query
+
+T0 = datetime(2024, 1, 1)
+
+POSTS = [
+    ('p1', 'VIP A', 'twitter', 'we know the home address of the senator'),
+    ('p2', 'VIP A', 'reddit', 'address at home is public, the home is big'),
+    ('p3', 'VIP B', 'twitter', 'attack the senator tonight'),
+    ('p4', 'VIP B', 'github', 'spam spam spam buy now'),
+    ('p5', 'VIP A', 'twitter', 'home sweet home'),
+]
+
+
+def make_items(posts, start=T0):
+    return [
+        CanonicalItem(id=post_id, platform=platform, platform_id=post_id, vip_target=vip, text=text,
+                      created_at=start + timedelta(minutes=i))
+        for i, (post_id, vip, platform, text) in enumerate(posts)
+    ]
+
+
+@pytest.fixture
+def ingestion(tmp_path):
+    store = DataIngestion(db_path=str(tmp_path / 'posts.db'))
+    store.store_items(make_items(POSTS))
+    return store
+
+
+def ids(store, query, **filters):
+    _, rows = store.search_posts(query, **filters)
+    return [row['id'] for row in rows]
+
+
+def test_parse_query_operators():
+    assert parse_query('home address') == [[(False, ['home'], False), (False, ['address'], False)]]
+    assert parse_query('home OR attack') == [[(False, ['home'], False)], [(False, ['attack'], False)]]
+    assert parse_query('home -spam NOT sweet') == [[(False, ['home'], False), (True, ['spam'], False),
+                                                    (True, ['sweet'], False)]]
+    assert parse_query('"Home Address" AND senator') == [[(False, ['home', 'address'], True),
+                                                          (False, ['senator'], False)]]
+    # A one-word phrase is a plain term
+    assert parse_query('"home"') == [[(False, ['home'], False)]]
+
+
+def test_parse_query_rejects_negation_only_branch():
+    with pytest.raises(ValueError):
+        parse_query('home OR -spam')
+    assert parse_query('  ') == []
+
+
+def test_boolean_queries(ingestion):
+    assert set(ids(ingestion, 'home address')) == {'p1', 'p2'}
+    assert set(ids(ingestion, 'home OR attack')) == {'p1', 'p2', 'p3', 'p5'}
+    assert set(ids(ingestion, 'home -sweet')) == {'p1', 'p2'}
+    assert set(ids(ingestion, 'senator NOT attack')) == {'p1'}
+    assert ids(ingestion, 'nothingmatches') == []
+
+
+def test_phrase_requires_adjacent_terms(ingestion):
+    # p2 has both words but not as "home address"
+    assert ids(ingestion, '"home address"') == ['p1']
+
+
+def test_ranking_and_filters(ingestion):
+    # p5 mentions home twice in a short post
+    assert ids(ingestion, 'home')[0] == 'p5'
+    assert set(ids(ingestion, 'home', vip='VIP A', platform='twitter')) == {'p1', 'p5'}
+    assert ids(ingestion, 'senator', since=T0 + timedelta(minutes=1)) == ['p3']
+    assert ids(ingestion, 'senator', until=T0 + timedelta(minutes=1)) == ['p1']
+
+
+def test_score_filter_reads_current_scores(ingestion):
+    conn = duckdb.connect(ingestion.db_path)
+    conn.execute("UPDATE posts SET threat_score = 0.9 WHERE id = 'p3'")
+    conn.close()
+    assert ids(ingestion, 'senator', min_score=0.5) == ['p3']
+    assert ids(ingestion, 'senator', max_score=0.5) == ['p1']
+
+
+def test_pagination_reports_total(ingestion):
+    total, rows = ingestion.search_posts('home', limit=1, offset=1)
+    assert total == 3
+    assert len(rows) == 1
+    assert ingestion.search_posts('home', limit=1, offset=10) == (3, [])
+
+
+def test_stats_and_tail_merge(tmp_path, monkeypatch):
+    monkeypatch.setattr(search, 'SEARCH_TAIL_ROWS', 10)
+    store = DataIngestion(db_path=str(tmp_path / 'posts.db'))
+    store.store_items(make_items(POSTS[:2]))
+    store.store_items(make_items(POSTS[2:], start=T0 + timedelta(hours=1)))
+    # Re-storing a post neither duplicates postings nor changes the stats
+    store.store_items(make_items(POSTS[:1]))
+
+    conn = duckdb.connect(store.db_path)
+    try:
+        n, total_len = conn.execute("SELECT n, total_len FROM search_stats").fetchone()
+        assert n == len(POSTS)
+        assert total_len == sum(len(search.tokenize(text)) for _, _, _, text in POSTS)
+        assert conn.execute("SELECT COUNT(*) FROM search_postings").fetchone()[0] > 0
+        assert conn.execute("SELECT COUNT(*) FROM search_postings_tail").fetchone()[0] < 10
+        assert conn.execute("SELECT df FROM search_terms WHERE term = 'home'").fetchone()[0] == 3
+    finally:
+        conn.close()
+    assert set(ids(store, 'home')) == {'p1', 'p2', 'p5'}
+
+
+def test_migrates_unclustered_postings(tmp_path):
+    path = str(tmp_path / 'posts.db')
+    store = DataIngestion(db_path=path)
+    store.store_items(make_items(POSTS))
+
+    # Rebuild the older layout: (term, post_id, tf) postings, no stats row
+    conn = duckdb.connect(path)
+    conn.execute("CREATE TABLE old_postings AS SELECT term, post_id, tf FROM search_postings "
+                 "UNION ALL SELECT term, post_id, tf FROM search_postings_tail")
+    conn.execute("DROP TABLE search_postings")
+    conn.execute("DROP TABLE search_postings_tail")
+    conn.execute("DROP TABLE search_stats")
+    conn.execute("ALTER TABLE old_postings RENAME TO search_postings")
+    PostSearchIndex(conn).create_tables()
+    columns = [row[0] for row in conn.execute("DESCRIBE search_postings").fetchall()]
+    assert conn.execute("SELECT n FROM search_stats").fetchone()[0] == len(POSTS)
+    conn.close()
+
+    assert 'doc_len' in columns and 'timestamp' in columns
+    assert set(ids(store, 'home', vip='VIP A')) == {'p1', 'p2', 'p5'}
@@ -0,0 +1,113 @@
+import math
+from datetime import datetime, timezone
+
+import duckdb
+import pytest
+
+from ingestion.ingestion import DataIngestion
+from ingestion.models import CanonicalItem
+from ingestion.sharding import (HashRing, PartitionLayout, PartitionLeases, connect_partitions, partition_for,
+                                stable_hash)
+
+PARTITIONS = 64
+
+
+def owners(assignments):
+    return {partition: member for member, partitions in assignments.items() for partition in partitions}
+
+
+def test_stable_hash_and_partition_for_are_deterministic():
+    assert stable_hash('VIP A') == stable_hash('VIP A') != stable_hash('VIP B')
+    assert 0 <= stable_hash('VIP A') < 2 ** 64
+    assert all(0 <= partition_for(f'VIP {i}', 16) < 16 for i in range(100))
+    assert partition_for('VIP A', 16) == stable_hash('VIP A') % 16
+
+
+@pytest.mark.parametrize('workers', [1, 2, 3, 5, 7, 16])
+def test_every_partition_has_one_owner_within_the_load_bound(workers):
+    members = [f'worker-{i}' for i in range(workers)]
+    assignments = HashRing(members).assignments(PARTITIONS)
+    assert sorted(p for partitions in assignments.values() for p in partitions) == list(range(PARTITIONS))
+    cap = math.ceil(PARTITIONS / workers)
+    assert all(len(partitions) <= cap for partitions in assignments.values())
+    assert all(partitions == sorted(partitions) for partitions in assignments.values())
+
+
+def test_assignments_do_not_depend_on_member_order():
+    members = [f'worker-{i}' for i in range(5)]
+    assert HashRing(members).assignments(PARTITIONS) == HashRing(members[::-1]).assignments(PARTITIONS)
+    assert HashRing(members + members[:2]).assignments(PARTITIONS) == HashRing(members).assignments(PARTITIONS)
+
+
+def test_more_partitions_than_workers_still_split_evenly():
+    assignments = HashRing(['a', 'b', 'c', 'd']).assignments(4)
+    assert sorted(len(p) for p in assignments.values()) == [1, 1, 1, 1]
+    assert HashRing([]).assignments(4) == {}
+
+
+@pytest.mark.parametrize('workers', [3, 4, 8])
+def test_joining_worker_moves_a_bounded_share(workers):
+    members = [f'worker-{i}' for i in range(workers)]
+    before = owners(HashRing(members).assignments(PARTITIONS))
+    after = owners(HashRing(members + ['new']).assignments(PARTITIONS))
+    moved = [p for p in range(PARTITIONS) if before[p] != after[p]]
+    gained = [p for p in moved if after[p] == 'new']
+    # The newcomer takes about its fair share; bounded loads add a little more churn
+    assert len(gained) <= math.ceil(PARTITIONS / (workers + 1))
+    assert len(moved) <= 2 * math.ceil(PARTITIONS / (workers + 1))
+
+
+@pytest.mark.parametrize('workers', [3, 4, 8])
+def test_leaving_worker_moves_a_bounded_share(workers):
+    members = [f'worker-{i}' for i in range(workers)]
+    before = owners(HashRing(members).assignments(PARTITIONS))
+    after = owners(HashRing(members[1:]).assignments(PARTITIONS))
+    orphaned = [p for p in range(PARTITIONS) if before[p] == members[0]]
+    moved = [p for p in range(PARTITIONS) if before[p] != after[p]]
+    assert set(orphaned) <= set(moved)
+    assert len(moved) <= 2 * math.ceil(PARTITIONS / workers)
+
+
+def test_leases_are_exclusive_until_released(tmp_path):
+    layout = PartitionLayout(str(tmp_path), partitions=4)
+    first, second = PartitionLeases(layout), PartitionLeases(layout)
+    assert first.acquire(2) and first.acquire(2)
+    assert not second.acquire(2)
+    assert second.acquire(3)
+    first.release(2)
+    assert second.acquire(2)
+    assert second.held == {2, 3}
+    second.release_all()
+    assert second.held == set()
+    assert layout.owned_by('a', ['a']) == [0, 1, 2, 3]
+
+
+def test_partitions_read_as_one_database(tmp_path, monkeypatch):
+    layout = PartitionLayout(str(tmp_path), partitions=4)
+    created = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    for partition, vip in ((0, 'VIP A'), (3, 'VIP B')):
+        writer = DataIngestion(db_path=layout.path(partition))
+        assert writer.store_items([CanonicalItem(id=f'{vip}-{i}', platform='reddit', platform_id=str(i),
+                                                 text=f'threat report {i}', vip_target=vip, created_at=created)
+                                   for i in range(partition + 1)]) == partition + 1
+
+    conn = connect_partitions(layout, retries=1)
+    try:
+        assert conn.execute("SELECT vip_target, COUNT(*) FROM posts GROUP BY 1 ORDER BY 1").fetchall() == \
+               [('VIP A', 1), ('VIP B', 4)]
+        # Document frequencies are summed over the partitions
+        assert conn.execute("SELECT df FROM search_terms WHERE term = 'threat'").fetchone() == (5,)
+    finally:
+        conn.close()
+
+    # The API's read-only DataIngestion goes through the same views
+    monkeypatch.setenv('SHARD_DIR', str(tmp_path))
+    reader = DataIngestion(read_only=True)
+    assert reader.partition_layout is not None
+    assert reader.search_posts('threat')[0] == 5
+    assert len(reader.get_posts_for_analysis()) == 5
+
+
+def test_connect_partitions_needs_a_partition(tmp_path):
+    with pytest.raises(duckdb.IOException):
+        connect_partitions(PartitionLayout(str(tmp_path), partitions=4), retries=1)
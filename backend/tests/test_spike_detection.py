@@ -0,0 +1,121 @@
+import copy
+
+import pandas as pd
+import pytest
+
+from ai.spike_detection import CampaignSpikeDetector
+
+T0 = 1_700_000_000 // 60 * 60  # bucket-aligned
+
+
+@pytest.fixture
+def detector(monkeypatch):
+    monkeypatch.setenv('CAMPAIGN_BUCKET_SECONDS', '60')
+    monkeypatch.setenv('CAMPAIGN_WINDOW_MINUTES', '5')
+    monkeypatch.setenv('CAMPAIGN_EWMA_ALPHA', '0.1')
+    monkeypatch.setenv('CAMPAIGN_Z_THRESHOLD', '4')
+    monkeypatch.setenv('CAMPAIGN_MIN_VOLUME', '20')
+    monkeypatch.setenv('CAMPAIGN_SCORE_JUMP', '0.25')
+    return CampaignSpikeDetector()
+
+
+def steady(detector, minutes, per_minute=4, score=0.1, vip='VIP A', platform='twitter', start=T0):
+    alerts = []
+    for minute in range(minutes):
+        for i in range(per_minute):
+            alert = detector.observe(vip, platform, start + minute * 60 + i, score)
+            if alert:
+                alerts.append(alert)
+    return alerts
+
+
+def burst(detector, minute, posts, score=0.1, vip='VIP A', platform='twitter'):
+    alerts = []
+    for i in range(posts):
+        alert = detector.observe(vip, platform, T0 + minute * 60 + 30, score)
+        if alert:
+            alerts.append(alert)
+    return alerts
+
+
+def test_steady_traffic_never_alerts(detector):
+    assert steady(detector, 120) == []
+
+
+def test_volume_spike_alerts_once_per_window(detector):
+    steady(detector, 60)
+    alerts = burst(detector, 60, 200)
+    assert len(alerts) == 1
+    alert = alerts[0]
+    assert alert['reason'] == 'volume_spike'
+    assert (alert['vip_target'], alert['platform']) == ('VIP A', 'twitter')
+    assert alert['volume'] >= 20
+    assert alert['volume_z'] >= 4
+    assert (alert['window_end'] - alert['window_start']).total_seconds() == 5 * 60
+
+    # Still inside the same window: suppressed; a full window later it can fire again
+    assert burst(detector, 62, 200) == []
+    assert len(burst(detector, 66, 2000)) == 1
+
+
+def test_score_spike_without_volume_change(detector):
+    steady(detector, 60, per_minute=6, score=0.1)
+    alerts = steady(detector, 5, per_minute=6, score=0.9, start=T0 + 60 * 60)
+    assert [a['reason'] for a in alerts] == ['score_spike']
+    assert alerts[0]['mean_score'] > alerts[0]['baseline_score'] + 0.25
+
+
+def test_needs_a_full_baseline(detector):
+    # No closed window yet: even a large burst is not judged
+    assert burst(detector, 0, 500) == []
+
+
+def test_min_volume_floor(detector):
+    steady(detector, 60, per_minute=1)
+    # 11 extra posts more than triple the window's volume but stay under CAMPAIGN_MIN_VOLUME
+    assert burst(detector, 59, 11) == []
+    state = detector._keys[('VIP A', 'twitter')]
+    assert state.window_count < 20
+    assert burst(detector, 59, 10)[0]['reason'] == 'volume_spike'
+
+
+def test_keys_are_independent(detector):
+    steady(detector, 60, vip='VIP A')
+    steady(detector, 60, vip='VIP B')
+    alerts = burst(detector, 60, 200, vip='VIP B')
+    assert [a['vip_target'] for a in alerts] == ['VIP B']
+    assert burst(detector, 60, 5, vip='VIP A') == []
+
+
+def test_posts_older_than_window_are_ignored(detector):
+    steady(detector, 60)
+    state = detector._keys[('VIP A', 'twitter')]
+    before = state.window_count
+    assert detector.observe('VIP A', 'twitter', T0, 0.9) is None
+    assert state.window_count == before
+
+
+def test_idle_gap_decay_matches_bucket_by_bucket(detector):
+    steady(detector, 30)
+    stepped = copy.deepcopy(detector._keys[('VIP A', 'twitter')])
+    jumped = copy.deepcopy(stepped)
+    target = stepped.head + 500
+    while stepped.head < target:
+        detector._advance(stepped, stepped.head + 1)
+    detector._advance(jumped, target)
+    assert jumped.head == stepped.head
+    assert jumped.closed_buckets == stepped.closed_buckets
+    assert jumped.volume_mean == pytest.approx(stepped.volume_mean)
+    assert jumped.volume_var == pytest.approx(stepped.volume_var)
+
+
+def test_observe_scores_orders_batch_by_time(detector):
+    steady(detector, 60)
+    rows = [{'id': f'x{i}', 'vip_target': 'VIP A', 'platform': 'twitter',
+             'timestamp': pd.Timestamp(T0 + 60 * 60 + i % 50, unit='s')} for i in range(200)]
+    rows.append({'id': 'no-vip', 'vip_target': None, 'platform': 'twitter',
+                 'timestamp': pd.Timestamp(T0, unit='s')})
+    posts_df = pd.DataFrame(rows[::-1])
+    scores = [{'id': row['id'], 'threat_score': 0.1} for row in rows]
+    alerts = detector.observe_scores(posts_df, scores)
+    assert [a['reason'] for a in alerts] == ['volume_spike']
@@ -0,0 +1,151 @@
+import os
+import sys
+import fcntl
+import subprocess
+from datetime import datetime, timedelta
+
+import pytest
+
+from ai.ai_scoring import VIPThreatScorer
+from ingestion import sharding, state as state_module
+from ingestion.ingestion import DataIngestion
+from ingestion.state import MonitoringState
+from ingestion.worker import MonitoringWorker
+
+
+def ago(seconds):
+    return (datetime.now() - timedelta(seconds=seconds)).isoformat()
+
+
+@pytest.fixture
+def state_dir(tmp_path):
+    return str(tmp_path / 'state')
+
+
+@pytest.fixture
+def worker(tmp_path, state_dir, monkeypatch):
+    monkeypatch.setenv('MODEL_PATH', str(tmp_path / 'model.pkl'))
+    monkeypatch.setenv('FEATURE_STORE_DIR', str(tmp_path / 'features'))
+    return MonitoringWorker(data_ingestion=DataIngestion(db_path=str(tmp_path / 'posts.db')),
+                            threat_scorer=VIPThreatScorer(), state=MonitoringState(state_dir), interval=0)
+
+
+def test_control_written_by_api_is_read_by_worker(state_dir):
+    api, worker = MonitoringState(state_dir), MonitoringState(state_dir)
+    assert worker.read_control() == {'active': False, 'run_requested_at': None}
+    api.update_control(active=True)
+    api.update_control(run_requested_at='2024-01-01T00:00:00')
+    assert worker.read_control() == {'active': True, 'run_requested_at': '2024-01-01T00:00:00'}
+    api.update_control(active=False)
+    assert worker.read_control()['active'] is False
+    # Files are replaced whole; no temporaries are left behind
+    assert os.listdir(state_dir) == ['control.json']
+
+
+def test_heartbeat_liveness(state_dir):
+    state = MonitoringState(state_dir)
+    assert not state.worker_alive()
+    state.write_status({'worker_pid': 123, 'heartbeat': ago(5), 'running_cycle': False})
+    assert state.worker_alive()
+    state.write_status({'worker_pid': 123, 'heartbeat': ago(state_module.HEARTBEAT_TIMEOUT_SECONDS + 5)})
+    assert not state.worker_alive()
+    # A long cycle pauses heartbeats without the worker being reported down
+    state.write_status({'worker_pid': 123, 'heartbeat': ago(120), 'running_cycle': True})
+    assert state.worker_alive()
+    # A worker that shut down cleanly clears its pid
+    state.write_status({'worker_pid': None, 'heartbeat': ago(1)})
+    assert not state.worker_alive()
+
+
+def test_worker_publishes_heartbeat(worker, state_dir):
+    worker._publish(running_cycle=False)
+    status = MonitoringState(state_dir).read_status()
+    assert status['worker_pid'] and status['running_cycle'] is False
+    assert MonitoringState(state_dir).worker_alive()
+
+
+def test_policy_request_is_handed_to_worker(worker, state_dir):
+    api = MonitoringState(state_dir)
+    api.update_control(scoring_policy={'threat_threshold': 0.55}, policy_requested_at='2024-01-01T00:00:00')
+    status = api.read_cluster_status()
+    assert status.get('policy_request_handled') != '2024-01-01T00:00:00'
+
+    worker._apply_policy(api.read_control())
+    status = api.read_cluster_status()
+    assert status['policy_request_handled'] == '2024-01-01T00:00:00'
+    assert status['last_policy_change']['version'] == worker.threat_scorer.policy.version == 1
+    stored = worker.partitions[0].get_scoring_policy()
+    assert (stored['version'], stored['threat_threshold']) == (1, 0.55)
+
+
+def test_cluster_policy_handled_once_every_live_worker_has_it(state_dir):
+    fresh = ago(1)
+    for worker_id, handled in (('w0', 'r2'), ('w1', 'r1')):
+        MonitoringState(state_dir, worker_id=worker_id).write_status(
+            {'worker_pid': 1, 'heartbeat': fresh, 'policy_request_handled': handled})
+    api = MonitoringState(state_dir)
+    assert api.read_cluster_status()['policy_request_handled'] is None
+    MonitoringState(state_dir, worker_id='w1').write_status(
+        {'worker_pid': 1, 'heartbeat': fresh, 'policy_request_handled': 'r2'})
+    status = api.read_cluster_status()
+    assert status['policy_request_handled'] == 'r2'
+    assert sorted(status['workers']) == ['w0', 'w1']
+
+
+def test_live_workers_need_a_fresh_heartbeat_from_a_running_process(state_dir):
+    exited = subprocess.Popen([sys.executable, '-c', 'pass'])
+    exited.wait()
+    for worker_id, status in (('up', {'worker_pid': os.getpid(), 'heartbeat': ago(1)}),
+                              ('stale', {'worker_pid': os.getpid(), 'heartbeat': ago(120)}),
+                              ('stopped', {'worker_pid': None, 'heartbeat': ago(1)}),
+                              # Killed mid-cycle: the heartbeat allowance has not run out yet
+                              ('killed', {'worker_pid': exited.pid, 'heartbeat': ago(120), 'running_cycle': True})):
+        MonitoringState(state_dir, worker_id=worker_id).write_status(status)
+    assert MonitoringState(state_dir).live_workers() == ['up']
+
+
+def test_live_workers_never_take_a_workers_lock(state_dir, monkeypatch):
+    MonitoringState(state_dir, worker_id='w0').write_status({'worker_pid': os.getpid(), 'heartbeat': ago(1)})
+    locked = []
+    monkeypatch.setattr(fcntl, 'flock', lambda *args: locked.append(args))
+    # Even a brief probe of the lock could make w0's own lock attempt fail while it restarts
+    assert MonitoringState(state_dir).live_workers() == ['w0']
+    assert locked == []
+
+
+@pytest.fixture
+def sharded(tmp_path, state_dir, monkeypatch):
+    monkeypatch.setenv('MODEL_PATH', str(tmp_path / 'model.pkl'))
+    monkeypatch.setenv('FEATURE_STORE_DIR', str(tmp_path / 'features'))
+    monkeypatch.setenv('SHARD_DIR', str(tmp_path / 'shards'))
+    monkeypatch.setattr(sharding, 'PARTITIONS', 8)
+
+    def start(worker_id):
+        worker = MonitoringWorker(threat_scorer=VIPThreatScorer(), state=MonitoringState(state_dir, worker_id),
+                                  interval=0, worker_id=worker_id)
+        worker._publish(running_cycle=False)
+        return worker
+    return start
+
+
+def test_rebalance_hands_partitions_over_on_join_and_leave(sharded):
+    w0 = sharded('w0')
+    w0.rebalance()
+    assert sorted(w0.partitions) == list(range(8))
+
+    w1 = sharded('w1')
+    w1.rebalance()
+    # Its share is still leased by w0 until w0 lets go
+    assert w1.partitions == {} and w1.status['partitions_waiting']
+    w0.rebalance()
+    w1.rebalance()
+    assert w1.status['partitions_waiting'] == [] and w0.status['partitions_waiting'] == []
+    assert sorted(set(w0.partitions) | set(w1.partitions)) == list(range(8))
+    assert not set(w0.partitions) & set(w1.partitions)
+    assert len(w0.partitions) == len(w1.partitions) == 4
+
+    # w1 stops the way run() does: leases released, pid cleared
+    w1.leases.release_all()
+    w1._publish(running_cycle=False, worker_pid=None)
+    w0.rebalance()
+    assert sorted(w0.partitions) == list(range(8))
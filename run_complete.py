@@ -53,12 +53,13 @@ def check_dependencies():
     return True
 
 def start_backend():
-    """Start the backend server"""
+    """Start the ingestion worker and the backend server"""
     print("🚀 Starting backend server...")
-    os.chdir('backend/dashboard')
+    # Both processes run from backend/ so relative DATABASE_PATH / MONITOR_STATE_DIR agree
+    subprocess.Popen([sys.executable, '-m', 'ingestion.worker'], cwd='backend')
     
     try:
-        subprocess.run([sys.executable, 'dashboard.py'])
+        subprocess.run([sys.executable, os.path.join('dashboard', 'dashboard.py')], cwd='backend')
     except KeyboardInterrupt:
         print("\n🛑 Backend server stopped")
     except Exception as e:
@@ -69,7 +70,7 @@ def start_frontend():
     print("🎨 Starting React frontend...")
     time.sleep(3)  # Wait for backend to start
     
-    os.chdir('../../frontend')
+    os.chdir('frontend')
     
     try:
         subprocess.run(['npm', 'start'])
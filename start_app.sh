@@ -79,12 +79,21 @@ install_frontend() {
     echo ""
 }
 
+start_worker() {
+    echo -e "${YELLOW}⚙️  Starting ingestion worker...${NC}"
+    cd backend
+    python3 -m ingestion.worker &
+    WORKER_PID=$!
+    cd ..
+}
+
 start_backend() {
     echo -e "${YELLOW}🚀 Starting backend server...${NC}"
-    cd backend/dashboard
-    python3 dashboard.py &
+    # Same working directory as the worker, so relative data paths point at the same files
+    cd backend
+    python3 dashboard/dashboard.py &
     BACKEND_PID=$!
-    cd ../..
+    cd ..
     sleep 5  # wait a bit for backend startup
 }
 
@@ -99,6 +108,7 @@ start_frontend() {
 cleanup() {
     echo -e "${RED}\n🛑 Shutting down services...${NC}"
     kill $BACKEND_PID 2>/dev/null || true
+    kill $WORKER_PID 2>/dev/null || true
     kill $FRONTEND_PID 2>/dev/null || true
     exit 0
 }
@@ -110,6 +120,7 @@ check_dependencies
 install_backend
 install_frontend
 print_urls
+start_worker
 start_backend
 start_frontend
 